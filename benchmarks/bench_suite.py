@@ -0,0 +1,241 @@
+# benchmarks/bench_suite.py
+"""
+Benchmarks the dashboard's data layer against synthetic datasets.
+
+  queries  every filter combination x sort, timing the exact SQL the
+           dashboard runs: count, first page, next page by cursor, and the
+           combined page+count query
+  writes   insert_document / update_document throughput
+  render   CardPool create and rebind times (needs customtkinter and a
+           display; under CI use `xvfb-run`, or pyvirtualdisplay if installed)
+
+    python benchmarks/bench_suite.py --sizes 10000 100000 --json bench.json
+    xvfb-run python benchmarks/bench_suite.py --mode render
+"""
+
+import itertools
+import json
+import os
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+# 🔐 Paths
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+UTILS_DIR = os.path.join(BASE_DIR, "utils")
+sys.path.insert(0, UTILS_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from doc_query import SORT_OPTIONS, RELEVANCE_SORT, build_count_query, build_filters, build_page_query, split_page_rows  # noqa: E402
+from doc_repository import DocumentRepository  # noqa: E402
+from synthetic_data import DOC_TYPES, generate  # noqa: E402
+
+TYPE_FILTERS = ["All"] + DOC_TYPES
+CLASS_FILTERS = ["All", "memorandum", "resolution"]
+SEARCH_TERMS = ["", "budget", "ro", "road repair", "mayor flood"]
+PAGE_SIZE = 25
+WRITE_OPS = 500
+
+
+def timed(fn, repeat):
+    # Median wall time in ms; the first call is a warm-up (page cache, statement cache)
+    fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(samples), 3)
+
+
+def bench_queries(repo, repeat):
+    results = []
+    combos = itertools.product(TYPE_FILTERS, CLASS_FILTERS, SEARCH_TERMS, SORT_OPTIONS)
+    for doc_type, doc_class, term, sort in combos:
+        if sort == RELEVANCE_SORT and not term:
+            continue  # the dashboard only offers relevance for a search
+        filters = build_filters(doc_type, doc_class, term)
+
+        count_sql, count_params = build_count_query(filters)
+        page_sql, page_params = build_page_query(filters, sort=sort, limit=PAGE_SIZE)
+        combined_sql, combined_params = build_page_query(filters, sort=sort, limit=PAGE_SIZE, with_count=True)
+        rows, next_cursor = split_page_rows(repo.query(page_sql, page_params))
+
+        result = {
+            "doc_type": doc_type, "doc_class": doc_class, "term": term, "sort": sort,
+            "matches": repo.query_one(count_sql, count_params)[0],
+            "count_ms": timed(lambda: repo.query_one(count_sql, count_params), repeat),
+            "first_page_ms": timed(lambda: repo.query(page_sql, page_params), repeat),
+            "page_and_count_ms": timed(lambda: repo.query(combined_sql, combined_params), repeat),
+        }
+        if next_cursor is not None:
+            next_sql, next_params = build_page_query(filters, sort=sort, cursor=next_cursor, limit=PAGE_SIZE)
+            result["next_page_ms"] = timed(lambda: repo.query(next_sql, next_params), repeat)
+        results.append(result)
+    return results
+
+
+def bench_writes(repo, ops=WRITE_OPS):
+    # One transaction per call, as the Add/Edit forms do
+    started = time.perf_counter()
+    ids = [
+        repo.insert_document(
+            f"Benchmark memo {n}", "incoming", "memorandum", "2024-01-01 08:00:00", "2024-01-01 08:00:00",
+            "Office of the Mayor", "Budget Office", "benchmark insert", f"documents/incoming/bench_{n}.pdf"
+        )
+        for n in range(ops)
+    ]
+    insert_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for doc_id in ids:
+        repo.update_document(doc_id, title="Benchmark memo (revised)", doc_class="policy")
+    update_s = time.perf_counter() - started
+
+    for doc_id in ids:
+        repo.delete_document(doc_id)
+    return {
+        "ops": ops,
+        "inserts_per_s": round(ops / insert_s, 1),
+        "updates_per_s": round(ops / update_s, 1),
+    }
+
+
+def summarize(query_results):
+    summary = {}
+    for metric in ("count_ms", "first_page_ms", "next_page_ms", "page_and_count_ms"):
+        values = [r[metric] for r in query_results if metric in r]
+        if values:
+            summary[metric] = {
+                "median": round(statistics.median(values), 3),
+                "p95": round(sorted(values)[int(len(values) * 0.95) - 1], 3),
+                "max": round(max(values), 3),
+            }
+    return summary
+
+
+def run_data_benchmarks(size, work_dir, repeat, files):
+    root = os.path.join(work_dir, f"dms-{size}")
+    db_path = generate(root, size, files=files)
+
+    # Writes go to a copy so the reusable dataset stays exactly as generated
+    write_db = os.path.join(work_dir, f"writes-{size}.db")
+    shutil.copyfile(db_path, write_db)
+
+    repo = DocumentRepository(db_path)
+    write_repo = DocumentRepository(write_db)
+    try:
+        queries = bench_queries(repo, repeat)
+        writes = bench_writes(write_repo)
+    finally:
+        repo.close()
+        write_repo.close()
+        os.remove(write_db)
+
+    return {
+        "rows": size,
+        "queries": {"summary": summarize(queries), "cases": queries},
+        "writes": writes,
+    }
+
+
+def run_render_benchmark(repeat, cards=PAGE_SIZE):
+    display = None
+    if not os.environ.get("DISPLAY") and sys.platform.startswith("linux"):
+        try:
+            from pyvirtualdisplay import Display
+        except ImportError:
+            raise SystemExit("❌ No display. Run under `xvfb-run` or install pyvirtualdisplay.")
+        display = Display(visible=False, size=(1280, 900))
+        display.start()
+
+    import customtkinter as ctk
+    from document_card import CardPool
+
+    def fake_rows(offset):
+        return [
+            (offset + n, f"Memorandum on road repair No. {offset + n}", DOC_TYPES[n % 3], "memorandum",
+             "2024-03-01 09:30:00", "Office of the Mayor", "Municipal Engineer",
+             "Request for approval of the revised schedule" if n % 2 else None,
+             f"documents/incoming/{offset + n}.pdf")
+            for n in range(cards)
+        ]
+
+    try:
+        root = ctk.CTk()
+        root.geometry("800x700")
+        frame = ctk.CTkScrollableFrame(root, width=750, height=600)
+        frame.pack(fill="both", expand=True)
+        root.update()
+
+        pool = CardPool(frame, on_open=print, on_edit=print, on_delete=print)
+        started = time.perf_counter()
+        pool.show(fake_rows(0))
+        root.update_idletasks()
+        create_ms = (time.perf_counter() - started) * 1000
+
+        pages = itertools.count(1)
+
+        def rebind():
+            pool.show(fake_rows(next(pages) * cards))
+            root.update_idletasks()
+
+        result = {
+            "cards": cards,
+            "create_ms": round(create_ms, 3),
+            "rebind_ms": timed(rebind, repeat),
+        }
+        root.destroy()
+        return result
+    finally:
+        if display is not None:
+            display.stop()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Query, write and render benchmarks on synthetic data.")
+    parser.add_argument("--mode", choices=["data", "render", "all"], default="data")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000], help="Row counts, e.g. 10000 100000 1000000")
+    parser.add_argument("--files", type=int, default=None, help="Distinct files per dataset (default: min(rows, 2000))")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed repetitions per case (median is reported)")
+    parser.add_argument("--work-dir", default=None, help="Keep generated datasets here for reuse (default: temp dir)")
+    parser.add_argument("--json", default=None, help="Write the full report to this file")
+    args = parser.parse_args()
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="dms-bench-")
+    os.makedirs(work_dir, exist_ok=True)
+    report = {
+        "benchmark": "suite",
+        "python": sys.version.split()[0],
+        "sqlite": sqlite3.sqlite_version,
+        "platform": sys.platform,
+        "repeat": args.repeat,
+    }
+
+    try:
+        if args.mode in ("data", "all"):
+            report["datasets"] = []
+            for size in args.sizes:
+                result = run_data_benchmarks(size, work_dir, args.repeat, args.files)
+                report["datasets"].append(result)
+                print(f"⏱️ {size} rows:", json.dumps(result["queries"]["summary"]), json.dumps(result["writes"]))
+        if args.mode in ("render", "all"):
+            report["render"] = run_render_benchmark(args.repeat)
+            print("⏱️ render:", json.dumps(report["render"]))
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print("✅ Report written to", args.json)
+
+
+if __name__ == "__main__":
+    main()
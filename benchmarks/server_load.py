@@ -0,0 +1,241 @@
+# benchmarks/server_load.py
+"""
+Load-tests the document server: a DocumentServer on localhost over a
+synthetic dataset, and N client processes, each its own RemoteRepository
+(as on a separate workstation), running the dashboard's mix of requests:
+pages, next pages by cursor, counts, facets, timeline, change-feed polls,
+file downloads and metadata edits. After each run the server's answers are
+checked against the database directly.
+
+    python benchmarks/server_load.py --rows 100000 --clients 1 8 32 --duration 15
+    python benchmarks/server_load.py --no-cache --json load.json
+"""
+
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+# 🔐 Paths
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+UTILS_DIR = os.path.join(BASE_DIR, "utils")
+sys.path.insert(0, UTILS_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import doc_storage  # noqa: E402
+from diagnostics import percentile  # noqa: E402
+from doc_client import RemoteRepository  # noqa: E402
+from doc_query import SORT_OPTIONS, build_filters  # noqa: E402
+from doc_repository import DocumentRepository  # noqa: E402
+from doc_server import DocumentServer  # noqa: E402
+from synthetic_data import DOC_CLASSES, DOC_TYPES, generate  # noqa: E402
+
+TYPE_FILTERS = ["All"] + DOC_TYPES
+CLASS_FILTERS = ["All", "memorandum", "resolution"]
+SEARCH_TERMS = ["", "", "budget", "road repair", "mayor flood"]
+SORTS = [sort for sort in SORT_OPTIONS if sort != "Relevance"]
+PAGE_SIZE = 25
+# Relative weights of the read operations; writes are added by --write-ratio
+READ_MIX = {"page": 40, "next_page": 15, "count": 10, "facets": 10, "timeline": 5, "changes": 15, "download": 5}
+
+
+def start_server(repo, workers):
+    # Runs the server's event loop on its own thread; returns (port, stop)
+    loop = asyncio.new_event_loop()
+    server = DocumentServer(repo, workers=workers)
+    port = loop.run_until_complete(server.start("127.0.0.1", 0))
+    thread = threading.Thread(target=loop.run_forever, name="doc-server-loop", daemon=True)
+    thread.start()
+
+    def stop():
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        server.close()
+        loop.close()
+
+    return port, stop
+
+
+def random_filters(rng):
+    return build_filters(rng.choice(TYPE_FILTERS), rng.choice(CLASS_FILTERS), rng.choice(SEARCH_TERMS))
+
+
+def client_loop(url, seed, deadline, write_ratio, cache_entries, max_id, work_dir):
+    # One client process; deadline is wall-clock time.time() so every process stops together
+    rng = random.Random(seed)
+    client = RemoteRepository(url, cache_entries=cache_entries)
+    ops = list(READ_MIX) + ["edit"]
+    weights = [w * (1 - write_ratio) / sum(READ_MIX.values()) for w in READ_MIX.values()] + [write_ratio]
+    samples = defaultdict(list)
+    errors = []
+    cursor, seq, last_token = None, client.latest_change(), None
+    download_dir = os.path.join(work_dir, f"downloads-{seed}")
+
+    while time.time() < deadline:
+        op = rng.choices(ops, weights)[0]
+        filters = random_filters(rng)
+        started = time.perf_counter()
+        try:
+            if op == "page" or (op == "next_page" and cursor is None):
+                op = "page"
+                rows, cursor, _ = client.fetch_page_and_count(filters, sort=rng.choice(SORTS), limit=PAGE_SIZE)
+                last_filters = filters
+            elif op == "next_page":
+                rows, cursor, _ = client.fetch_page_and_count(last_filters, cursor=cursor, limit=PAGE_SIZE, offset=PAGE_SIZE)
+            elif op == "count":
+                client.count(filters)
+            elif op == "facets":
+                client.facet_counts(filters)
+            elif op == "timeline":
+                client.timeline_counts(filters)
+            elif op == "changes":
+                # The dashboard's poll: the change feed is only read once the token moves
+                token = client.change_token()
+                if token != last_token:
+                    _, seq, _ = client.changes_since(seq)
+                    last_token = token
+            elif op == "download":
+                doc_id = rng.randint(1, max_id)
+                shutil.rmtree(download_dir, ignore_errors=True)  # measure the transfer, not the local copy
+                client.download(doc_id, f"{doc_id}.pdf", download_dir=download_dir)
+            elif op == "edit":
+                client.batch("reclassify", [rng.randint(1, max_id)], rng.choice(DOC_CLASSES))
+        except Exception as e:
+            errors.append(f"{op}: {e!r}")
+            continue
+        samples[op].append((time.perf_counter() - started) * 1000)
+
+    client.close()
+    shutil.rmtree(download_dir, ignore_errors=True)
+    return samples, errors, client.stats()
+
+
+def check_consistency(url, repo):
+    # The server must answer exactly what the database says, page for page
+    client = RemoteRepository(url)
+    mismatches = []
+    try:
+        for doc_type in TYPE_FILTERS:
+            for term in SEARCH_TERMS[1:] + [""]:
+                filters = build_filters(doc_type, "All", term)
+                rows, _, total = client.fetch_page_and_count(filters, limit=PAGE_SIZE)
+                local_rows, _ = repo.fetch_page(filters, limit=PAGE_SIZE)
+                if total != repo.count(filters) or rows != [tuple(row) for row in local_rows]:
+                    mismatches.append((doc_type, term))
+    finally:
+        client.close()
+    return mismatches
+
+
+def run_load(url, repo, clients, duration, write_ratio, cache_entries, max_id, work_dir):
+    # Separate processes, so the clients don't compete with the server (or each other) for the GIL
+    samples, errors, stats = defaultdict(list), [], defaultdict(int)
+    with ProcessPoolExecutor(max_workers=clients, mp_context=multiprocessing.get_context("spawn")) as pool:
+        list(pool.map(time.sleep, [0] * clients))  # start every process before the clock runs
+        deadline = time.time() + duration
+        futures = [
+            pool.submit(client_loop, url, n, deadline, write_ratio, cache_entries, max_id, work_dir)
+            for n in range(clients)
+        ]
+        for future in futures:
+            client_samples, client_errors, client_stats = future.result()
+            for op, values in client_samples.items():
+                samples[op] += values
+            errors += client_errors
+            for key, value in client_stats.items():
+                stats[key] += value
+
+    ops = {}
+    for op, values in sorted(samples.items()):
+        values.sort()
+        ops[op] = {
+            "calls": len(values),
+            "p50_ms": round(percentile(values, 50), 2),
+            "p95_ms": round(percentile(values, 95), 2),
+            "p99_ms": round(percentile(values, 99), 2),
+        }
+    total = sum(op["calls"] for op in ops.values())
+    return {
+        "clients": clients,
+        "ops": total,
+        "ops_per_s": round(total / duration, 1),
+        "errors": len(errors),
+        "first_errors": errors[:5],
+        "client": dict(stats),
+        "by_op": ops,
+        "mismatches": check_consistency(url, repo),
+    }
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Concurrent load test of the document server on synthetic data.")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--files", type=int, default=200, help="Distinct files in the dataset (default: 200)")
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32], help="Concurrent clients per run")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per run")
+    parser.add_argument("--write-ratio", type=float, default=0.05, help="Share of operations that are edits")
+    parser.add_argument("--workers", type=int, default=None, help="Server worker threads (default: the server's)")
+    parser.add_argument("--no-cache", action="store_true", help="Disable the clients' response caches")
+    parser.add_argument("--work-dir", default=None, help="Keep the generated dataset here for reuse (default: temp dir)")
+    parser.add_argument("--json", default=None, help="Write the full report to this file")
+    args = parser.parse_args()
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="dms-load-")
+    root = os.path.join(work_dir, f"dms-{args.rows}")
+    db_path = generate(root, args.rows, files=args.files)
+
+    # Edits go to a copy so the reusable dataset stays exactly as generated; files are served from root
+    load_db = os.path.join(work_dir, f"load-{args.rows}.db")
+    shutil.copyfile(db_path, load_db)
+    doc_storage.BASE_DIR = root
+
+    repo = DocumentRepository(load_db)
+    port, stop = start_server(repo, args.workers or os.cpu_count() or 8)
+    url = f"http://127.0.0.1:{port}"
+    report = {
+        "benchmark": "server_load",
+        "python": sys.version.split()[0],
+        "sqlite": sqlite3.sqlite_version,
+        "rows": args.rows,
+        "duration_s": args.duration,
+        "write_ratio": args.write_ratio,
+        "client_cache": not args.no_cache,
+        "runs": [],
+    }
+    try:
+        max_id = repo.query_one("SELECT MAX(id) FROM documents")[0]
+        for clients in args.clients:
+            result = run_load(url, repo, clients, args.duration, args.write_ratio,
+                              0 if args.no_cache else 256, max_id, work_dir)
+            report["runs"].append(result)
+            print(f"⏱️ {clients} client(s): {result['ops_per_s']} ops/s, {result['errors']} error(s), "
+                  f"{len(result['mismatches'])} mismatch(es)",
+                  json.dumps({op: (s["p50_ms"], s["p95_ms"]) for op, s in result["by_op"].items()}))
+    finally:
+        stop()
+        repo.close()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(load_db + suffix):
+                os.remove(load_db + suffix)
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print("✅ Report written to", args.json)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+# benchmarks/startup_bench.py
+"""
+Cold-start benchmark for the dashboard.
+
+Each run is a fresh interpreter (that's what a user double-clicking the app
+gets) against a private copy of the database, and reports:
+  import_s        importing gui_dashboard
+  window_s        DocumentDashboard() constructed and drawn
+  first_card_s    first page of cards on screen
+All times are seconds since the child process started timing, before any
+app import. Needs a display, like the dashboard itself.
+
+    python benchmarks/startup_bench.py --runs 10 --json startup.json
+"""
+
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# 🔐 Paths
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+UTILS_DIR = os.path.join(BASE_DIR, "utils")
+DB_PATH = os.path.join(BASE_DIR, "db", "document_store.db")
+
+METRICS = ["import_s", "window_s", "first_card_s"]
+FIRST_CARD_TIMEOUT_MS = 60_000
+
+
+def run_child(db_path):
+    started = time.perf_counter()
+    sys.path.insert(0, UTILS_DIR)
+
+    import db_init
+    import gui_dashboard
+    imported = time.perf_counter()
+
+    # Point every module that opens the database at the copy
+    db_init.DB_PATH = db_path
+    gui_dashboard.DB_PATH = db_path
+
+    app = gui_dashboard.DocumentDashboard()
+    app.update()
+    shown = time.perf_counter()
+
+    result = {"import_s": imported - started, "window_s": shown - started}
+    loaded = app.on_documents_loaded
+
+    def on_documents_loaded(page):
+        loaded(page)
+        app.update_idletasks()
+        if "first_card_s" not in result:
+            result["first_card_s"] = time.perf_counter() - started
+            result["cards"] = len(page[0])
+            app.after(0, app.on_exit)
+
+    app.on_documents_loaded = on_documents_loaded
+    app.after(FIRST_CARD_TIMEOUT_MS, app.on_exit)
+    app.mainloop()
+    app.destroy()
+
+    print(json.dumps(result))
+
+
+def run_once(db_path):
+    # A throwaway copy per run, so WAL files and migrations never leak between runs
+    with tempfile.TemporaryDirectory() as tmp:
+        db_copy = os.path.join(tmp, "document_store.db")
+        if os.path.exists(db_path):
+            shutil.copyfile(db_path, db_copy)
+        proc = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", db_copy],
+            capture_output=True, text=True, encoding="utf-8", cwd=BASE_DIR
+        )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip() or f"child exited with {proc.returncode}")
+    # The app prints its own progress lines; the result is the last one
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def summarize(samples):
+    summary = {}
+    for metric in METRICS:
+        values = [s[metric] for s in samples if metric in s]
+        if values:
+            summary[metric] = {
+                "median": round(statistics.median(values), 4),
+                "min": round(min(values), 4),
+                "max": round(max(values), 4),
+            }
+    return summary
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Measure dashboard import time and time-to-first-card.")
+    parser.add_argument("--runs", type=int, default=5, help="Cold starts to measure (default: 5)")
+    parser.add_argument("--db", default=DB_PATH, help="Database to copy for each run (default: the app's)")
+    parser.add_argument("--json", default=None, help="Also write the results to this file")
+    parser.add_argument("--child", metavar="DB", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child)
+        return
+
+    samples = []
+    for n in range(1, args.runs + 1):
+        sample = run_once(args.db)
+        samples.append(sample)
+        print(f"⏱️ run {n}: " + ", ".join(f"{m}={sample[m]:.3f}" for m in METRICS if m in sample))
+
+    report = {
+        "benchmark": "startup",
+        "python": sys.version.split()[0],
+        "platform": sys.platform,
+        "runs": args.runs,
+        "summary": summarize(samples),
+        "samples": samples,
+    }
+    print("✅ Startup:", json.dumps(report["summary"]))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
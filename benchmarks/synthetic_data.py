@@ -0,0 +1,172 @@
+# benchmarks/synthetic_data.py
+"""
+Builds a throwaway copy of the app's data layout (db/ and documents/) filled
+with realistic-looking rows and files, for benchmarks. Generation is seeded,
+so the same --rows/--files/--seed always produce the same data.
+
+    python benchmarks/synthetic_data.py /tmp/dms-100k --rows 100000 --files 5000
+"""
+
+import hashlib
+import os
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime, timedelta
+
+# 🔐 Paths
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+UTILS_DIR = os.path.join(BASE_DIR, "utils")
+sys.path.insert(0, UTILS_DIR)
+
+import db_init  # noqa: E402
+from doc_storage import FOLDER_MAP, link_file  # noqa: E402
+
+DOC_TYPES = list(FOLDER_MAP)
+DOC_CLASSES = [
+    "advisory", "circular", "endorsement", "executive order", "memorandum",
+    "office order", "ordinance", "policy", "resolution", "others",
+]
+OFFICES = [
+    "Office of the Mayor", "Sangguniang Bayan", "Municipal Treasurer", "Municipal Engineer",
+    "Municipal Health Office", "MDRRMO", "Human Resource Office", "Budget Office",
+    "Municipal Assessor", "DILG Aklan", "Provincial Governor", "Municipal Accountant",
+    "Tourism Office", "MSWDO", "Business Permits and Licensing", "Municipal Agriculturist",
+]
+TOPICS = [
+    "road repair", "budget realignment", "flood control", "vaccination drive", "festival security",
+    "procurement plan", "tax amnesty", "waste segregation", "barangay elections", "scholarship grants",
+    "market rehabilitation", "drainage project", "typhoon preparedness", "salary adjustment",
+    "business permit renewal", "tourism promotion", "water system upgrade", "solar street lights",
+]
+WORDS = (
+    "request approval submission compliance schedule implementation coordination funds "
+    "allocation inspection report meeting attendance deadline guidelines directive review "
+    "personnel equipment supplies transport emergency response community program"
+).split()
+
+INSERT_BATCH = 5000
+START_DATE = datetime(2015, 1, 1)
+DATE_SPAN_S = 10 * 365 * 24 * 3600
+
+
+def fake_pdf(rng, size):
+    # Not a renderable PDF, but the right magic and a realistic size for hashing and copying
+    body = rng.randbytes(max(0, size - 32))
+    return b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n" + body + b"\n%%EOF\n"
+
+
+def make_files(root, count, rng, min_kb=20, max_kb=400):
+    """
+    Returns [(relative_path, sha256, blob_size)]; files are spread over the type folders.
+    As store_file does, each file is a hardlink/reflink to its blob under documents/.store;
+    where the filesystem can't link, the file is the only copy and blob_size is None.
+    """
+    files = []
+    for n in range(count):
+        doc_type = DOC_TYPES[n % len(DOC_TYPES)]
+        folder = os.path.join(root, "documents", FOLDER_MAP[doc_type])
+        os.makedirs(folder, exist_ok=True)
+        data = fake_pdf(rng, rng.randint(min_kb, max_kb) * 1024)
+        sha256 = hashlib.sha256(data).hexdigest()
+        name = f"synthetic_{n:07d}_{sha256[:8]}.pdf"
+        path = os.path.join(folder, name)
+        blob = os.path.join(root, "documents", ".store", sha256[:2], sha256)
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        with open(blob, "wb") as f:
+            f.write(data)
+        if link_file(blob, path):
+            size = len(data)
+        else:
+            os.replace(blob, path)
+            size = None
+        files.append((os.path.join("documents", FOLDER_MAP[doc_type], name), sha256, size))
+    return files
+
+
+def make_row(n, rng, files):
+    topic = rng.choice(TOPICS)
+    doc_class = rng.choice(DOC_CLASSES)
+    dt = START_DATE + timedelta(seconds=rng.randrange(DATE_SPAN_S))
+    date_ts = dt.strftime("%Y-%m-%d %H:%M:%S")
+    file_path, sha256, _ = files[n % len(files)] if files else (f"documents/others/missing_{n}.pdf", None, 0)
+    return (
+        f"{doc_class.title()} on {topic} No. {n % 997 + 1}",
+        rng.choice(DOC_TYPES),
+        doc_class,
+        date_ts,
+        date_ts,
+        rng.choice(OFFICES) if rng.random() > 0.1 else None,
+        rng.choice(OFFICES) if rng.random() > 0.2 else None,
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 20))) + f" regarding {topic}",
+        file_path,
+        sha256,
+    )
+
+
+def generate(root, rows, files=None, seed=42, quiet=False):
+    """
+    Creates root/db/document_store.db (fully migrated) and root/documents/.
+    Reuses an existing dataset with the same row count, since 1M rows take a while.
+    Returns the database path.
+    """
+    db_path = os.path.join(root, "db", "document_store.db")
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+
+    if os.path.exists(db_path):
+        with sqlite3.connect(db_path) as conn:
+            try:
+                existing = conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+            except sqlite3.Error:
+                existing = None
+        if existing == rows:
+            return db_path
+        os.remove(db_path)
+
+    db_init.DB_PATH = db_path
+    db_init.init_db()
+
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    file_list = make_files(root, files if files is not None else min(rows, 2000), rng)
+
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.execute("BEGIN")
+        conn.executemany(
+            "INSERT OR IGNORE INTO blobs (sha256, size) VALUES (?, ?)",
+            [(sha256, size) for _, sha256, size in file_list if size is not None]
+        )
+        for start in range(0, rows, INSERT_BATCH):
+            batch = [make_row(n, rng, file_list) for n in range(start, min(rows, start + INSERT_BATCH))]
+            conn.executemany('''
+                INSERT INTO documents (title, doc_type, doc_class, date, date_ts, sender, recipient, description, file_path, content_hash)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', batch)
+            if not quiet:
+                print(f"📦 {min(rows, start + INSERT_BATCH)}/{rows} rows", end="\r")
+        conn.execute("COMMIT")
+        conn.execute("ANALYZE")
+        if not quiet:
+            print()
+    finally:
+        conn.close()
+
+    if not quiet:
+        print(f"✅ Generated {rows} rows and {len(file_list)} files in {time.perf_counter() - started:.1f}s at {root}")
+    return db_path
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate a synthetic DMS dataset for benchmarks.")
+    parser.add_argument("root", help="Folder to create db/ and documents/ in")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--files", type=int, default=None, help="Distinct files (default: min(rows, 2000))")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    generate(args.root, args.rows, args.files, args.seed)
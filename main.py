@@ -1,5 +1,7 @@
 import os
-import sqlite3
+
+# 🔁 Single source of truth for the schema and its migrations
+from utils.db_init import init_db
 
 # Define folder structure
 folders = [
@@ -15,27 +17,6 @@ def create_directories():
         os.makedirs(folder, exist_ok=True)
     print("📁 Directory structure created.")
 
-def init_db():
-    db_path = "db/document_store.db"
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS documents (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT NOT NULL,
-            doc_type TEXT NOT NULL,
-            doc_class TEXT NULL,
-            description TEXT NOT NULL,
-            date TEXT NOT NULL,
-            sender TEXT,
-            recipient TEXT,
-            file_path TEXT NOT NULL
-        )
-    ''')
-    conn.commit()
-    conn.close()
-    print("🗃️ Database initialized at:", db_path)
-
 if __name__ == "__main__":
     create_directories()
     init_db()
@@ -0,0 +1,316 @@
+# utils/archive_store.py
+
+import os
+import time
+import uuid
+import zipfile
+from datetime import datetime, timedelta
+
+from diagnostics import span
+from doc_repository import get_repository
+from doc_storage import abs_document_path, blob_path, copy_stream, fsync_dir
+
+# 🔐 Paths
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DB_PATH = os.path.join(BASE_DIR, "db", "document_store.db")
+ARCHIVE_DIR = os.path.join(BASE_DIR, "documents", ".archive")
+EXTRACT_DIR = os.path.join(BASE_DIR, "cache", "archive")
+
+DEFAULT_AGE_DAYS = 5 * 365
+MAX_PACK_BYTES = 512 * 1024 * 1024
+MAX_EXTRACT_BYTES = 512 * 1024 * 1024
+COMPRESS_LEVEL = 6
+# Already compressed: deflating these again costs CPU and saves nothing
+STORED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".zip", ".docx", ".xlsx", ".pptx"}
+
+
+def pack_path(file_name):
+    return os.path.join(ARCHIVE_DIR, file_name)
+
+
+def member_name(doc_id, file_path, content_hash):
+    # Members are named by content, so documents sharing a blob share a member
+    ext = os.path.splitext(file_path)[1].lower()
+    return f"{content_hash}{ext}" if content_hash else f"doc-{doc_id}{ext}"
+
+
+class ArchiveStats:
+    def __init__(self):
+        self.documents = 0
+        self.packs = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.skipped = []  # (doc_id, reason)
+        self.started = time.perf_counter()
+
+    def summary(self):
+        return {
+            "documents": self.documents,
+            "packs": self.packs,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "ratio": round(self.bytes_out / self.bytes_in, 3) if self.bytes_in and self.bytes_out else None,
+            "skipped": len(self.skipped),
+            "elapsed_s": round(time.perf_counter() - self.started, 2),
+        }
+
+
+def find_candidates(repo, cutoff):
+    """
+    [(id, file_path, content_hash, size)] for documents dated before cutoff
+    ("YYYY-MM-DD HH:MM:SS") that aren't archived yet and still have their loose file.
+    """
+    rows = repo.query('''
+        SELECT d.id, d.file_path, d.content_hash
+        FROM documents d
+        WHERE d.date_ts < ? AND NOT EXISTS (SELECT 1 FROM archived_documents a WHERE a.doc_id = d.id)
+        ORDER BY d.date_ts, d.id
+    ''', (cutoff,))
+    candidates = []
+    for doc_id, file_path, content_hash in rows:
+        try:
+            size = os.path.getsize(abs_document_path(file_path))
+        except OSError:
+            continue
+        candidates.append((doc_id, file_path, content_hash, size))
+    return candidates
+
+
+def plan_packs(candidates, max_pack_bytes=MAX_PACK_BYTES):
+    # Splits candidates into packs of at most max_pack_bytes input (a bigger single file gets its own pack)
+    packs, current, current_bytes = [], [], 0
+    for candidate in candidates:
+        if current and current_bytes + candidate[3] > max_pack_bytes:
+            packs.append(current)
+            current, current_bytes = [], 0
+        current.append(candidate)
+        current_bytes += candidate[3]
+    if current:
+        packs.append(current)
+    return packs
+
+
+def write_pack(entries):
+    """
+    Writes entries into a new zip under ARCHIVE_DIR and returns
+    (file_name, {doc_id: (member, size)}). The pack is CRC-checked and fsynced
+    before it's renamed into place, so a pack that exists is always complete.
+    Files that disappear while packing (deleted or retyped meanwhile) are left out;
+    if none are left, no pack is written and file_name is None.
+    """
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    file_name = f"pack-{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:8]}.zip"
+    temp_path = os.path.join(ARCHIVE_DIR, f".{uuid.uuid4().hex}.tmp")
+    packed = {}
+    try:
+        with open(temp_path, "xb") as f:
+            with zipfile.ZipFile(f, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=COMPRESS_LEVEL) as zf:
+                written = set()
+                for doc_id, file_path, content_hash, size in entries:
+                    member = member_name(doc_id, file_path, content_hash)
+                    if member not in written:
+                        ext = os.path.splitext(member)[1]
+                        compression = zipfile.ZIP_STORED if ext in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+                        try:
+                            zf.write(abs_document_path(file_path), member, compress_type=compression)
+                        except FileNotFoundError:
+                            continue
+                        written.add(member)
+                    packed[doc_id] = (member, size)
+            f.flush()
+            os.fsync(f.fileno())
+        if not packed:
+            return None, packed
+
+        with zipfile.ZipFile(temp_path) as zf:
+            bad = zf.testzip()
+        if bad is not None:
+            raise zipfile.BadZipFile(f"{bad} failed its CRC check")
+
+        os.replace(temp_path, pack_path(file_name))
+        fsync_dir(ARCHIVE_DIR)
+        return file_name, packed
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def record_pack(repo, file_name, entries, packed):
+    """
+    Indexes the pack in one transaction and returns the archived entries.
+    A document is only recorded if its row still points at the file that was packed.
+    """
+    def record(conn):
+        cursor = conn.execute(
+            "INSERT INTO archive_packs (file_name, members, bytes) VALUES (?, ?, ?)",
+            (file_name, len({member for member, _ in packed.values()}), os.path.getsize(pack_path(file_name)))
+        )
+        pack_id = cursor.lastrowid
+        recorded = []
+        for entry in entries:
+            doc_id, file_path = entry[0], entry[1]
+            if doc_id not in packed:
+                continue
+            member, size = packed[doc_id]
+            inserted = conn.execute('''
+                INSERT INTO archived_documents (doc_id, pack_id, member, size)
+                SELECT ?, ?, ?, ? WHERE EXISTS (SELECT 1 FROM documents WHERE id = ? AND file_path = ?)
+            ''', (doc_id, pack_id, member, size, doc_id, file_path)).rowcount
+            if inserted:
+                recorded.append(entry)
+        return recorded
+
+    return repo.write(record)
+
+
+def release_loose_files(repo, entries):
+    """
+    Removes the loose files of archived documents, and their blobs, once no
+    unarchived row still uses them (legacy rows can share a file_path).
+    """
+    for file_path in {entry[1] for entry in entries}:
+        still_used = repo.query_one('''
+            SELECT 1 FROM documents d
+            WHERE d.file_path = ? AND NOT EXISTS (SELECT 1 FROM archived_documents a WHERE a.doc_id = d.id)
+        ''', (file_path,))
+        if still_used is None:
+            try:
+                os.remove(abs_document_path(file_path))
+            except FileNotFoundError:
+                pass
+    for content_hash in {entry[2] for entry in entries if entry[2]}:
+        still_used = repo.query_one('''
+            SELECT 1 FROM documents d
+            WHERE d.content_hash = ? AND NOT EXISTS (SELECT 1 FROM archived_documents a WHERE a.doc_id = d.id)
+        ''', (content_hash,))
+        if still_used is None:
+            try:
+                os.remove(blob_path(content_hash))
+            except FileNotFoundError:
+                pass
+
+
+def archive_documents(repo, older_than_days=DEFAULT_AGE_DAYS, max_pack_bytes=MAX_PACK_BYTES, dry_run=False, quiet=False):
+    """
+    Packs every document dated more than older_than_days ago into compressed
+    zip packs. Rows, search indexes and the body text stay in the database, so
+    archived documents are still found by searches; only the files move.
+    Loose files are removed only after their pack is durable and indexed.
+    """
+    stats = ArchiveStats()
+    cutoff = (datetime.now() - timedelta(days=older_than_days)).strftime("%Y-%m-%d %H:%M:%S")
+    candidates = find_candidates(repo, cutoff)
+    packs = plan_packs(candidates, max_pack_bytes)
+
+    if dry_run:
+        stats.documents = len(candidates)
+        stats.packs = len(packs)
+        stats.bytes_in = sum(c[3] for c in candidates)
+        return stats
+
+    for entries in packs:
+        with span("file_io.archive_pack", rows=len(entries)):
+            file_name, packed = write_pack(entries)
+        if file_name is None:
+            stats.skipped += [(entry[0], "file gone while packing") for entry in entries]
+            continue
+        try:
+            recorded = record_pack(repo, file_name, entries, packed)
+        except Exception:
+            os.remove(pack_path(file_name))
+            raise
+        release_loose_files(repo, recorded)
+
+        skipped = {entry[0] for entry in entries} - {entry[0] for entry in recorded}
+        stats.skipped += [(doc_id, "changed while packing") for doc_id in sorted(skipped)]
+        stats.documents += len(recorded)
+        stats.packs += 1
+        stats.bytes_in += sum(entry[3] for entry in recorded)
+        stats.bytes_out += os.path.getsize(pack_path(file_name))
+        if not quiet:
+            print(f"🗄️ {file_name}: {len(recorded)} document(s)")
+    return stats
+
+
+# 📤 Extraction cache: archived documents are unpacked on demand and evicted LRU
+
+def extract_archived(entry, progress=None, cancel=None, extract_dir=None, max_bytes=MAX_EXTRACT_BYTES):
+    """
+    Unpacks one archived document (an entry from repo.get_archive_entry) into
+    the extraction cache and returns the extracted file's path. The file keeps
+    its original name so the OS opens it with the right application.
+    """
+    extract_dir = extract_dir or EXTRACT_DIR
+    file_name, member, size, file_path = entry
+    target_dir = os.path.join(extract_dir, os.path.splitext(member)[0])
+    target = os.path.join(target_dir, os.path.basename(abs_document_path(file_path)))
+    if os.path.exists(target) and os.path.getsize(target) == size:
+        os.utime(target)  # LRU: mark as recently used
+        return target
+
+    os.makedirs(target_dir, exist_ok=True)
+    temp_path = os.path.join(target_dir, f".{uuid.uuid4().hex}.tmp")
+    try:
+        with span("file_io.extract_archived", rows=size):
+            with zipfile.ZipFile(pack_path(file_name)) as zf, zf.open(member) as src, open(temp_path, "xb") as dst:
+                copy_stream(src, dst, progress, cancel)
+        os.replace(temp_path, target)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+    evict(extract_dir, max_bytes, keep=target)
+    return target
+
+
+def evict(extract_dir=None, max_bytes=MAX_EXTRACT_BYTES, keep=None):
+    # Deletes least recently used extractions until the cache is under 90% of max_bytes
+    files = []
+    for root, _, names in os.walk(extract_dir or EXTRACT_DIR):
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, path))
+    total = sum(size for _, size, _ in files)
+    if total <= max_bytes:
+        return 0
+
+    removed = 0
+    for _, size, path in sorted(files):
+        if total <= max_bytes * 0.9:
+            break
+        if path == keep:
+            continue
+        try:
+            os.remove(path)  # fails on Windows while a viewer still has the file open
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+        try:
+            os.rmdir(os.path.dirname(path))
+        except OSError:
+            pass
+    return removed
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    from db_init import init_db
+
+    parser = argparse.ArgumentParser(description="Pack old documents into compressed archive files.")
+    parser.add_argument("--older-than-days", type=int, default=DEFAULT_AGE_DAYS,
+                        help=f"Archive documents dated more than this many days ago (default: {DEFAULT_AGE_DAYS})")
+    parser.add_argument("--max-pack-mb", type=int, default=MAX_PACK_BYTES // (1024 * 1024),
+                        help="Input size per pack file (default: %(default)s)")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be archived")
+    args = parser.parse_args()
+
+    init_db()
+    stats = archive_documents(get_repository(DB_PATH), args.older_than_days, args.max_pack_mb * 1024 * 1024, args.dry_run)
+    print(("🔎 Would archive: " if args.dry_run else "✅ Archived: ") + json.dumps(stats.summary()))
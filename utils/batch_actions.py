@@ -0,0 +1,212 @@
+# utils/batch_actions.py
+
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from db_init import normalize_date
+from diagnostics import span
+from doc_storage import (
+    TransferCancelled, abs_document_path, collect_blob, find_stored_copy, has_blob, move_document, paths_in_use,
+    release_file, retyped_path, store_file,
+)
+
+FILE_WORKERS = 8
+
+
+class BatchResult:
+    def __init__(self, action):
+        self.action = action
+        self.changed = 0
+        self.errors = []  # (doc_id, message)
+
+    def summary(self):
+        text = f"{self.action}: {self.changed} document(s)"
+        if self.errors:
+            text += f", {len(self.errors)} problem(s)"
+        return text
+
+
+def _parallel(fn, items, workers=FILE_WORKERS, progress=None, cancel=None):
+    """
+    Runs fn(item) for every item; returns [(item, result, error)] in input order.
+    progress(done_items) is called as items finish; once cancel is set, items
+    not yet started are skipped with TransferCancelled as their error.
+    """
+    lock = threading.Lock()
+    finished = [0]
+
+    def call(item):
+        if cancel is not None and cancel.is_set():
+            return item, None, TransferCancelled()
+        try:
+            return item, fn(item), None
+        except Exception as e:
+            return item, None, e
+        finally:
+            if progress:
+                with lock:
+                    finished[0] += 1
+                    progress(finished[0])
+
+    if len(items) <= 1:
+        return [call(item) for item in items]
+    with ThreadPoolExecutor(max_workers=min(workers, len(items))) as pool:
+        return list(pool.map(call, items))
+
+
+def add_document(repo, source_path, title, doc_type, doc_class, dt, sender=None, recipient=None, description=None,
+                 progress=None, cancel=None):
+    """
+    Stores the file content-addressed under documents/<type>/ and inserts its
+    row; the row is committed only once the file is durable on disk.
+    Where links aren't possible, content already stored is shared, not copied.
+    Returns the new document id.
+    """
+    if repo.remote:
+        return repo.add_document(source_path, title, doc_type, doc_class, dt, sender, recipient, description,
+                                 progress, cancel)
+
+    with span("file_io.store_file", rows=os.path.getsize(source_path)):
+        relative_path, content_hash, size = store_file(
+            source_path, doc_type, dt, progress, cancel, find_copy=lambda sha256, n: find_stored_copy(repo, sha256, n)
+        )
+    try:
+        return repo.insert_document(
+            title, doc_type, doc_class, normalize_date(dt), normalize_date(dt),
+            sender, recipient, description, relative_path,
+            content_hash=content_hash, size=size if has_blob(content_hash) else None
+        )
+    except sqlite3.Error:
+        # Don't leave an orphaned copy behind (a shared file stays with the rows using it)
+        release_file(repo, relative_path)
+        collect_blob(repo, content_hash)
+        raise
+
+
+def edit_document(repo, doc_id, fields, progress=None, cancel=None):
+    """
+    Updates one document's fields. A type change moves its file into the new
+    folder first (archived documents only get their recorded path changed, and
+    a file other rows share stays where it is); if the update then fails the
+    file is moved back.
+    Raises LookupError if the document is gone.
+    """
+    if repo.remote:
+        return repo.edit_document(doc_id, fields, progress, cancel)
+
+    infos = repo.get_file_infos([doc_id])
+    if not infos:
+        raise LookupError(f"Document {doc_id} no longer exists")
+    _, old_type, old_path, _ = infos[0]
+    new_type = fields.get("doc_type", old_type)
+
+    file_path, moved = old_path, False
+    if new_type != old_type:
+        if repo.get_archive_entry(doc_id) is not None:
+            file_path = retyped_path(old_path, new_type)
+        elif paths_in_use(repo, [old_path], more_than=1):
+            pass
+        else:
+            with span("file_io.move_file"):
+                file_path = move_document(old_path, new_type, progress, cancel)
+            moved = True
+
+    try:
+        return repo.update_document(doc_id, **dict(fields, file_path=file_path))
+    except sqlite3.Error:
+        # Put the file back where the unchanged row expects it
+        if moved:
+            move_document(file_path, old_type)
+        raise
+
+
+def batch_delete(repo, doc_ids, progress=None, cancel=None):
+    """
+    Deletes the rows in one transaction, then their files in parallel.
+    Rows go first so a failure never leaves a row pointing at a missing file;
+    a file that can't be removed is reported (and later found by the integrity check).
+    A file some remaining row still shares is kept.
+    Cancelling only works before the transaction: after it the files must go.
+    """
+    if repo.remote:
+        return repo.batch("delete", doc_ids)
+    result = BatchResult("Deleted")
+    infos = repo.get_file_infos(doc_ids)
+    if cancel is not None and cancel.is_set():
+        raise TransferCancelled()
+    with span("sql.batch_delete", rows=len(infos)):
+        result.changed = repo.delete_documents([info[0] for info in infos])
+    still_used = paths_in_use(repo, [info[2] for info in infos])
+    infos_to_remove = [info for info in infos if info[2] not in still_used]
+
+    def remove(info):
+        path = abs_document_path(info[2])
+        if os.path.exists(path):
+            os.remove(path)
+
+    with span("file_io.batch_delete", rows=len(infos_to_remove)):
+        for info, _, error in _parallel(remove, infos_to_remove, progress=progress):
+            if error is not None:
+                result.errors.append((info[0], f"file not deleted: {error}"))
+    for content_hash in {info[3] for info in infos if info[3]}:
+        collect_blob(repo, content_hash)
+    return result
+
+
+def batch_retype(repo, doc_ids, doc_type, progress=None, cancel=None):
+    """
+    Moves the files into the doc_type folder in parallel, then updates every
+    moved row in one transaction. If that transaction fails the files are moved back.
+    Cancelling skips the moves not yet started; the ones already made are still recorded.
+    """
+    if repo.remote:
+        return repo.batch("retype", doc_ids, doc_type)
+    result = BatchResult(f"Moved to {doc_type}")
+    infos = [info for info in repo.get_file_infos(doc_ids) if info[1] != doc_type]
+
+    # Archived documents have no loose file to move; only their recorded path changes
+    archived = repo.archived_ids([info[0] for info in infos])
+    changes = {
+        info[0]: {"doc_type": doc_type, "file_path": retyped_path(info[2], doc_type)}
+        for info in infos if info[0] in archived
+    }
+    # A file other rows share stays where it is; only the type changes
+    shared = paths_in_use(repo, [info[2] for info in infos if info[0] not in archived], more_than=1)
+    changes.update({info[0]: {"doc_type": doc_type} for info in infos if info[2] in shared and info[0] not in archived})
+    infos = [info for info in infos if info[0] not in archived and info[2] not in shared]
+
+    with span("file_io.batch_move", rows=len(infos)):
+        moves = _parallel(lambda info: move_document(info[2], doc_type), infos, progress=progress, cancel=cancel)
+    for info, new_path, error in moves:
+        if isinstance(error, TransferCancelled):
+            result.errors.append((info[0], "cancelled"))
+        elif error is not None:
+            result.errors.append((info[0], f"file not moved: {error}"))
+        else:
+            changes[info[0]] = {"doc_type": doc_type, "file_path": new_path}
+
+    try:
+        with span("sql.batch_update", rows=len(changes)):
+            result.changed = repo.update_documents(changes) if changes else 0
+    except sqlite3.Error:
+        originals = {info[0]: info for info in infos}
+        moved = [doc_id for doc_id in changes if doc_id in originals]
+        _parallel(lambda doc_id: move_document(changes[doc_id]["file_path"], originals[doc_id][1]), moved)
+        raise
+    return result
+
+
+def batch_reclassify(repo, doc_ids, doc_class, progress=None, cancel=None):
+    # A single UPDATE: nothing to report progress on or to cancel
+    if repo.remote:
+        return repo.batch("reclassify", doc_ids, doc_class)
+    result = BatchResult(f"Reclassified as {doc_class}")
+    with span("sql.batch_update", rows=len(doc_ids)):
+        result.changed = repo.update_documents({doc_id: {"doc_class": doc_class} for doc_id in doc_ids})
+    return result
+
+
+# Batch actions by name, for the document server
+BATCH_ACTIONS = {"delete": batch_delete, "retype": batch_retype, "reclassify": batch_reclassify}
@@ -0,0 +1,232 @@
+# utils/bulk_import.py
+
+import csv
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from db_init import init_db, normalize_date
+from doc_repository import get_repository
+from doc_storage import FOLDER_MAP, collect_blob, find_stored_copy, has_blob, release_file, store_file
+
+# 🔐 Paths
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DB_PATH = os.path.join(BASE_DIR, "db", "document_store.db")
+
+MANIFEST_FIELDS = ["file", "title", "doc_type", "doc_class", "date", "sender", "recipient", "description"]
+
+
+def read_manifest(manifest_path):
+    """
+    Yields one dict per document. CSV needs a header row with MANIFEST_FIELDS;
+    JSON is a list of objects with the same keys. `file` is relative to the source dir.
+    """
+    if manifest_path.lower().endswith(".json"):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        yield from (data["documents"] if isinstance(data, dict) else data)
+    else:
+        with open(manifest_path, "r", encoding="utf-8-sig", newline="") as f:
+            yield from csv.DictReader(f)
+
+
+def batched(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class Checkpoint:
+    """
+    Manifest `file` keys already committed under one import name. They live
+    in import_keys and are written in the same transaction as their rows, so
+    a crash can't leave a batch imported but unrecorded. A checkpoint file
+    left by an older version of this script is still honoured.
+    """
+
+    def __init__(self, repo, name, legacy_path=None):
+        self.name = name
+        rows = repo.query("SELECT file_key FROM import_keys WHERE import_name = ?", (name,))
+        self.done = {row[0] for row in rows}
+        if legacy_path and os.path.exists(legacy_path):
+            with open(legacy_path, "r", encoding="utf-8") as f:
+                self.done |= {line.rstrip("\n") for line in f if line.strip()}
+
+
+class ImportStats:
+    def __init__(self):
+        self.imported = 0
+        self.bytes = 0
+        self.skipped = 0
+        self.failed = []
+        self.started = time.perf_counter()
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        return {
+            "imported": self.imported,
+            "skipped": self.skipped,
+            "failed": len(self.failed),
+            "bytes": self.bytes,
+            "elapsed_s": round(elapsed, 2),
+            "files_per_s": round(self.imported / elapsed, 1) if elapsed else 0.0,
+            "mb_per_s": round(self.bytes / elapsed / 1_000_000, 2) if elapsed else 0.0,
+        }
+
+
+def text(entry, name):
+    # JSON manifests may hold numbers or null where CSV has strings; anything else is an invalid entry
+    value = entry.get(name)
+    if value is None:
+        return ""
+    if isinstance(value, (bool, dict, list)):
+        raise ValueError(f"{name} must be text")
+    return str(value).strip()
+
+
+def prepare(entry, source_dir):
+    # Validates one manifest entry and returns the row to insert (without file_path)
+    if not isinstance(entry, dict):
+        raise ValueError("entry must be an object")
+    key = text(entry, "file")
+    source_path = os.path.join(source_dir, key)
+    title = text(entry, "title")
+    doc_type = text(entry, "doc_type").lower()
+
+    if not key or not os.path.isfile(source_path):
+        raise ValueError("file not found")
+    if not title:
+        raise ValueError("missing title")
+    if doc_type not in FOLDER_MAP:
+        raise ValueError(f"unrecognized document type: {doc_type}")
+
+    # Fall back to the scan's modification time when the manifest has no date
+    raw_date = text(entry, "date")
+    date_ts = normalize_date(raw_date) if raw_date else normalize_date(datetime.fromtimestamp(os.path.getmtime(source_path)))
+    if date_ts is None:
+        raise ValueError(f"unparseable date: {raw_date}")
+
+    return {
+        "key": key,
+        "source_path": source_path,
+        "title": title,
+        "doc_type": doc_type,
+        "doc_class": (text(entry, "doc_class") or "others").lower(),
+        "date": raw_date or date_ts,
+        "date_ts": date_ts,
+        "sender": text(entry, "sender") or None,
+        "recipient": text(entry, "recipient") or None,
+        "description": text(entry, "description"),
+    }
+
+
+def copy_one(doc, repo):
+    dt = datetime.strptime(doc["date_ts"], "%Y-%m-%d %H:%M:%S")
+    try:
+        doc["file_path"], doc["content_hash"], doc["size"] = store_file(
+            doc["source_path"], doc["doc_type"], dt, find_copy=lambda sha256, size: find_stored_copy(repo, sha256, size)
+        )
+    finally:
+        repo.release_connection()  # pool threads outlive the import's repository use
+    doc["blob"] = has_blob(doc["content_hash"])
+    return doc
+
+
+def insert_batch(repo, docs, import_name):
+    # The rows and their manifest keys commit together: a resumed import never inserts a batch twice
+    def insert(conn):
+        conn.executemany(
+            "INSERT OR IGNORE INTO blobs (sha256, size) VALUES (?, ?)",
+            [(d["content_hash"], d["size"]) for d in docs if d["blob"]]
+        )
+        for d in docs:
+            doc_id = conn.execute('''
+                INSERT INTO documents (title, doc_type, doc_class, date, date_ts, sender, recipient, description, file_path, content_hash)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (d["title"], d["doc_type"], d["doc_class"], d["date"], d["date_ts"],
+                  d["sender"], d["recipient"], d["description"], d["file_path"], d["content_hash"])).lastrowid
+            conn.execute("INSERT INTO import_keys (import_name, file_key, doc_id) VALUES (?, ?, ?)",
+                         (import_name, d["key"], doc_id))
+    repo.write(insert)
+    repo.forget_counts()
+
+
+def run_import(source_dir, manifest_path, workers=8, batch_size=500, import_name=None, db_path=DB_PATH):
+    """
+    Imports every manifest entry not yet committed under import_name
+    (default: the manifest's absolute path), so an interrupted run can
+    simply be started again.
+    """
+    repo = get_repository(db_path)
+    checkpoint = Checkpoint(repo, import_name or os.path.abspath(manifest_path), manifest_path + ".checkpoint")
+    stats = ImportStats()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for batch in batched(read_manifest(manifest_path), batch_size):
+            docs = []
+            for entry in batch:
+                try:
+                    doc = prepare(entry, source_dir)
+                except ValueError as e:
+                    stats.failed.append((entry.get("file") if isinstance(entry, dict) else entry, str(e)))
+                    continue
+                if doc["key"] in checkpoint.done:
+                    stats.skipped += 1
+                    continue
+                checkpoint.done.add(doc["key"])  # a key listed twice is imported once
+                docs.append(doc)
+
+            # 📁 Copy the batch in parallel; failures are reported, not fatal
+            copied = []
+            futures = [(doc, pool.submit(copy_one, doc, repo)) for doc in docs]
+            for doc, future in futures:
+                try:
+                    copied.append(future.result())
+                except OSError as e:
+                    stats.failed.append((doc["key"], f"copy failed: {e}"))
+            if not copied:
+                continue
+
+            # 🗃️ One transaction per batch, recording its keys as done
+            try:
+                insert_batch(repo, copied, checkpoint.name)
+            except Exception:
+                for doc in copied:
+                    release_file(repo, doc["file_path"])
+                    collect_blob(repo, doc["content_hash"])
+                raise
+
+            stats.imported += len(copied)
+            stats.bytes += sum(doc["size"] for doc in copied)
+            print(f"📦 {stats.imported} imported ({stats.summary()['files_per_s']} files/s)")
+
+    return stats
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Bulk-import scanned documents described by a CSV/JSON manifest.")
+    parser.add_argument("source_dir", help="Folder the manifest's `file` paths are relative to")
+    parser.add_argument("manifest", help=f"CSV or JSON manifest with: {', '.join(MANIFEST_FIELDS)}")
+    parser.add_argument("--workers", type=int, default=8, help="Parallel file copies (default: 8)")
+    parser.add_argument("--batch-size", type=int, default=500, help="Rows per transaction (default: 500)")
+    parser.add_argument("--name", default=None,
+                        help="Name the committed keys are recorded under, to resume from (default: the manifest's path)")
+    args = parser.parse_args()
+
+    init_db()
+    stats = run_import(args.source_dir, args.manifest, args.workers, args.batch_size, args.name)
+
+    for key, reason in stats.failed[:20]:
+        print(f"⚠️ {key}: {reason}")
+    if len(stats.failed) > 20:
+        print(f"⚠️ ... and {len(stats.failed) - 20} more")
+    print("✅ Bulk import finished:", json.dumps(stats.summary()))
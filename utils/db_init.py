@@ -1,31 +1,427 @@
 # utils/db_init.py
 import sqlite3
 import os
+from datetime import datetime
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DB_PATH = os.path.join(BASE_DIR, "db", "document_store.db")
 
+DATE_FORMATS = [
+    "%Y-%m-%d %H:%M:%S",
+    "%Y-%m-%d %H:%M:%S.%f",
+    "%Y-%m-%dT%H:%M:%S",
+    "%Y-%m-%d %H:%M",
+    "%Y-%m-%d",
+    "%m/%d/%Y %H:%M:%S",
+    "%m/%d/%Y %H:%M",
+    "%m/%d/%Y",
+    "%B %d, %Y",
+    "%b %d, %Y",
+]
+
+
+def normalize_date(value):
+    """
+    Returns a sortable 'YYYY-MM-DD HH:MM:SS' string for date_ts,
+    or None when the value can't be parsed.
+    """
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    text = str(value or "").strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).strftime("%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            continue
+    return None
+
+
+# 🧬 Migrations: MIGRATIONS[n] upgrades a database from user_version n to n + 1.
+# Never edit a released migration; append a new one instead.
+
+def _migrate_base_table(cursor):
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS documents (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            doc_type TEXT NOT NULL,
+            doc_class TEXT NULL,
+            description TEXT NOT NULL,
+            date TEXT NOT NULL,
+            sender TEXT,
+            recipient TEXT,
+            file_path TEXT NOT NULL
+        )
+    ''')
+
+
+def _migrate_sort_indexes(cursor):
+    # Indexes backing the dashboard's keyset pagination and sort options
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_documents_title ON documents(title COLLATE NOCASE, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_documents_sender ON documents(IFNULL(sender, '') COLLATE NOCASE, id)")
+
+
+def _migrate_search_index(cursor):
+    # Full-text search index, kept in sync with the table by triggers
+    fts_exists = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'documents_fts'"
+    ).fetchone()
+    create_search_index(cursor)
+    if not fts_exists:
+        cursor.execute("INSERT INTO documents_fts(documents_fts) VALUES ('rebuild')")
+
+
+def _migrate_body_index(cursor):
+    # Body-text index filled in the background by text_indexer
+    create_body_index(cursor)
+
+
+def _migrate_date_ts(cursor):
+    # `date` holds whatever text was typed; date_ts is the normalized sort key.
+    # Unparseable dates get '' so they sort last and stay reachable by keyset paging.
+    columns = [row[1] for row in cursor.execute("PRAGMA table_info(documents)")]
+    if "date_ts" not in columns:
+        cursor.execute("ALTER TABLE documents ADD COLUMN date_ts TEXT NOT NULL DEFAULT ''")
+
+    rows = cursor.execute("SELECT id, date FROM documents").fetchall()
+    cursor.executemany(
+        "UPDATE documents SET date_ts = ? WHERE id = ?",
+        [(normalize_date(date) or "", doc_id) for doc_id, date in rows]
+    )
+
+    cursor.execute("DROP INDEX IF EXISTS idx_documents_date")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_documents_date_ts ON documents(date_ts, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_documents_type_date ON documents(doc_type, date_ts, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_documents_class_date ON documents(doc_class, date_ts, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_documents_type_class_date ON documents(doc_type, doc_class, date_ts, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_documents_type_title ON documents(doc_type, title COLLATE NOCASE, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_documents_type_sender ON documents(doc_type, IFNULL(sender, '') COLLATE NOCASE, id)")
+
+
+def _migrate_content_store(cursor):
+    # Content-addressed blobs under documents/.store; ref_count follows documents.content_hash
+    columns = [row[1] for row in cursor.execute("PRAGMA table_info(documents)")]
+    if "content_hash" not in columns:
+        cursor.execute("ALTER TABLE documents ADD COLUMN content_hash TEXT")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_documents_content_hash ON documents(content_hash)")
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS blobs (
+            sha256 TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            ref_count INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS blobs_ref_ai AFTER INSERT ON documents
+        WHEN new.content_hash IS NOT NULL BEGIN
+            UPDATE blobs SET ref_count = ref_count + 1 WHERE sha256 = new.content_hash;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS blobs_ref_ad AFTER DELETE ON documents
+        WHEN old.content_hash IS NOT NULL BEGIN
+            UPDATE blobs SET ref_count = ref_count - 1 WHERE sha256 = old.content_hash;
+            DELETE FROM blobs WHERE sha256 = old.content_hash AND ref_count <= 0;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS blobs_ref_au AFTER UPDATE OF content_hash ON documents
+        WHEN old.content_hash IS NOT new.content_hash BEGIN
+            UPDATE blobs SET ref_count = ref_count + 1 WHERE sha256 = new.content_hash;
+            UPDATE blobs SET ref_count = ref_count - 1 WHERE sha256 = old.content_hash;
+            DELETE FROM blobs WHERE sha256 = old.content_hash AND ref_count <= 0;
+        END
+    ''')
+
+
+def _migrate_change_feed(cursor):
+    # Every insert/update/delete on documents appends its id here, so open
+    # dashboards (in any process) can patch just the affected cards
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS document_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            doc_id INTEGER NOT NULL,
+            op TEXT NOT NULL,
+            changed_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_document_changes_changed_at ON document_changes(changed_at)")
+    for op, event, row in (("insert", "INSERT", "new"), ("update", "UPDATE", "new"), ("delete", "DELETE", "old")):
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS document_changes_{op} AFTER {event} ON documents BEGIN
+                INSERT INTO document_changes (doc_id, op) VALUES ({row}.id, '{op}');
+            END
+        ''')
+
+
+def _migrate_archive_packs(cursor):
+    # Old documents packed into zip files under documents/.archive, one row per pack
+    # and one per archived document; the rows in documents stay as they are
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS archive_packs (
+            id INTEGER PRIMARY KEY,
+            file_name TEXT NOT NULL UNIQUE,
+            members INTEGER NOT NULL,
+            bytes INTEGER NOT NULL,
+            created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS archived_documents (
+            doc_id INTEGER PRIMARY KEY,
+            pack_id INTEGER NOT NULL,
+            member TEXT NOT NULL,
+            size INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_archived_documents_pack ON archived_documents(pack_id)")
+    # Archiving checks whether any unarchived row still uses a file before removing it
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_documents_file_path ON documents(file_path)")
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS archived_documents_ad AFTER DELETE ON documents BEGIN
+            DELETE FROM archived_documents WHERE doc_id = old.id;
+        END
+    ''')
+
+
+def _migrate_facet_counts(cursor):
+    # Rows per (doc_type, doc_class), kept by triggers: unsearched counts without scanning documents.
+    # A NULL class is counted under '' so the pair can be a primary key.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS facet_counts (
+            doc_type TEXT NOT NULL,
+            doc_class TEXT NOT NULL,
+            n INTEGER NOT NULL,
+            PRIMARY KEY (doc_type, doc_class)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute("DELETE FROM facet_counts")
+    cursor.execute('''
+        INSERT INTO facet_counts (doc_type, doc_class, n)
+        SELECT doc_type, IFNULL(doc_class, ''), COUNT(*) FROM documents GROUP BY 1, 2
+    ''')
+    add = '''
+            INSERT INTO facet_counts (doc_type, doc_class, n) VALUES (new.doc_type, IFNULL(new.doc_class, ''), 1)
+            ON CONFLICT (doc_type, doc_class) DO UPDATE SET n = n + 1;
+    '''
+    remove = '''
+            UPDATE facet_counts SET n = n - 1 WHERE doc_type = old.doc_type AND doc_class = IFNULL(old.doc_class, '');
+            DELETE FROM facet_counts WHERE doc_type = old.doc_type AND doc_class = IFNULL(old.doc_class, '') AND n <= 0;
+    '''
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS facet_counts_ai AFTER INSERT ON documents BEGIN {add} END")
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS facet_counts_ad AFTER DELETE ON documents BEGIN {remove} END")
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS facet_counts_au AFTER UPDATE OF doc_type, doc_class ON documents
+        WHEN old.doc_type IS NOT new.doc_type OR old.doc_class IS NOT new.doc_class BEGIN {remove} {add} END
+    ''')
+
+
+def _migrate_date_buckets(cursor):
+    # Rows per (month, doc_type, doc_class) for the timeline, kept by triggers like facet_counts.
+    # month is substr(date_ts, 1, 7); unparseable dates ('') get the month ''.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS date_buckets (
+            month TEXT NOT NULL,
+            doc_type TEXT NOT NULL,
+            doc_class TEXT NOT NULL,
+            n INTEGER NOT NULL,
+            PRIMARY KEY (month, doc_type, doc_class)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute("DELETE FROM date_buckets")
+    cursor.execute('''
+        INSERT INTO date_buckets (month, doc_type, doc_class, n)
+        SELECT substr(date_ts, 1, 7), doc_type, IFNULL(doc_class, ''), COUNT(*) FROM documents GROUP BY 1, 2, 3
+    ''')
+    add = '''
+            INSERT INTO date_buckets (month, doc_type, doc_class, n)
+            VALUES (substr(new.date_ts, 1, 7), new.doc_type, IFNULL(new.doc_class, ''), 1)
+            ON CONFLICT (month, doc_type, doc_class) DO UPDATE SET n = n + 1;
+    '''
+    match_old = "month = substr(old.date_ts, 1, 7) AND doc_type = old.doc_type AND doc_class = IFNULL(old.doc_class, '')"
+    remove = f'''
+            UPDATE date_buckets SET n = n - 1 WHERE {match_old};
+            DELETE FROM date_buckets WHERE {match_old} AND n <= 0;
+    '''
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS date_buckets_ai AFTER INSERT ON documents BEGIN {add} END")
+    cursor.execute(f"CREATE TRIGGER IF NOT EXISTS date_buckets_ad AFTER DELETE ON documents BEGIN {remove} END")
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS date_buckets_au AFTER UPDATE OF date_ts, doc_type, doc_class ON documents
+        WHEN substr(old.date_ts, 1, 7) IS NOT substr(new.date_ts, 1, 7)
+            OR old.doc_type IS NOT new.doc_type OR old.doc_class IS NOT new.doc_class
+        BEGIN {remove} {add} END
+    ''')
+
+
+def _migrate_integrity_state(cursor):
+    # file_manifest caches each file's hash by (size, mtime) so integrity checks only re-hash changed files;
+    # flagged_documents holds the rows the last repair found missing or corrupt
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS file_manifest (
+            path TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mtime REAL NOT NULL,
+            sha256 TEXT NOT NULL,
+            checked_at TEXT NOT NULL
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS flagged_documents (
+            doc_id INTEGER PRIMARY KEY,
+            issue TEXT NOT NULL,
+            detected_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS flagged_documents_ad AFTER DELETE ON documents BEGIN
+            DELETE FROM flagged_documents WHERE doc_id = old.id;
+        END
+    ''')
+
+
+def _migrate_import_keys(cursor):
+    # Manifest keys bulk_import has committed, written in the same transaction as their rows
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS import_keys (
+            import_name TEXT NOT NULL,
+            file_key TEXT NOT NULL,
+            doc_id INTEGER NOT NULL,
+            PRIMARY KEY (import_name, file_key)
+        ) WITHOUT ROWID
+    ''')
+
+
+MIGRATIONS = [
+    _migrate_base_table,
+    _migrate_sort_indexes,
+    _migrate_search_index,
+    _migrate_body_index,
+    _migrate_date_ts,
+    _migrate_content_store,
+    _migrate_change_feed,
+    _migrate_archive_packs,
+    _migrate_facet_counts,
+    _migrate_date_buckets,
+    _migrate_integrity_state,
+    _migrate_import_keys,
+]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
 def init_db():
-    with sqlite3.connect(DB_PATH) as conn:
+    conn = sqlite3.connect(DB_PATH, timeout=30, isolation_level=None)
+    try:
         cursor = conn.cursor()
 
-        # ✅ Enable WAL mode
+        # ✅ Schema already current: nothing to do
+        if cursor.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION:
+            return
+
+        # ✅ Enable WAL mode (persistent, must be set outside a transaction)
         cursor.execute("PRAGMA journal_mode=WAL;")
 
-        # ✅ Create table if it doesn't exist
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS documents (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                title TEXT NOT NULL,
-                doc_type TEXT NOT NULL,
-                doc_class TEXT NULL,
-                description TEXT NOT NULL,
-                date TEXT NOT NULL,
-                sender TEXT,
-                recipient TEXT,
-                file_path TEXT NOT NULL
-            )
-        ''')
+        # ✅ Each migration runs in its own transaction together with its version bump.
+        # The version is re-read under the write lock in case another process migrated first.
+        while True:
+            cursor.execute("BEGIN IMMEDIATE")
+            version = cursor.execute("PRAGMA user_version").fetchone()[0]
+            if version >= SCHEMA_VERSION:
+                cursor.execute("COMMIT")
+                break
+            try:
+                MIGRATIONS[version](cursor)
+                cursor.execute(f"PRAGMA user_version = {version + 1}")
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+            print(f"🧬 Applied migration {version + 1}: {MIGRATIONS[version].__name__}")
+
+        cursor.execute("PRAGMA optimize")
+    finally:
+        conn.close()
+
+    print("✅ Database initialized at:", DB_PATH)
+
+
+def create_search_index(cursor):
+    # External-content FTS5 table: stores only the index, rows live in documents
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS documents_fts USING fts5(
+            title, sender, recipient, description,
+            content='documents', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS documents_fts_ai AFTER INSERT ON documents BEGIN
+            INSERT INTO documents_fts(rowid, title, sender, recipient, description)
+            VALUES (new.id, new.title, new.sender, new.recipient, new.description);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS documents_fts_ad AFTER DELETE ON documents BEGIN
+            INSERT INTO documents_fts(documents_fts, rowid, title, sender, recipient, description)
+            VALUES ('delete', old.id, old.title, old.sender, old.recipient, old.description);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS documents_fts_au AFTER UPDATE OF title, sender, recipient, description ON documents BEGIN
+            INSERT INTO documents_fts(documents_fts, rowid, title, sender, recipient, description)
+            VALUES ('delete', old.id, old.title, old.sender, old.recipient, old.description);
+            INSERT INTO documents_fts(rowid, title, sender, recipient, description)
+            VALUES (new.id, new.title, new.sender, new.recipient, new.description);
+        END
+    ''')
+
+
+def create_body_index(cursor):
+    # Text extracted from the stored files; rowid is documents.id
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS document_body_fts USING fts5(
+            body,
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+    ''')
+    # (mtime, size) of each file when it was last extracted
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS document_text_state (
+            doc_id INTEGER PRIMARY KEY,
+            mtime REAL NOT NULL,
+            size INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            indexed_at TEXT NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS document_body_ad AFTER DELETE ON documents BEGIN
+            DELETE FROM document_body_fts WHERE rowid = old.id;
+            DELETE FROM document_text_state WHERE doc_id = old.id;
+        END
+    ''')
+
+
+def rebuild_search_index():
+    with sqlite3.connect(DB_PATH) as conn:
+        cursor = conn.cursor()
+        create_search_index(cursor)
+        cursor.execute("INSERT INTO documents_fts(documents_fts) VALUES ('rebuild')")
+        cursor.execute("INSERT INTO documents_fts(documents_fts) VALUES ('optimize')")
         conn.commit()
 
-    print("✅ Database initialized at:", DB_PATH)
\ No newline at end of file
+    print("🔎 Search index rebuilt.")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Initialize or maintain the DocHive database.")
+    parser.add_argument("--rebuild-search", action="store_true", help="Rebuild the full-text search index")
+    args = parser.parse_args()
+
+    init_db()
+    if args.rebuild_search:
+        rebuild_search_index()
@@ -0,0 +1,155 @@
+# utils/diagnostics.py
+
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+# 🔐 Paths
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LOG_PATH = os.path.join(BASE_DIR, "logs", "diagnostics.jsonl")
+
+WINDOW = 500  # samples kept per span name
+LOG_MAX_BYTES = 2 * 1024 * 1024
+LOG_BACKUPS = 3
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class Histogram:
+    """Rolling window of the last WINDOW durations (ms) and row counts for one span name."""
+
+    def __init__(self, window=WINDOW):
+        self.durations = deque(maxlen=window)
+        self.rows = deque(maxlen=window)
+        self.calls = 0
+        self.total_ms = 0.0
+
+    def record(self, ms, rows=None):
+        self.durations.append(ms)
+        if rows is not None:
+            self.rows.append(rows)
+        self.calls += 1
+        self.total_ms += ms
+
+    def summary(self):
+        values = sorted(self.durations)
+        return {
+            "calls": self.calls,
+            "total_ms": round(self.total_ms, 1),
+            "p50_ms": round(percentile(values, 50), 2),
+            "p95_ms": round(percentile(values, 95), 2),
+            "max_ms": round(values[-1], 2) if values else 0.0,
+            "avg_rows": round(sum(self.rows) / len(self.rows), 1) if self.rows else None,
+        }
+
+
+# 🗂️ Span names are "<category>.<what>", category one of sql, widgets, file_io, ui or http
+# (ui and http spans are end-to-end and overlap the others; http is the document server's requests)
+
+class Span:
+    # Yielded by span(); set .rows inside the block to record how much work it did
+    __slots__ = ("name", "rows")
+
+    def __init__(self, name):
+        self.name = name
+        self.rows = None
+
+
+class Timings:
+    """
+    Thread-safe registry of span histograms. Recording is a perf_counter pair,
+    a lock and a deque append, cheap enough to leave on in production.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._logger = None
+
+    @contextmanager
+    def span(self, name, rows=None):
+        current = Span(name)
+        current.rows = rows
+        started = time.perf_counter()
+        try:
+            yield current
+        finally:
+            self.record(name, (time.perf_counter() - started) * 1000, current.rows)
+
+    def timed(self, name):
+        # Decorator form of span()
+        def decorate(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def record(self, name, ms, rows=None):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.record(ms, rows)
+            logger = self._logger
+        if logger is not None:
+            logger.info(json.dumps({
+                "ts": round(time.time(), 3), "span": name, "ms": round(ms, 3), "rows": rows,
+                "thread": threading.current_thread().name,
+            }))
+
+    def snapshot(self):
+        # {name: summary}, plus per-category totals so SQL vs widgets vs file I/O is one glance
+        with self._lock:
+            spans = {name: h.summary() for name, h in sorted(self._histograms.items())}
+        categories = {}
+        for name, summary in spans.items():
+            category = name.split(".", 1)[0]
+            categories[category] = round(categories.get(category, 0.0) + summary["total_ms"], 1)
+        return {"spans": spans, "categories": categories}
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def enable_log(self, path=LOG_PATH, max_bytes=LOG_MAX_BYTES, backups=LOG_BACKUPS):
+        # One JSON object per span, rotated at max_bytes
+        if self._logger is not None:
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        logger = logging.getLogger("dms.diagnostics")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        self._logger = logger
+
+    def disable_log(self):
+        logger, self._logger = self._logger, None
+        if logger is not None:
+            for handler in list(logger.handlers):
+                logger.removeHandler(handler)
+                handler.close()
+
+    @property
+    def logging_enabled(self):
+        return self._logger is not None
+
+
+# One registry per process
+timings = Timings()
+span = timings.span
+timed = timings.timed
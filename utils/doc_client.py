@@ -0,0 +1,370 @@
+# utils/doc_client.py
+
+import http.client
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from urllib.parse import urlencode, urlsplit
+
+from batch_actions import BatchResult
+from doc_query import DEFAULT_SORT
+from doc_storage import COPY_CHUNK_SIZE, TransferCancelled
+
+# 🔐 Paths
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DOWNLOAD_DIR = os.path.join(BASE_DIR, "cache", "remote")
+
+TIMEOUT = 30
+TOKEN_TTL = 0.25  # seconds a fetched change token is trusted without asking again
+CACHE_ENTRIES = 256
+MAX_DOWNLOAD_BYTES = 512 * 1024 * 1024  # local copies of opened files, evicted LRU
+REUSE_IDLE_S = 50  # reconnect rather than reuse a connection the server may be about to drop (its timeout is 60)
+RETRY_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+# The dashboard's existing handlers keep working: server errors come back as the exceptions a local repository raises
+ERROR_KINDS = {"database": sqlite3.OperationalError, "not_found": LookupError, "invalid": ValueError, "conflict": FileExistsError}
+
+
+class ServerError(Exception):
+    def __init__(self, status, message):
+        super().__init__(f"{message} (HTTP {status})")
+        self.status = status
+
+
+class RemoteRepository:
+    """
+    The parts of DocumentRepository the dashboard uses, served by a
+    doc_server.DocumentServer. Each thread keeps one HTTP/1.1 connection
+    open. GET results are cached with their ETag, which is the server's
+    change token: for TOKEN_TTL after the token was last seen a cached result
+    is returned without a request, after that it is revalidated (a 304 costs
+    the server no query).
+    """
+
+    remote = True
+
+    def __init__(self, url, token=None, timeout=TIMEOUT, cache_entries=CACHE_ENTRIES):
+        parts = urlsplit(url)
+        if parts.scheme != "http" or not parts.hostname:
+            raise ValueError(f"Document server URL must look like http://host:port, not {url!r}")
+        self.url = url
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.auth = token
+        self.timeout = timeout
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+        # 🧠 url -> (etag, data), most recently used last
+        self._cache = OrderedDict()
+        self._cache_entries = cache_entries
+        self._token = None  # (token, fetched_at)
+        self.requests = 0
+        self.cache_hits = 0
+        self.not_modified = 0
+
+    # 🔌 Connections
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and time.monotonic() - self._local.used > REUSE_IDLE_S:
+            conn.close()
+            conn = None
+        if conn is None:
+            conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _headers(self, extra=None):
+        headers = dict(extra or {})
+        if self.auth:
+            headers["Authorization"] = f"Bearer {self.auth}"
+        return headers
+
+    def _send(self, method, url, body=None, headers=None):
+        """
+        Returns the response to one request, body unread. A kept-alive
+        connection the server has already closed fails on first use, so
+        requests that are safe to repeat are retried once on a fresh one.
+        """
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request(method, url, body=body, headers=self._headers(headers))
+                response = conn.getresponse()
+            except RETRY_ERRORS:
+                conn.close()
+                if attempt or method not in ("GET", "DELETE"):
+                    raise
+                continue
+            self._local.used = time.monotonic()
+            self.requests += 1
+            return response
+
+    def _read(self, response):
+        body = response.read()
+        if response.status < 400:
+            return json.loads(body) if body else None
+        try:
+            error = json.loads(body)
+        except ValueError:
+            error = {"error": body.decode("utf-8", "replace") or response.reason}
+        kind = ERROR_KINDS.get(error.get("kind"))
+        if kind is not None:
+            raise kind(error["error"])
+        raise ServerError(response.status, error["error"])
+
+    def _call(self, method, path, query=None, data=None):
+        url = path + (f"?{urlencode(query)}" if query else "")
+        body, headers = None, None
+        if data is not None:
+            body = json.dumps(data).encode()
+            headers = {"Content-Type": "application/json"}
+        result = self._read(self._send(method, url, body, headers))
+        if method != "GET":
+            self._token = None  # our own write: the next read asks the server
+        return result
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    def release_connection(self):
+        # For short-lived threads (batch actions): close this thread's connection before it exits
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            with self._lock:
+                self._connections.remove(conn)
+            self._local.conn = None
+            conn.close()
+
+    def interrupt(self, thread):
+        # A running request can't be aborted; the query executor drops its result instead
+        pass
+
+    # 🧠 Response cache
+
+    def change_token(self):
+        token = self._token
+        if token is not None and time.monotonic() - token[1] < TOKEN_TTL:
+            return token[0]
+        return self._fetch_version()["token"]
+
+    def _fetch_version(self):
+        version = self._call("GET", "/api/version")
+        self._token = (version["token"], time.monotonic())
+        return version
+
+    def _get(self, path, query):
+        url = f"{path}?{urlencode(query)}"
+        with self._lock:
+            entry = self._cache.get(url)
+        token = self._token
+        if entry is not None and token is not None and entry[0] == token[0] \
+                and time.monotonic() - token[1] < TOKEN_TTL:
+            self.cache_hits += 1
+            with self._lock:
+                self._cache.move_to_end(url)
+            return entry[1]
+
+        response = self._send("GET", url, headers={"If-None-Match": entry[0]} if entry else None)
+        if response.status == 304:
+            response.read()
+            self.not_modified += 1
+            data = entry[1]
+        else:
+            data = self._read(response)
+        etag = response.getheader("ETag")
+        self._token = (etag, time.monotonic())
+        with self._lock:
+            self._cache[url] = (etag, data)
+            self._cache.move_to_end(url)
+            while len(self._cache) > self._cache_entries:
+                self._cache.popitem(last=False)
+        return data
+
+    def clear_cache(self):
+        with self._lock:
+            self._cache.clear()
+        self._token = None
+
+    def stats(self):
+        return {"requests": self.requests, "cache_hits": self.cache_hits, "not_modified": self.not_modified}
+
+    # 📖 Reads
+
+    def latest_change(self):
+        return self._fetch_version()["latest_change"]
+
+    def changes_since(self, seq):
+        data = self._call("GET", "/api/changes", {"since": seq})
+        return set(data["doc_ids"]), data["latest"], data["complete"]
+
+    def fetch_page_and_count(self, filters, sort=DEFAULT_SORT, cursor=None, limit=10, offset=0):
+        query = filter_query(filters)
+        query.update(sort=sort, limit=limit, offset=offset)
+        if cursor is not None:
+            query["cursor"] = json.dumps(cursor)
+        data = self._get("/api/documents", query)
+        next_cursor = tuple(data["next_cursor"]) if data["next_cursor"] else None
+        return [tuple(row) for row in data["rows"]], next_cursor, data["total"]
+
+    def count(self, filters):
+        return self._get("/api/count", filter_query(filters))["total"]
+
+    def cached_count(self, filters):
+        # count() is answered from the response cache when nothing changed
+        return None
+
+    def facet_counts(self, filters):
+        data = self._get("/api/facets", filter_query(filters))
+        return {(doc_type, doc_class): n for doc_type, doc_class, n in data["counts"]}
+
+    def timeline_counts(self, filters):
+        return self._get("/api/timeline", filter_query(filters))["counts"]
+
+    def fetch_matching(self, filters, doc_ids):
+        data = self._call("POST", "/api/matching", data={"filters": filters["inputs"], "ids": sorted(doc_ids)})
+        return [tuple(row) for row in data["rows"]]
+
+    def prune_changes(self):
+        return 0  # the server prunes its own change feed
+
+    # ✍️ Writes
+
+    def add_document(self, source_path, title, doc_type, doc_class, dt, sender=None, recipient=None, description=None,
+                     progress=None, cancel=None):
+        # Uploads the file as the request body in COPY_CHUNK_SIZE pieces, reporting progress like a local copy
+        query = {
+            "title": title, "type": doc_type, "class": doc_class, "date": dt.strftime("%Y-%m-%d %H:%M:%S"),
+            "sender": sender or "", "recipient": recipient or "", "description": description or "",
+            "name": os.path.basename(source_path),
+        }
+        conn = self._connection()
+        try:
+            with open(source_path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                conn.putrequest("POST", f"/api/documents?{urlencode(query)}")
+                for name, value in self._headers({"Content-Type": "application/octet-stream", "Content-Length": size}).items():
+                    conn.putheader(name, value)
+                conn.endheaders()
+                done = 0
+                try:
+                    while True:
+                        if cancel is not None and cancel.is_set():
+                            raise TransferCancelled()
+                        chunk = f.read(COPY_CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        conn.send(chunk)
+                        done += len(chunk)
+                        if progress:
+                            progress(done)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the server rejected the upload early; its reply says why
+            response = conn.getresponse()
+        except BaseException:
+            conn.close()  # the server drops a short upload
+            raise
+        self._local.used = time.monotonic()
+        self.requests += 1
+        self._token = None
+        return self._read(response)["id"]
+
+    def edit_document(self, doc_id, fields, progress=None, cancel=None):
+        # The server derives date_ts from date and moves the file itself
+        fields = {name: value for name, value in fields.items() if name not in ("date_ts", "file_path")}
+        return self._call("PATCH", f"/api/documents/{doc_id}", data=fields)["changed"]
+
+    def delete_document(self, doc_id):
+        return self.batch("delete", [doc_id]).changed
+
+    def batch(self, action, doc_ids, value=None):
+        data = {"ids": list(doc_ids)}
+        if value is not None:
+            data["value"] = value
+        reply = self._call("POST", f"/api/batch/{action}", data=data)
+        result = BatchResult(reply["action"])
+        result.changed = reply["changed"]
+        result.errors = [tuple(error) for error in reply["errors"]]
+        return result
+
+    # 📥 Files
+
+    def download(self, doc_id, file_name, progress=None, cancel=None, download_dir=None):
+        """
+        Copies a document's file into the local download cache and returns its
+        path; a copy that is already there is reused (stored files never change
+        content). The cache is evicted LRU like the archive extraction cache.
+        """
+        from archive_store import evict
+
+        download_dir = download_dir or DOWNLOAD_DIR
+        target_dir = os.path.join(download_dir, str(doc_id))
+        target = os.path.join(target_dir, file_name)
+        if os.path.exists(target):
+            os.utime(target)
+            return target
+
+        os.makedirs(target_dir, exist_ok=True)
+        temp_path = os.path.join(target_dir, f".{uuid.uuid4().hex}.tmp")
+        response = self._send("GET", f"/api/documents/{doc_id}/file")
+        try:
+            if response.status >= 400:
+                self._read(response)
+            size = int(response.getheader("Content-Length"))
+            with open(temp_path, "xb") as dst:
+                done = 0
+                while done < size:
+                    if cancel is not None and cancel.is_set():
+                        raise TransferCancelled()
+                    chunk = response.read(min(COPY_CHUNK_SIZE, size - done))
+                    if not chunk:
+                        raise ConnectionError("Download ended early")
+                    dst.write(chunk)
+                    done += len(chunk)
+                    if progress:
+                        progress(done)
+            os.replace(temp_path, target)
+        except BaseException:
+            self._local.conn.close()  # a half-read response can't be followed by another request
+            raise
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+        evict(download_dir, MAX_DOWNLOAD_BYTES, keep=target)
+        return target
+
+
+def filter_query(filters):
+    # Filters travel as the inputs to build_filters(); the server builds the SQL itself
+    doc_type, doc_class, search_term, date_from, date_to = filters["inputs"]
+    query = {"type": doc_type or "All", "class": doc_class or "All", "q": search_term or ""}
+    if date_from:
+        query["from"] = date_from
+    if date_to:
+        query["to"] = date_to
+    return query
+
+
+def open_repository(settings, db_path):
+    """
+    The repository the dashboard should use: a RemoteRepository when
+    settings.json names a document server ("server_url", and "server_token"
+    if it requires one), else the local database at db_path.
+    """
+    if settings.get("server_url"):
+        return RemoteRepository(settings["server_url"], token=settings.get("server_token"))
+    from doc_repository import get_repository
+    return get_repository(db_path)
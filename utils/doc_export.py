@@ -0,0 +1,174 @@
+# utils/doc_export.py
+
+import csv
+import io
+import json
+import os
+import shutil
+import tempfile
+import uuid
+import zipfile
+from datetime import datetime, timedelta
+
+from archive_store import pack_path
+from diagnostics import span
+from doc_query import DOCUMENT_COLUMNS, build_page_query, split_page_rows
+from doc_storage import COPY_CHUNK_SIZE, TransferCancelled, abs_document_path
+
+EXPORT_FIELDS = [column.strip() for column in DOCUMENT_COLUMNS.split(",")]
+EXPORT_FORMATS = (".csv", ".json", ".zip")
+FETCH_SIZE = 500
+
+
+def iter_documents(conn, filters, sort):
+    """
+    Yields every matching row, in dashboard order, from one statement.
+    sqlite3 steps the statement as rows are fetched, so only FETCH_SIZE rows
+    are in memory at a time however many match.
+    """
+    sql, params = build_page_query(filters, sort=sort, limit=-1)  # LIMIT -1: no limit
+    cursor = conn.execute(sql, params)
+    while True:
+        raw_rows = cursor.fetchmany(FETCH_SIZE)
+        if not raw_rows:
+            return
+        yield from split_page_rows(raw_rows)[0]
+
+
+def archived_member(conn, doc_id):
+    # (pack path, member) for an archived document, else None
+    row = conn.execute('''
+        SELECT p.file_name, a.member FROM archived_documents a JOIN archive_packs p ON p.id = a.pack_id
+        WHERE a.doc_id = ?
+    ''', (doc_id,)).fetchone()
+    return (pack_path(row[0]), row[1]) if row else None
+
+
+def write_csv(f, rows, step):
+    writer = csv.writer(f)
+    writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        writer.writerow(row)
+        step()
+
+
+def write_json(f, rows, step):
+    # A JSON array written one object at a time
+    f.write("[")
+    for n, row in enumerate(rows):
+        f.write(",\n  " if n else "\n  ")
+        f.write(json.dumps(dict(zip(EXPORT_FIELDS, row)), ensure_ascii=False))
+        step()
+    f.write("\n]\n")
+
+
+def write_zip(f, conn, rows, step):
+    """
+    files/<id>_<name> for every document plus manifest.csv (the CSV export
+    with a `bundle_file` column, empty for files that couldn't be found).
+    Archived documents are copied straight out of their pack.
+    The manifest goes to a temporary file first and is appended last.
+    Returns the number of missing files.
+    """
+    missing = 0
+    with zipfile.ZipFile(f, "w", compression=zipfile.ZIP_STORED) as bundle, \
+            tempfile.TemporaryFile("w+b") as manifest_file:
+        manifest_text = io.TextIOWrapper(manifest_file, encoding="utf-8", newline="")
+        manifest = csv.writer(manifest_text)
+        manifest.writerow(EXPORT_FIELDS + ["bundle_file"])
+
+        for row in rows:
+            doc_id, file_path = row[0], row[8]
+            abs_path = abs_document_path(file_path)
+            arcname = f"files/{doc_id}_{os.path.basename(abs_path)}"
+            # PDFs and scans barely compress, so files are stored as they are
+            with span("file_io.export_file"):
+                if os.path.exists(abs_path):
+                    with open(abs_path, "rb") as src, bundle.open(arcname, "w", force_zip64=True) as dst:
+                        shutil.copyfileobj(src, dst, COPY_CHUNK_SIZE)
+                else:
+                    packed = archived_member(conn, doc_id)
+                    if packed is None:
+                        arcname = ""
+                        missing += 1
+                    else:
+                        with zipfile.ZipFile(packed[0]) as pack, pack.open(packed[1]) as src, \
+                                bundle.open(arcname, "w", force_zip64=True) as dst:
+                            shutil.copyfileobj(src, dst, COPY_CHUNK_SIZE)
+            manifest.writerow(list(row) + [arcname])
+            step()
+
+        manifest_text.flush()
+        manifest_file.seek(0)
+        with bundle.open("manifest.csv", "w", force_zip64=True) as dst:
+            shutil.copyfileobj(manifest_file, dst, COPY_CHUNK_SIZE)
+        manifest_text.detach()
+    return missing
+
+
+def export_documents(repo, filters, sort, path, progress=None, cancel=None):
+    """
+    Streams the documents matching `filters` to path; the format follows its
+    extension (.csv, .json or .zip with the files). Written under a temporary
+    name and renamed at the end, so a cancelled or failed export leaves nothing.
+    progress(rows_done) and cancel (a threading.Event) as for TransferTask.
+    Returns (rows, missing_files).
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {ext or 'no extension'}")
+
+    done = 0
+
+    def step():
+        nonlocal done
+        done += 1
+        if progress:
+            progress(done)
+        if cancel is not None and cancel.is_set():
+            raise TransferCancelled()
+
+    temp_path = os.path.join(os.path.dirname(os.path.abspath(path)), f".{uuid.uuid4().hex}.tmp")
+    missing = 0
+    try:
+        with repo.reader() as conn, span("file_io.export") as s:
+            rows = iter_documents(conn, filters, sort)
+            if ext == ".zip":
+                with open(temp_path, "xb") as f:
+                    missing = write_zip(f, conn, rows, step)
+            else:
+                with open(temp_path, "x", encoding="utf-8", newline="") as f:
+                    (write_csv if ext == ".csv" else write_json)(f, rows, step)
+            s.rows = done
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return done, missing
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from doc_query import DEFAULT_SORT, build_filters
+    from doc_repository import DB_PATH, get_repository
+
+    parser = argparse.ArgumentParser(description="Export matching documents to CSV, JSON or a ZIP bundle with files.")
+    parser.add_argument("output", help="Output file: .csv, .json or .zip")
+    parser.add_argument("--type", default="All")
+    parser.add_argument("--class", dest="doc_class", default="All")
+    parser.add_argument("--search", default="")
+    parser.add_argument("--from", dest="date_from", default=None, help="YYYY-MM-DD, inclusive")
+    parser.add_argument("--to", dest="date_to", default=None, help="YYYY-MM-DD, inclusive")
+    args = parser.parse_args()
+
+    date_to = None
+    if args.date_to:
+        date_to = (datetime.strptime(args.date_to, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d %H:%M:%S")
+    filters = build_filters(
+        args.type, args.doc_class, args.search,
+        f"{args.date_from} 00:00:00" if args.date_from else None,
+        date_to,
+    )
+    rows, missing = export_documents(get_repository(DB_PATH), filters, DEFAULT_SORT, args.output)
+    print(f"✅ Exported {rows} document(s) to {args.output}" + (f" ({missing} file(s) missing)" if missing else ""))
@@ -0,0 +1,274 @@
+# utils/doc_query.py
+
+import re
+from functools import lru_cache
+
+# 🧱 SQL builders shared by the dashboard's page and count queries
+
+DOCUMENT_COLUMNS = "id, title, doc_type, doc_class, date, sender, recipient, description, file_path"
+
+# 🔃 Sort options: label -> (key expression, direction)
+# Every key expression has a matching (key, id) index in db_init.
+SORT_OPTIONS = {
+    "Date": ("date_ts", "DESC"),
+    "Title": ("title COLLATE NOCASE", "ASC"),
+    "Sender": ("IFNULL(sender, '') COLLATE NOCASE", "ASC"),
+    "Relevance": ("hits.score", "ASC"),
+}
+DEFAULT_SORT = "Date"
+RELEVANCE_SORT = "Relevance"
+
+# bm25 column weights: title, sender, recipient, description
+RANK_EXPR = "bm25(documents_fts, 10.0, 4.0, 4.0, 1.0)"
+# Matches in the extracted file text rank below metadata matches
+BODY_RANK_EXPR = "bm25(document_body_fts) * 0.5"
+
+MATCH_IDS = (
+    "SELECT rowid FROM documents_fts WHERE documents_fts MATCH ? "
+    "UNION SELECT rowid FROM document_body_fts WHERE document_body_fts MATCH ?"
+)
+RANKED_HITS = (
+    f"SELECT hit_id, MIN(score) AS score FROM ("
+    f"SELECT rowid AS hit_id, {RANK_EXPR} AS score FROM documents_fts WHERE documents_fts MATCH ? "
+    f"UNION ALL SELECT rowid, {BODY_RANK_EXPR} FROM document_body_fts WHERE document_body_fts MATCH ?"
+    f") GROUP BY hit_id"
+)
+
+
+def to_match_query(search_term):
+    # Every word becomes a quoted prefix query, so "memo ka" finds "Memorandum Kalibo"
+    tokens = re.findall(r"\w+", search_term or "")
+    return " ".join('"' + token + '"*' for token in tokens) or None
+
+
+def build_filters(doc_type="All", doc_class="All", search_term="", date_from=None, date_to=None):
+    """
+    date_from and date_to are normalized date_ts values; date_from is
+    inclusive and date_to exclusive. Every clause takes exactly one parameter.
+    "inputs" keeps the arguments, so a remote repository can send them to the
+    server instead of SQL.
+    """
+    clauses = []
+    params = []
+
+    if doc_type and doc_type.lower() != "all":
+        clauses.append("doc_type = ?")
+        params.append(doc_type.lower())
+    if doc_class and doc_class.lower() != "all":
+        clauses.append("doc_class = ?")
+        params.append(doc_class.lower())
+    if date_from or date_to:
+        # Unparseable dates are stored as '', which a lone upper bound would otherwise include
+        clauses.append("date_ts >= ?")
+        params.append(date_from or MIN_DATE_TS)
+    if date_to:
+        clauses.append("date_ts < ?")
+        params.append(date_to)
+
+    return {
+        "clauses": clauses, "params": params, "match": to_match_query(search_term),
+        "inputs": [doc_type, doc_class, search_term, date_from, date_to],
+    }
+
+
+# 📊 Summary tables kept by triggers: facet_counts per (doc_type, doc_class) and
+# date_buckets per (month, doc_type, doc_class). They use the same column names,
+# so type/class clauses apply to them unchanged.
+FACET_CLAUSES = {"doc_type = ?", "doc_class = ?"}
+DATE_CLAUSES = {"date_ts >= ?", "date_ts < ?"}
+MIN_DATE_TS = "0001-01-01 00:00:00"
+
+
+def uses_facet_table(filters):
+    # Unsearched counts on type/class alone are sums over facet_counts, not scans of documents
+    return filters["match"] is None and all(clause in FACET_CLAUSES for clause in filters["clauses"])
+
+
+def bucket_filters(filters):
+    """
+    The same filters over date_buckets as (clauses, params), or None when
+    date_buckets can't answer them: a search, or a date bound that isn't
+    the first of a month (e.g. "everything from March 2023" is answerable).
+    """
+    if filters["match"] is not None:
+        return None
+    clauses, params = [], []
+    for clause, param in zip(filters["clauses"], filters["params"]):
+        if clause in FACET_CLAUSES:
+            clauses.append(clause)
+            params.append(param)
+        elif clause in DATE_CLAUSES and param.endswith("-01 00:00:00"):
+            clauses.append(clause.replace("date_ts", "month"))
+            params.append(param[:7])
+        else:
+            return None
+    return clauses, params
+
+
+def counts_from_summary(filters):
+    return uses_facet_table(filters) or bucket_filters(filters) is not None
+
+
+# 🧠 SQL text depends only on the query's shape, so it's built once per shape.
+# Identical text also lets sqlite3's per-connection statement cache reuse prepared statements.
+
+@lru_cache(maxsize=128)
+def _summary_sql(columns, table, clauses, group_by=""):
+    query = f"SELECT {columns} FROM {table}"
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    if group_by:
+        query += f" GROUP BY {group_by}"
+    return query
+
+
+@lru_cache(maxsize=128)
+def _count_sql(clauses, has_match):
+    clauses = list(clauses)
+    if has_match:
+        clauses.append(f"id IN ({MATCH_IDS})")
+    query = "SELECT COUNT(*) FROM documents"
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    return query
+
+
+@lru_cache(maxsize=128)
+def _page_sql(clauses, has_match, sort, has_cursor, with_count):
+    key_expr, direction = SORT_OPTIONS[sort]
+    ranked = sort == RELEVANCE_SORT
+    clauses = list(clauses)
+    if has_match and not ranked:
+        clauses.append(f"id IN ({MATCH_IDS})")
+    if has_cursor:
+        op = "<" if direction == "DESC" else ">"
+        # The plain bound on the leading column lets SQLite seek into the index
+        clauses.append(f"{key_expr} {op}= ?")
+        clauses.append(f"({key_expr}, id) {op} (?, ?)")
+
+    # The window count is evaluated before LIMIT: every row from the cursor onwards
+    columns = f"{DOCUMENT_COLUMNS}, {key_expr} AS sort_key"
+    if with_count:
+        columns += ", COUNT(*) OVER () AS remaining"
+
+    if ranked:
+        query = (
+            f"WITH hits AS ({RANKED_HITS}) "
+            f"SELECT {columns} "
+            f"FROM hits JOIN documents ON documents.id = hits.hit_id"
+        )
+    else:
+        query = f"SELECT {columns} FROM documents"
+
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    query += f" ORDER BY {key_expr} {direction}, id {direction} LIMIT ?"
+    return query
+
+
+def build_count_query(filters):
+    if uses_facet_table(filters):
+        return _summary_sql("IFNULL(SUM(n), 0)", "facet_counts", tuple(filters["clauses"])), list(filters["params"])
+    buckets = bucket_filters(filters)
+    if buckets is not None:
+        return _summary_sql("IFNULL(SUM(n), 0)", "date_buckets", tuple(buckets[0])), buckets[1]
+
+    has_match = filters["match"] is not None
+    params = list(filters["params"])
+    if has_match:
+        params.extend([filters["match"]] * 2)
+    return _count_sql(tuple(filters["clauses"]), has_match), params
+
+
+def build_facet_query(filters):
+    """
+    (doc_type, doc_class, count) rows for the current search, ignoring the
+    type and class filters themselves so every menu option gets its count.
+    Without a search this reads a summary table; with one it is a single
+    grouped pass over the search hits. NULL classes come back as ''.
+    """
+    clauses = [clause for clause in filters["clauses"] if clause not in FACET_CLAUSES]
+    params = [param for clause, param in zip(filters["clauses"], filters["params"]) if clause not in FACET_CLAUSES]
+    if filters["match"] is None and not clauses:
+        return "SELECT doc_type, doc_class, n FROM facet_counts", []
+    buckets = bucket_filters({"clauses": clauses, "params": params, "match": filters["match"]})
+    if buckets is not None:
+        return _summary_sql("doc_type, doc_class, SUM(n)", "date_buckets", tuple(buckets[0]), "1, 2"), buckets[1]
+    if filters["match"] is not None:
+        clauses.append(f"id IN ({MATCH_IDS})")
+        params.extend([filters["match"]] * 2)
+    return (
+        f"SELECT doc_type, IFNULL(doc_class, ''), COUNT(*) FROM documents "
+        f"WHERE {' AND '.join(clauses)} GROUP BY 1, 2"
+    ), params
+
+
+def build_timeline_query(filters):
+    """
+    ('YYYY-MM', count) rows for the timeline: the current search, type and
+    class, but ignoring the date range so every month stays reachable.
+    Months of unparseable dates come back as ''.
+    """
+    clauses = [clause for clause in filters["clauses"] if clause not in DATE_CLAUSES]
+    params = [param for clause, param in zip(filters["clauses"], filters["params"]) if clause not in DATE_CLAUSES]
+    if filters["match"] is None:
+        return _summary_sql("month, SUM(n)", "date_buckets", tuple(clauses), "month"), params
+    clauses.append(f"id IN ({MATCH_IDS})")
+    params.extend([filters["match"]] * 2)
+    return (
+        f"SELECT substr(date_ts, 1, 7), COUNT(*) FROM documents "
+        f"WHERE {' AND '.join(clauses)} GROUP BY 1"
+    ), params
+
+
+def build_rows_query(filters, ids):
+    # The documents among `ids` that currently match `filters`, e.g. to patch changed cards
+    clauses = list(filters["clauses"]) + [f"id IN ({','.join('?' * len(ids))})"]
+    params = list(filters["params"]) + list(ids)
+    if filters["match"] is not None:
+        clauses.append(f"id IN ({MATCH_IDS})")
+        params.extend([filters["match"]] * 2)
+    return f"SELECT {DOCUMENT_COLUMNS} FROM documents WHERE {' AND '.join(clauses)}", params
+
+
+def build_page_query(filters, sort=DEFAULT_SORT, cursor=None, limit=10, with_count=False):
+    """
+    Keyset (seek) pagination: `cursor` is the (sort_key, id) of the last row
+    on the previous page, so every page is an index range scan of `limit` rows.
+    with_count adds a trailing `remaining` column: the number of matching rows
+    from the cursor onwards, so the total comes out of the same pass.
+    """
+    has_match = filters["match"] is not None
+    if sort == RELEVANCE_SORT and not has_match:
+        sort = DEFAULT_SORT
+    ranked = sort == RELEVANCE_SORT
+
+    params = []
+    if ranked:
+        params.extend([filters["match"]] * 2)
+    params.extend(filters["params"])
+    if has_match and not ranked:
+        params.extend([filters["match"]] * 2)
+    if cursor is not None:
+        sort_key, last_id = cursor
+        params.extend([sort_key, sort_key, last_id])
+    params.append(limit)
+
+    query = _page_sql(tuple(filters["clauses"]), has_match, sort, cursor is not None, with_count)
+    return query, params
+
+
+def split_page_rows(raw_rows, with_count=False):
+    # Strip the trailing sort_key (and remaining) columns and return the cursor for the next page
+    width = len(DOCUMENT_COLUMNS.split(","))
+    rows = [row[:width] for row in raw_rows]
+    next_cursor = (raw_rows[-1][width], raw_rows[-1][0]) if raw_rows else None
+    if with_count:
+        remaining = raw_rows[0][width + 1] if raw_rows else 0
+        return rows, next_cursor, remaining
+    return rows, next_cursor
+
+
+def filter_key(filters):
+    # Hashable identity of a filter combination, used to cache its count
+    return tuple(filters["clauses"]), tuple(filters["params"]), filters["match"]
@@ -0,0 +1,457 @@
+# utils/doc_repository.py
+
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from diagnostics import span
+from doc_query import (
+    DEFAULT_SORT, build_count_query, build_facet_query, build_page_query, build_rows_query, build_timeline_query,
+    counts_from_summary, filter_key, split_page_rows,
+)
+
+# 🔐 Paths
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DB_PATH = os.path.join(BASE_DIR, "db", "document_store.db")
+
+# ⚙️ Applied to every connection the repository opens
+PRAGMAS = [
+    "PRAGMA busy_timeout = 5000",      # wait for the uploader/indexer instead of failing
+    "PRAGMA synchronous = NORMAL",     # durable enough under WAL, far fewer fsyncs
+    "PRAGMA cache_size = -32000",      # 32 MB page cache
+    "PRAGMA mmap_size = 268435456",    # 256 MB memory-mapped reads
+    "PRAGMA temp_store = MEMORY",
+]
+STATEMENT_CACHE_SIZE = 256
+WRITE_RETRIES = 5
+MAX_CACHED_COUNTS = 64
+MAX_IDS_PER_QUERY = 500  # stay well under SQLite's bound-parameter limit
+CHANGE_RETENTION = "-1 day"  # how long document_changes rows are kept
+
+UPDATABLE_FIELDS = (
+    "title", "doc_type", "doc_class", "date", "date_ts",
+    "sender", "recipient", "description", "file_path",
+)
+
+
+class DocumentRepository:
+    """
+    Owns the long-lived SQLite connections for one database.
+    Each thread reads through its own connection (sqlite3 objects aren't shareable);
+    all writes go through one writer connection, serialized and retried when the
+    file is busy. Because the writer makes every commit of this process, its
+    PRAGMA data_version only moves when some other process writes.
+    """
+
+    remote = False  # doc_client.RemoteRepository: the same interface over HTTP
+
+    def __init__(self, db_path=DB_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._connections = {}  # thread ident -> connection
+        self._lock = threading.Lock()
+        self._write_lock = threading.RLock()
+        self._writer = None
+        self._inserted = []
+        # Bumped under _write_lock right after each commit made through this repository;
+        # readers just load the int, which is atomic, so they never need the lock
+        self.write_count = 0
+        self._version_conn = None  # never writes: reads PRAGMA data_version without the writer lock
+        self._version_lock = threading.Lock()
+
+        # 🧮 Filter key -> row count, kept exact across our own writes
+        self._counts = {}
+        self._counts_version = None
+
+    def _connect(self, **kwargs):
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=5,
+            isolation_level=None,  # autocommit; write() opens explicit transactions
+            cached_statements=STATEMENT_CACHE_SIZE,
+            **kwargs
+        )
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    @contextmanager
+    def reader(self):
+        # A private connection for long streaming reads on short-lived threads (exports)
+        conn = self._connect(check_same_thread=False)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._lock:
+                self._connections[threading.get_ident()] = conn
+        return conn
+
+    def release_connection(self):
+        # For short-lived threads (batch actions): close this thread's connection before it exits
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            with self._lock:
+                self._connections.pop(threading.get_ident(), None)
+            self._local.conn = None
+            conn.close()
+
+    def _writer_connection(self):
+        # Only ever used while holding _write_lock
+        if self._writer is None:
+            self._writer = self._connect(check_same_thread=False)
+        return self._writer
+
+    def interrupt(self, thread):
+        # Abort whatever statement `thread` is running; it raises OperationalError there
+        with self._lock:
+            conn = self._connections.get(thread.ident)
+        if conn is not None:
+            conn.interrupt()
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections.values():
+                try:
+                    conn.close()
+                except sqlite3.ProgrammingError:
+                    pass  # created in a thread that has already exited
+            self._connections.clear()
+        self._local = threading.local()
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        with self._version_lock:
+            if self._version_conn is not None:
+                self._version_conn.close()
+                self._version_conn = None
+
+    def external_version(self):
+        # Moves only when another process (or a connection outside this repository) commits
+        with self._write_lock:
+            return self._writer_connection().execute("PRAGMA data_version").fetchone()[0]
+
+    def data_version(self):
+        # Seen from a connection that never writes, data_version moves on every commit, ours included
+        with self._version_lock:
+            if self._version_conn is None:
+                self._version_conn = self._connect(check_same_thread=False)
+            return self._version_conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def change_token(self):
+        """
+        Changes whenever the database does, from this process or another.
+        Never waits for the writer lock (a write in flight, or another
+        process's lock), so it is safe to call from the Tk thread.
+        """
+        return self.data_version(), self.write_count
+
+    # 📖 Reads
+
+    def query(self, sql, params=()):
+        return self.connection().execute(sql, params).fetchall()
+
+    def query_one(self, sql, params=()):
+        return self.connection().execute(sql, params).fetchone()
+
+    def fetch_page(self, filters, sort=DEFAULT_SORT, cursor=None, limit=10):
+        sql, params = build_page_query(filters, sort=sort, cursor=cursor, limit=limit)
+        with span("sql.page") as s:
+            rows = self.query(sql, params)
+            s.rows = len(rows)
+        return split_page_rows(rows)
+
+    def count(self, filters):
+        sql, params = build_count_query(filters)
+        with span("sql.count"):
+            return self.query_one(sql, params)[0]
+
+    def fetch_page_and_count(self, filters, sort=DEFAULT_SORT, cursor=None, limit=10, offset=0):
+        """
+        Returns (rows, next_cursor, total). A cached count skips counting
+        entirely; otherwise the total comes from the page query's window
+        count, so the page and its count share one pass over the matching rows.
+        """
+        total = self.cached_count(filters)
+        if total is None and counts_from_summary(filters):
+            total = self.count(filters)  # a sum over facet_counts or date_buckets
+        if total is not None:
+            rows, next_cursor = self.fetch_page(filters, sort=sort, cursor=cursor, limit=limit)
+            return rows, next_cursor, total
+
+        state = self.change_token()
+        sql, params = build_page_query(filters, sort=sort, cursor=cursor, limit=limit, with_count=True)
+        with span("sql.page_and_count") as s:
+            raw_rows = self.query(sql, params)
+            s.rows = len(raw_rows)
+        rows, next_cursor, remaining = split_page_rows(raw_rows, with_count=True)
+        if rows:
+            total = offset + remaining
+        else:
+            # Past the end (e.g. rows deleted behind our cursor): count from scratch
+            total = self.count(filters)
+
+        self._store_count(filters, total, state)
+        return rows, next_cursor, total
+
+    def facet_counts(self, filters):
+        # {(doc_type, doc_class): count} for the search in `filters`, whatever type/class is selected
+        sql, params = build_facet_query(filters)
+        with span("sql.facets") as s:
+            rows = self.query(sql, params)
+            s.rows = len(rows)
+        return {(doc_type, doc_class): n for doc_type, doc_class, n in rows}
+
+    def timeline_counts(self, filters):
+        # {'YYYY-MM': count} for the search, type and class in `filters`, over all dates
+        sql, params = build_timeline_query(filters)
+        with span("sql.timeline") as s:
+            rows = self.query(sql, params)
+            s.rows = len(rows)
+        return dict(rows)
+
+    def get_file_path(self, doc_id):
+        row = self.query_one("SELECT file_path FROM documents WHERE id = ?", (doc_id,))
+        return row[0] if row else None
+
+    def get_file_info(self, doc_id):
+        # (file_path, content_hash), or None if the row is gone
+        return self.query_one("SELECT file_path, content_hash FROM documents WHERE id = ?", (doc_id,))
+
+    def get_file_infos(self, doc_ids):
+        # [(id, doc_type, file_path, content_hash)] for the rows that still exist
+        doc_ids = list(doc_ids)
+        rows = []
+        for start in range(0, len(doc_ids), MAX_IDS_PER_QUERY):
+            chunk = doc_ids[start:start + MAX_IDS_PER_QUERY]
+            rows += self.query(
+                f"SELECT id, doc_type, file_path, content_hash FROM documents WHERE id IN ({','.join('?' * len(chunk))})",
+                chunk
+            )
+        return rows
+
+    def fetch_matching(self, filters, doc_ids):
+        # Current rows for the ids that match `filters`; ids that are gone or filtered out are absent
+        doc_ids = list(doc_ids)
+        rows = []
+        for start in range(0, len(doc_ids), MAX_IDS_PER_QUERY):
+            sql, params = build_rows_query(filters, doc_ids[start:start + MAX_IDS_PER_QUERY])
+            rows += self.query(sql, params)
+        return rows
+
+    # 🗄️ Cold storage (archive_packs / archived_documents)
+
+    def get_archive_entry(self, doc_id):
+        # (pack file_name, member, size, file_path) for an archived document, else None
+        return self.query_one('''
+            SELECT p.file_name, a.member, a.size, d.file_path
+            FROM archived_documents a
+            JOIN archive_packs p ON p.id = a.pack_id
+            JOIN documents d ON d.id = a.doc_id
+            WHERE a.doc_id = ?
+        ''', (doc_id,))
+
+    def archived_ids(self, doc_ids):
+        doc_ids = list(doc_ids)
+        archived = set()
+        for start in range(0, len(doc_ids), MAX_IDS_PER_QUERY):
+            chunk = doc_ids[start:start + MAX_IDS_PER_QUERY]
+            archived.update(row[0] for row in self.query(
+                f"SELECT doc_id FROM archived_documents WHERE doc_id IN ({','.join('?' * len(chunk))})", chunk
+            ))
+        return archived
+
+    # 📰 Change feed (document_changes, filled by triggers)
+
+    def latest_change(self):
+        return self.query_one("SELECT IFNULL(MAX(seq), 0) FROM document_changes")[0]
+
+    def changes_since(self, seq):
+        """
+        Returns (doc_ids, latest_seq, complete). complete is False when rows
+        after `seq` have already been pruned, i.e. the caller missed changes
+        and should reload instead of patching.
+        """
+        oldest, latest = self.query_one("SELECT MIN(seq), MAX(seq) FROM document_changes")
+        if latest is None or latest <= seq:
+            return set(), seq, True
+        complete = oldest <= seq + 1
+        rows = self.query("SELECT DISTINCT doc_id FROM document_changes WHERE seq > ? AND seq <= ?", (seq, latest))
+        return {row[0] for row in rows}, latest, complete
+
+    def prune_changes(self):
+        return self.write(lambda conn: conn.execute(
+            "DELETE FROM document_changes WHERE changed_at < datetime('now', ?)", (CHANGE_RETENTION,)
+        ).rowcount)
+
+    # 🧮 Count cache
+
+    def cached_count(self, filters):
+        with self._write_lock:
+            self._validate_counts()
+            return self._counts.get(filter_key(filters))
+
+    def _validate_counts(self):
+        version = self.external_version()
+        if version != self._counts_version:
+            self._counts.clear()
+            self._counts_version = version
+
+    def _store_count(self, filters, total, state):
+        with self._write_lock:
+            self._validate_counts()
+            # Only cache if nothing was written while we were counting
+            if self.change_token() != state:
+                return
+            if len(self._counts) >= MAX_CACHED_COUNTS:
+                self._counts.pop(next(iter(self._counts)))
+            self._counts[filter_key(filters)] = total
+
+    def forget_counts(self):
+        # For bulk writes that don't track their rows
+        with self._write_lock:
+            self._counts.clear()
+
+    def _matching(self, conn, ids):
+        # How many of `ids` each cached filter combination currently matches
+        if not self._counts or not ids:
+            return {}
+        placeholders = ",".join("?" * len(ids))
+        result = {}
+        for clauses, params, match in self._counts:
+            filters = {
+                "clauses": list(clauses) + [f"id IN ({placeholders})"],
+                "params": list(params) + list(ids),
+                "match": match,
+            }
+            sql, sql_params = build_count_query(filters)
+            result[(clauses, params, match)] = conn.execute(sql, sql_params).fetchone()[0]
+        return result
+
+    def _apply_count_delta(self, before, after):
+        for key in self._counts:
+            self._counts[key] += after.get(key, 0) - before.get(key, 0)
+
+    # ✍️ Writes
+
+    def write(self, fn, touched_ids=None):
+        """
+        Runs fn(conn) inside BEGIN IMMEDIATE ... COMMIT and returns its result.
+        Lock contention from other processes is retried with backoff.
+        touched_ids (rows fn updates or deletes) and track_inserted() (rows it
+        inserts) let cached counts be adjusted instead of thrown away.
+        """
+        touched_ids = list(touched_ids or [])
+        with self._write_lock, span("sql.write"):
+            conn = self._writer_connection()
+            self._validate_counts()
+            if len(touched_ids) > MAX_IDS_PER_QUERY:
+                self._counts.clear()  # recounting lazily beats adjusting for a huge batch
+            for attempt in range(WRITE_RETRIES):
+                try:
+                    conn.execute("BEGIN IMMEDIATE")
+                    before = self._matching(conn, touched_ids)
+                    self._inserted = []
+                    result = fn(conn)
+                    after = self._matching(conn, touched_ids + self._inserted)
+                    conn.execute("COMMIT")
+                    self.write_count += 1
+                    self._apply_count_delta(before, after)
+                    return result
+                except sqlite3.OperationalError as e:
+                    if conn.in_transaction:
+                        conn.execute("ROLLBACK")
+                    busy = "locked" in str(e) or "busy" in str(e)
+                    if not busy or attempt == WRITE_RETRIES - 1:
+                        raise
+                    time.sleep(0.05 * (2 ** attempt))
+                except Exception:
+                    if conn.in_transaction:
+                        conn.execute("ROLLBACK")
+                    raise
+
+    def track_inserted(self, doc_id):
+        # Called from inside a write() callback for every row it inserts
+        self._inserted.append(doc_id)
+        return doc_id
+
+    def insert_document(self, title, doc_type, doc_class, date, date_ts, sender, recipient, description, file_path,
+                        content_hash=None, size=None):
+        def insert(conn):
+            if content_hash and size is not None:
+                # The blob row must exist before the insert trigger bumps its ref_count (no size: no blob is kept)
+                conn.execute("INSERT OR IGNORE INTO blobs (sha256, size) VALUES (?, ?)", (content_hash, size))
+            cursor = conn.execute('''
+                INSERT INTO documents (title, doc_type, doc_class, date, date_ts, sender, recipient, description, file_path, content_hash)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (title, doc_type, doc_class, date, date_ts, sender, recipient, description, file_path, content_hash))
+            return self.track_inserted(cursor.lastrowid)
+        return self.write(insert)
+
+    def update_document(self, doc_id, **fields):
+        unknown = set(fields) - set(UPDATABLE_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown document fields: {', '.join(sorted(unknown))}")
+        # Keep column order fixed so each field combination maps to one cached statement
+        names = [name for name in UPDATABLE_FIELDS if name in fields]
+        sql = f"UPDATE documents SET {', '.join(f'{name} = ?' for name in names)} WHERE id = ?"
+        params = [fields[name] for name in names] + [doc_id]
+        return self.write(lambda conn: conn.execute(sql, params).rowcount, touched_ids=[doc_id])
+
+    def delete_document(self, doc_id):
+        return self.write(
+            lambda conn: conn.execute("DELETE FROM documents WHERE id = ?", (doc_id,)).rowcount,
+            touched_ids=[doc_id]
+        )
+
+    # 📦 Batches: one transaction (and one commit) however many rows
+
+    def update_documents(self, changes):
+        """
+        changes: {doc_id: {field: value}}. Rows with the same set of fields
+        share one executemany, so a batch of retypes is a single statement.
+        """
+        groups = {}
+        for doc_id, fields in changes.items():
+            unknown = set(fields) - set(UPDATABLE_FIELDS)
+            if unknown:
+                raise ValueError(f"Unknown document fields: {', '.join(sorted(unknown))}")
+            names = tuple(name for name in UPDATABLE_FIELDS if name in fields)
+            groups.setdefault(names, []).append([fields[name] for name in names] + [doc_id])
+
+        def update(conn):
+            updated = 0
+            for names, params in groups.items():
+                sql = f"UPDATE documents SET {', '.join(f'{name} = ?' for name in names)} WHERE id = ?"
+                updated += conn.executemany(sql, params).rowcount
+            return updated
+        return self.write(update, touched_ids=list(changes))
+
+    def delete_documents(self, doc_ids):
+        doc_ids = list(doc_ids)
+        return self.write(
+            lambda conn: conn.executemany("DELETE FROM documents WHERE id = ?", [(i,) for i in doc_ids]).rowcount,
+            touched_ids=doc_ids
+        )
+
+
+_repositories = {}
+_repositories_lock = threading.Lock()
+
+
+def get_repository(db_path=DB_PATH):
+    # One repository (and one set of connections) per database per process
+    with _repositories_lock:
+        repo = _repositories.get(db_path)
+        if repo is None:
+            repo = _repositories[db_path] = DocumentRepository(db_path)
+        return repo
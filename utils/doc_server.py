@@ -0,0 +1,568 @@
+# utils/doc_server.py
+
+import asyncio
+import functools
+import hmac
+import json
+import mimetypes
+import os
+import re
+import sqlite3
+import tempfile
+import time
+import traceback
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http import HTTPStatus
+from urllib.parse import parse_qs, quote, unquote, urlsplit
+
+from archive_store import pack_path
+from batch_actions import BATCH_ACTIONS, add_document, batch_delete, edit_document
+from db_init import normalize_date
+from diagnostics import span, timings
+from doc_query import DEFAULT_SORT, SORT_OPTIONS, build_filters
+from doc_repository import UPDATABLE_FIELDS, get_repository
+from doc_storage import FOLDER_MAP, abs_document_path
+
+# 🔐 Paths
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DB_PATH = os.path.join(BASE_DIR, "db", "document_store.db")
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+WORKERS = 8  # threads running repository calls; each reads through its own connection
+MAX_HEADER_BYTES = 64 * 1024
+MAX_JSON_BYTES = 1024 * 1024
+MAX_UPLOAD_BYTES = 2 * 1024 * 1024 * 1024
+MAX_PAGE_SIZE = 500
+STREAM_CHUNK_SIZE = 256 * 1024
+IDLE_TIMEOUT = 60  # seconds a kept-alive connection may sit between requests
+EDITABLE_FIELDS = set(UPDATABLE_FIELDS) - {"file_path", "date_ts"}  # the server derives these
+OPTIONAL_FIELDS = {"doc_class", "sender", "recipient"}  # may be null; everything else must be a string
+DOC_CLASSES = [
+    "advisory", "circular", "endorsement", "executive order", "memorandum",
+    "office order", "ordinance", "policy", "resolution", "others",
+]
+
+
+class HttpError(Exception):
+    def __init__(self, status, message=None):
+        super().__init__(message or HTTPStatus(status).phrase)
+        self.status = status
+
+
+class Request:
+    def __init__(self, method, target, version, headers, reader):
+        url = urlsplit(target)
+        self.method = method
+        self.path = unquote(url.path)
+        self.query = {key: values[-1] for key, values in parse_qs(url.query, keep_blank_values=True).items()}
+        self.headers = headers
+        self.reader = reader
+        self.length = int(headers.get("content-length") or 0)
+        self.keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+        self.consumed = self.length == 0
+        self.responded = False
+
+    async def json(self):
+        if self.length > MAX_JSON_BYTES:
+            raise HttpError(413)
+        body = await self.reader.readexactly(self.length)
+        self.consumed = True
+        data = json.loads(body or b"{}")
+        if not isinstance(data, dict):
+            raise HttpError(400, "Expected a JSON object")
+        return data
+
+
+async def read_request(reader):
+    # Returns the next Request on the connection, or None once the client has closed it
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError as e:
+        if not e.partial.strip():
+            return None
+        raise HttpError(400, "Incomplete request")
+    except asyncio.LimitOverrunError:
+        raise HttpError(431)
+
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, version = lines[0].split(" ")
+    except ValueError:
+        raise HttpError(400, "Malformed request line")
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+    if "chunked" in headers.get("transfer-encoding", "").lower():
+        raise HttpError(411, "Send a Content-Length")
+    if not headers.get("content-length", "0").isdigit():
+        raise HttpError(400, "Invalid Content-Length")
+    return Request(method, target, version, headers, reader)
+
+
+def response_head(status, headers):
+    lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}"] + [f"{name}: {value}" for name, value in headers.items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+# 🔎 Query-string inputs, validated before they reach the repository
+
+def query_int(query, name, default, low, high):
+    try:
+        value = int(query.get(name, default))
+    except ValueError:
+        raise HttpError(400, f"{name} must be an integer")
+    if not low <= value <= high:
+        raise HttpError(400, f"{name} must be between {low} and {high}")
+    return value
+
+
+def date_bound(value):
+    if not value:
+        return None
+    normalized = normalize_date(value)
+    if normalized is None:
+        raise HttpError(400, f"Invalid date: {value}")
+    return normalized
+
+
+def request_filters(query):
+    # The same inputs the dashboard's own build_filters() call takes
+    return build_filters(
+        query.get("type", "All"), query.get("class", "All"), query.get("q", ""),
+        date_bound(query.get("from")), date_bound(query.get("to")),
+    )
+
+
+def filters_from_inputs(inputs):
+    if not isinstance(inputs, list) or len(inputs) != 5 or not all(v is None or isinstance(v, str) for v in inputs):
+        raise HttpError(400, "filters must be [type, class, search, from, to]")
+    doc_type, doc_class, search_term, date_from, date_to = inputs
+    return build_filters(doc_type, doc_class, search_term, date_bound(date_from), date_bound(date_to))
+
+
+def body_ids(data):
+    # Document ids from a JSON body; bool is an int subclass but never an id
+    ids = data.get("ids")
+    if not isinstance(ids, list) or not all(isinstance(i, int) and not isinstance(i, bool) for i in ids):
+        raise HttpError(400, "ids must be a list of document ids")
+    return ids
+
+
+def request_sort(query):
+    sort = query.get("sort", DEFAULT_SORT)
+    if sort not in SORT_OPTIONS:
+        raise HttpError(400, f"Unknown sort: {sort}")
+    return sort
+
+
+def request_cursor(query):
+    if not query.get("cursor"):
+        return None
+    try:
+        cursor = json.loads(query["cursor"])
+    except ValueError:
+        raise HttpError(400, "Invalid cursor")
+    # (sort_key, id) of the last row; the key is NULL when that row's sort column is
+    if not isinstance(cursor, list) or len(cursor) != 2:
+        raise HttpError(400, "Invalid cursor")
+    sort_key, last_id = cursor
+    if isinstance(sort_key, bool) or not (sort_key is None or isinstance(sort_key, (str, int, float))) \
+            or isinstance(last_id, bool) or not isinstance(last_id, int):
+        raise HttpError(400, "Invalid cursor")
+    return sort_key, last_id
+
+
+def edit_fields(fields):
+    # A PATCH body checked field by field, plus the date_ts derived from its date
+    unknown = set(fields) - EDITABLE_FIELDS
+    if unknown:
+        raise HttpError(400, f"Fields that can't be edited: {', '.join(sorted(unknown))}")
+    for name, value in fields.items():
+        if not isinstance(value, str) and not (value is None and name in OPTIONAL_FIELDS):
+            raise HttpError(400, f"{name} must be a string")
+    if "title" in fields and not fields["title"].strip():
+        raise HttpError(400, "title can't be empty")
+    if "doc_type" in fields and fields["doc_type"] not in FOLDER_MAP:
+        raise HttpError(400, f"Unrecognized document type: {fields['doc_type']}")
+    if fields.get("doc_class") is not None and fields["doc_class"] not in DOC_CLASSES:
+        raise HttpError(400, f"Unrecognized document class: {fields['doc_class']}")
+    if "date" in fields:
+        fields["date_ts"] = normalize_date(fields["date"])
+        if fields["date_ts"] is None:
+            raise HttpError(400, f"Invalid date: {fields['date']}")
+    return fields
+
+
+def batch_result(result):
+    return {"action": result.action, "changed": result.changed, "errors": result.errors}
+
+
+class DocumentServer:
+    """
+    Serves one document store to the dashboards of several workstations over
+    HTTP/1.1 with keep-alive. The event loop only parses requests and moves
+    bytes; repository calls and file work run on a thread pool, so readers
+    run in parallel (WAL) while writes stay serialized by the repository.
+
+    Read endpoints carry an ETag built from the repository's change token:
+    a client revalidating an unchanged result gets a 304 without a query.
+    """
+
+    def __init__(self, repo, token=None, workers=WORKERS):
+        self.repo = repo
+        self.token = token
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="doc-server")
+        self.instance = uuid.uuid4().hex[:8]  # ETags from before a restart never match
+        self.server = None
+        self.routes = [
+            ("GET", re.compile(r"/api/version"), self.version),
+            ("GET", re.compile(r"/api/documents"), self.documents),
+            ("POST", re.compile(r"/api/documents"), self.upload),
+            ("GET", re.compile(r"/api/count"), self.count),
+            ("GET", re.compile(r"/api/facets"), self.facets),
+            ("GET", re.compile(r"/api/timeline"), self.timeline),
+            ("GET", re.compile(r"/api/changes"), self.changes),
+            ("POST", re.compile(r"/api/matching"), self.matching),
+            ("GET", re.compile(r"/api/documents/(\d+)/file"), self.download),
+            ("PATCH", re.compile(r"/api/documents/(\d+)"), self.edit),
+            ("DELETE", re.compile(r"/api/documents/(\d+)"), self.delete),
+            ("POST", re.compile(r"/api/batch/(\w+)"), self.batch),
+            ("GET", re.compile(r"/api/diagnostics"), self.diagnostics),
+        ]
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        # Returns the port actually bound (port=0 picks a free one)
+        self.server = await asyncio.start_server(self.handle_connection, host, port, limit=MAX_HEADER_BYTES)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        async with self.server:
+            await self.server.serve_forever()
+
+    def close(self):
+        if self.server is not None:
+            self.server.close()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    def run(self, fn, *args, **kwargs):
+        return asyncio.get_running_loop().run_in_executor(self.pool, functools.partial(fn, *args, **kwargs))
+
+    # 🔌 Connections
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(read_request(reader), IDLE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                except HttpError as e:
+                    writer.write(self.error_bytes(e.status, str(e)))
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                await self.dispatch(request, writer)
+                # A body the handler didn't read would be parsed as the next request
+                if not request.keep_alive or not request.consumed:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def dispatch(self, request, writer):
+        started = time.perf_counter()
+        name = "unknown"
+        try:
+            if self.token:
+                supplied = request.headers.get("authorization", "").removeprefix("Bearer ")
+                if not hmac.compare_digest(supplied.encode(), self.token.encode()):
+                    raise HttpError(401)
+            allowed = False
+            for method, pattern, handler in self.routes:
+                match = pattern.fullmatch(request.path)
+                if match is None:
+                    continue
+                allowed = True
+                if method == request.method:
+                    name = handler.__name__
+                    await handler(request, writer, *match.groups())
+                    break
+            else:
+                raise HttpError(405 if allowed else 404)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            request.keep_alive = False  # the client went away (e.g. a cancelled upload)
+        except Exception as e:
+            if request.responded:
+                request.keep_alive = False  # failed mid-stream: the client sees a short body
+                traceback.print_exc()
+                return
+            status, kind = self.classify(e)
+            writer.write(self.error_bytes(status, str(e), kind, request.keep_alive and request.consumed))
+            await writer.drain()
+        finally:
+            timings.record(f"http.{name}", (time.perf_counter() - started) * 1000)
+
+    def classify(self, error):
+        # (status, kind); the client maps kind back to the exception the dashboard already handles
+        if isinstance(error, HttpError):
+            return error.status, {400: "invalid", 404: "not_found"}.get(error.status, "http")
+        if isinstance(error, LookupError):
+            return 404, "not_found"
+        if isinstance(error, ValueError):
+            return 400, "invalid"
+        if isinstance(error, FileExistsError):
+            return 409, "conflict"
+        if isinstance(error, sqlite3.Error):
+            return 503, "database"
+        traceback.print_exc()
+        return 500, "server"
+
+    def error_bytes(self, status, message, kind="http", keep_alive=False):
+        body = json.dumps({"error": message, "kind": kind}).encode()
+        return response_head(status, {
+            "Content-Type": "application/json",
+            "Content-Length": len(body),
+            "Connection": "keep-alive" if keep_alive else "close",
+        }) + body
+
+    async def reply(self, request, writer, data, status=200, etag=None):
+        body = b"" if status == 304 else json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode()
+        headers = {"Content-Type": "application/json; charset=utf-8", "Content-Length": len(body)}
+        if etag:
+            headers["ETag"] = etag
+            headers["Cache-Control"] = "no-cache"  # cache, but revalidate every time
+        headers["Connection"] = "keep-alive" if request.keep_alive else "close"
+        request.responded = True
+        writer.write(response_head(status, headers) + body)
+        await writer.drain()
+
+    async def etag(self):
+        external_version, write_count = await self.run(self.repo.change_token)
+        return f'"{self.instance}-{external_version}-{write_count}"'
+
+    async def cached(self, request, writer, fn):
+        """
+        Replies with fn()'s result tagged with the change token taken before
+        running it. If the data changed meanwhile, the next request simply
+        gets a different tag; an unchanged tag never hides a newer result.
+        """
+        etag = await self.etag()
+        if request.headers.get("if-none-match") == etag:
+            await self.reply(request, writer, None, status=304, etag=etag)
+            return
+        await self.reply(request, writer, await self.run(fn), etag=etag)
+
+    # 📖 Reads
+
+    async def version(self, request, writer):
+        etag = await self.etag()
+        await self.reply(request, writer, {"token": etag, "latest_change": await self.run(self.repo.latest_change)})
+
+    async def documents(self, request, writer):
+        filters = request_filters(request.query)
+        sort = request_sort(request.query)
+        cursor = request_cursor(request.query)
+        limit = query_int(request.query, "limit", 10, 1, MAX_PAGE_SIZE)
+        offset = query_int(request.query, "offset", 0, 0, 2 ** 62)
+
+        def page():
+            rows, next_cursor, total = self.repo.fetch_page_and_count(filters, sort=sort, cursor=cursor, limit=limit, offset=offset)
+            return {"rows": rows, "next_cursor": next_cursor, "total": total}
+
+        await self.cached(request, writer, page)
+
+    async def count(self, request, writer):
+        filters = request_filters(request.query)
+        await self.cached(request, writer, lambda: {"total": self.repo.count(filters)})
+
+    async def facets(self, request, writer):
+        filters = request_filters(request.query)
+        await self.cached(request, writer, lambda: {
+            "counts": [[doc_type, doc_class, n] for (doc_type, doc_class), n in self.repo.facet_counts(filters).items()]
+        })
+
+    async def timeline(self, request, writer):
+        filters = request_filters(request.query)
+        await self.cached(request, writer, lambda: {"counts": self.repo.timeline_counts(filters)})
+
+    async def changes(self, request, writer):
+        seq = query_int(request.query, "since", 0, 0, 2 ** 62)
+        doc_ids, latest, complete = await self.run(self.repo.changes_since, seq)
+        await self.reply(request, writer, {"doc_ids": sorted(doc_ids), "latest": latest, "complete": complete})
+
+    async def matching(self, request, writer):
+        data = await request.json()
+        filters = filters_from_inputs(data.get("filters"))
+        rows = await self.run(self.repo.fetch_matching, filters, body_ids(data))
+        await self.reply(request, writer, {"rows": rows})
+
+    async def diagnostics(self, request, writer):
+        await self.reply(request, writer, timings.snapshot())
+
+    # 📤 Files
+
+    async def download(self, request, writer, doc_id):
+        """
+        Streams a document's file, or its member of an archive pack, in
+        STREAM_CHUNK_SIZE pieces; drain() holds reads back while a slow
+        client catches up, so memory stays flat per connection.
+        """
+        info = await self.run(self.repo.get_file_info, int(doc_id))
+        if info is None:
+            raise LookupError(f"Document {doc_id} no longer exists")
+        abs_path = abs_document_path(info[0])
+
+        def open_source():
+            if os.path.exists(abs_path):
+                f = open(abs_path, "rb")
+                return f, os.fstat(f.fileno()).st_size, None
+            entry = self.repo.get_archive_entry(int(doc_id))
+            if entry is None:
+                raise LookupError(f"The file of document {doc_id} is missing")
+            pack = zipfile.ZipFile(pack_path(entry[0]))
+            return pack.open(entry[1]), entry[2], pack
+
+        src, size, pack = await self.run(open_source)
+        try:
+            file_name = os.path.basename(abs_path)
+            request.responded = True
+            writer.write(response_head(200, {
+                "Content-Type": mimetypes.guess_type(file_name)[0] or "application/octet-stream",
+                "Content-Length": size,
+                "Content-Disposition": f"attachment; filename*=UTF-8''{quote(file_name)}",  # RFC 5987
+                "Connection": "keep-alive" if request.keep_alive else "close",
+            }))
+            sent = 0
+            with span("file_io.serve_file", rows=size):
+                while sent < size:
+                    chunk = await self.run(src.read, min(STREAM_CHUNK_SIZE, size - sent))
+                    if not chunk:
+                        break
+                    writer.write(chunk)
+                    await writer.drain()
+                    sent += len(chunk)
+            if sent != size:
+                request.keep_alive = False  # the file shrank while streaming
+        finally:
+            await self.run(src.close)
+            if pack is not None:
+                await self.run(pack.close)
+
+    # ✍️ Writes
+
+    async def upload(self, request, writer):
+        """
+        POST /api/documents?title=&type=&class=&date=&sender=&recipient=&description=&name=
+        with the file as the body. The body is spooled to a temporary file and
+        stored exactly as a local Add Document would store it.
+        """
+        query = request.query
+        title, doc_type, doc_class = query.get("title", "").strip(), query.get("type", ""), query.get("class", "others")
+        date_ts = normalize_date(query.get("date"))
+        if not title or date_ts is None:
+            raise HttpError(400, "title and a valid date are required")
+        if doc_type not in FOLDER_MAP:
+            raise HttpError(400, f"Unrecognized document type: {doc_type}")
+        if doc_class not in DOC_CLASSES:
+            raise HttpError(400, f"Unrecognized document class: {doc_class}")
+        if "content-length" not in request.headers:
+            raise HttpError(411)
+        if request.length > MAX_UPLOAD_BYTES:
+            raise HttpError(413)
+
+        ext = os.path.splitext(query.get("name", ""))[1]
+        fd, temp_path = tempfile.mkstemp(suffix=ext, prefix="doc-upload-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                remaining = request.length
+                while remaining:
+                    chunk = await request.reader.read(min(STREAM_CHUNK_SIZE, remaining))
+                    if not chunk:
+                        raise ConnectionResetError("Upload ended early")
+                    await self.run(f.write, chunk)
+                    remaining -= len(chunk)
+            request.consumed = True
+
+            doc_id = await self.run(
+                add_document, self.repo, temp_path, title, doc_type, doc_class,
+                datetime.strptime(date_ts, "%Y-%m-%d %H:%M:%S"),
+                query.get("sender") or None, query.get("recipient") or None, query.get("description", ""),
+            )
+        finally:
+            os.remove(temp_path)
+        await self.reply(request, writer, {"id": doc_id}, status=201)
+
+    async def edit(self, request, writer, doc_id):
+        fields = edit_fields(await request.json())
+        changed = await self.run(edit_document, self.repo, int(doc_id), fields)
+        await self.reply(request, writer, {"changed": changed})
+
+    async def delete(self, request, writer, doc_id):
+        await self.reply(request, writer, batch_result(await self.run(batch_delete, self.repo, [int(doc_id)])))
+
+    async def batch(self, request, writer, action):
+        data = await request.json()
+        fn = BATCH_ACTIONS.get(action)
+        if fn is None:
+            raise HttpError(404, f"Unknown batch action: {action}")
+        doc_ids = body_ids(data)
+        args = []
+        if action != "delete":
+            value = data.get("value")
+            if not isinstance(value, str) or not value:
+                raise HttpError(400, f"{action} needs a value")
+            if action == "retype" and value not in FOLDER_MAP:
+                raise HttpError(400, f"Unrecognized document type: {value}")
+            args.append(value)
+        result = await self.run(fn, self.repo, doc_ids, *args)
+        await self.reply(request, writer, batch_result(result))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from db_init import init_db
+    from text_indexer import TextIndexer
+
+    parser = argparse.ArgumentParser(
+        description="Serve db/document_store.db and documents/ to dashboards on other workstations."
+    )
+    parser.add_argument("--host", default=DEFAULT_HOST, help="Interface to listen on; 0.0.0.0 for the whole network")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--token", default=os.environ.get("DOC_SERVER_TOKEN"),
+                        help="Shared secret clients must send (default: $DOC_SERVER_TOKEN)")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--no-indexer", action="store_true", help="Don't extract file text in the background")
+    args = parser.parse_args()
+
+    init_db()
+    repo = get_repository(DB_PATH)
+    repo.prune_changes()
+    if not args.no_indexer:
+        TextIndexer(DB_PATH).start()
+
+    async def main():
+        server = DocumentServer(repo, token=args.token, workers=args.workers)
+        port = await server.start(args.host, args.port)
+        print(f"🌐 Serving {DB_PATH} on http://{args.host}:{port}" + (" (token required)" if args.token else ""))
+        try:
+            await server.serve_forever()
+        finally:
+            server.close()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("👋 Server stopped.")
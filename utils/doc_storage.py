@@ -0,0 +1,378 @@
+# utils/doc_storage.py
+
+import errno
+import hashlib
+import os
+import uuid
+
+# 🔐 Paths
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DOCS_DIR = os.path.join(BASE_DIR, "documents")
+BLOB_DIR = os.path.join(DOCS_DIR, ".store")
+
+# 📁 Document type -> folder under documents/
+FOLDER_MAP = {"incoming": "incoming", "outgoing": "outgoing", "others": "others"}
+
+HASH_CHUNK_SIZE = 1024 * 1024
+COPY_CHUNK_SIZE = 4 * 1024 * 1024
+FICLONE = 0x40049409  # Linux ioctl: share extents with another file (btrfs, XFS, ...)
+
+_can_link = {}  # directory -> whether files there can be hardlinked or reflinked to the blob store
+
+
+def abs_document_path(file_path):
+    # Rows written on Windows store backslash-separated relative paths
+    return os.path.join(BASE_DIR, *file_path.replace("\\", "/").split("/"))
+
+
+def relative_document_path(abs_path):
+    return os.path.relpath(abs_path, BASE_DIR)
+
+
+def folder_for(doc_type):
+    folder = FOLDER_MAP.get(doc_type)
+    if not folder:
+        raise ValueError(f"Unrecognized document type: {doc_type}")
+    return os.path.join(DOCS_DIR, folder)
+
+
+def hash_file(path, chunk_size=HASH_CHUNK_SIZE):
+    # Streaming SHA-256: memory use is one chunk, whatever the file size
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def blob_path(sha256):
+    return os.path.join(BLOB_DIR, sha256[:2], sha256)
+
+
+def has_blob(sha256):
+    # False for content stored where links aren't possible: its document file is the only copy
+    return os.path.exists(blob_path(sha256))
+
+
+class TransferCancelled(Exception):
+    pass
+
+
+def fsync_dir(path):
+    # Makes a rename or new link in `path` durable; directories can't be opened on Windows
+    if os.name == "nt":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def copy_stream(src, dst_file, progress=None, cancel=None, digest=None, chunk_size=COPY_CHUNK_SIZE):
+    """
+    Copies the open file src into dst_file (None just reads) in chunks, feeding
+    digest if given. Calls progress(done_bytes) after every chunk and raises
+    TransferCancelled as soon as cancel (a threading.Event) is set.
+    """
+    done = 0
+    while True:
+        if cancel is not None and cancel.is_set():
+            raise TransferCancelled()
+        chunk = src.read(chunk_size)
+        if not chunk:
+            break
+        if digest is not None:
+            digest.update(chunk)
+        if dst_file is not None:
+            dst_file.write(chunk)
+        done += len(chunk)
+        if progress:
+            progress(done)
+    if dst_file is not None:
+        dst_file.flush()
+        os.fsync(dst_file.fileno())
+    return done
+
+
+def copy_durable(src, dst, progress=None, cancel=None, sha256=None):
+    # Writes dst under a temporary name, fsyncs it, then renames it into place; with sha256, only if the copy matches
+    temp_path = os.path.join(os.path.dirname(dst), f".{uuid.uuid4().hex}.tmp")
+    try:
+        digest = hashlib.sha256() if sha256 else None
+        with open(src, "rb") as s, open(temp_path, "xb") as d:
+            copy_stream(s, d, progress, cancel, digest)
+        if digest is not None and digest.hexdigest() != sha256:
+            raise OSError(f"{src} changed while it was being stored")
+        os.replace(temp_path, dst)
+        fsync_dir(os.path.dirname(dst))
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def reflink(src, dst):
+    # Copy-on-write clone; raises OSError where the platform or filesystem can't do it
+    try:
+        import fcntl
+    except ImportError:
+        raise OSError("reflinks are not supported on this platform")
+    with open(src, "rb") as s, open(dst, "xb") as d:
+        try:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        except OSError:
+            d.close()
+            os.remove(dst)
+            raise
+
+
+def link_file(src, dst):
+    # "hardlink" or "reflink", or None where the filesystem can do neither; FileExistsError if dst exists
+    try:
+        os.link(src, dst)
+        return "hardlink"
+    except FileExistsError:
+        raise
+    except OSError:
+        pass
+    try:
+        reflink(src, dst)
+        return "reflink"
+    except FileExistsError:
+        raise
+    except OSError:
+        return None
+
+
+def copy_reserved(src, dst, progress=None, cancel=None, sha256=None):
+    # Reserves the name (FileExistsError if taken), then swaps the complete, fsynced copy in over it
+    open(dst, "xb").close()
+    try:
+        copy_durable(src, dst, progress, cancel, sha256)
+    except BaseException:
+        os.remove(dst)
+        raise
+
+
+def link_or_copy(src, dst, progress=None, cancel=None):
+    # Raises FileExistsError if dst exists, so callers can use it to reserve names
+    kind = link_file(src, dst)
+    if kind is None:
+        copy_reserved(src, dst, progress, cancel)
+    return kind or "copy"
+
+
+def can_link(directory):
+    """
+    Whether files in directory can be linked to the blob store. Probed once
+    per directory with an empty file: FAT/exFAT and many SMB shares can't.
+    """
+    if directory not in _can_link:
+        os.makedirs(BLOB_DIR, exist_ok=True)
+        probe = f".{uuid.uuid4().hex}.probe"
+        src, dst = os.path.join(BLOB_DIR, probe), os.path.join(directory, probe)
+        open(src, "xb").close()
+        try:
+            _can_link[directory] = link_file(src, dst) is not None
+        finally:
+            for path in (src, dst):
+                if os.path.exists(path):
+                    os.remove(path)
+    return _can_link[directory]
+
+
+def ingest_blob(source_path, progress=None, cancel=None):
+    """
+    Stores source_path in the blob store and returns (sha256, size). The
+    source is hashed first and only copied when its content isn't stored
+    yet, so a duplicate costs one read and no writes; a new file is read
+    twice (hash, then copy) and the copy is checked against the hash.
+    The blob is fsynced before it's renamed into place, so an existing blob
+    is always complete.
+    """
+    os.makedirs(BLOB_DIR, exist_ok=True)
+    temp_path = os.path.join(BLOB_DIR, f".{uuid.uuid4().hex}.tmp")
+    try:
+        try:
+            reflink(source_path, temp_path)  # copy-on-write: hashing the clone is the only read
+            cloned = True
+        except OSError:
+            cloned = False
+
+        # Without a clone the hash pass is the first half of the progress, the copy the second
+        half = (lambda done: progress(done // 2)) if progress and not cloned else progress
+        digest = hashlib.sha256()
+        with open(temp_path if cloned else source_path, "rb") as s:
+            size = copy_stream(s, None, half, cancel, digest)
+        sha256 = digest.hexdigest()
+        target = blob_path(sha256)
+        if os.path.exists(target):
+            if progress:
+                progress(size)
+            return sha256, size
+
+        if cloned:
+            with open(temp_path, "rb+") as d:
+                os.fsync(d.fileno())
+        else:
+            copied = hashlib.sha256()
+            with open(source_path, "rb") as s, open(temp_path, "xb") as d:
+                copy_stream(s, d, progress and (lambda done: progress((size + done) // 2)), cancel, copied)
+            if copied.hexdigest() != sha256:
+                raise OSError(f"{source_path} changed while it was being stored")
+
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(temp_path, target)  # atomic: readers never see a partial blob
+        fsync_dir(os.path.dirname(target))
+        return sha256, size
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def retyped_path(file_path, doc_type):
+    # Relative path the document would have in the folder for doc_type
+    return relative_document_path(os.path.join(folder_for(doc_type), os.path.basename(abs_document_path(file_path))))
+
+
+def move_document(file_path, doc_type, progress=None, cancel=None):
+    """
+    Moves a stored document into the folder for doc_type and returns its new
+    relative path. A plain rename where possible; across devices the file is
+    copied durably first and the original removed only afterwards.
+    """
+    src = abs_document_path(file_path)
+    dst = abs_document_path(retyped_path(file_path, doc_type))
+    dest_dir = os.path.dirname(dst)
+    os.makedirs(dest_dir, exist_ok=True)
+    if os.path.exists(dst):
+        raise FileExistsError(f"{dst} already exists")
+
+    try:
+        os.rename(src, dst)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        copy_durable(src, dst, progress, cancel)
+        os.remove(src)
+    fsync_dir(dest_dir)
+    return relative_document_path(dst)
+
+
+def store_file(source_path, doc_type, dt, progress=None, cancel=None, find_copy=None):
+    """
+    Stores source_path in documents/<type>/ as
+    '<YYYY_MM_DD_HHMMSS>_<first 8 hex of sha256><ext>' and returns
+    (relative_path, sha256, size) once the file is durable.
+
+    Where the folder can link to the blob store, the content is stored there
+    once and the named file is a hardlink (or reflink) to it; pass sha256 and
+    size to the repository so the blob's reference count is updated with the
+    row. A hardlinked document shares its bytes with the blob and with every
+    duplicate, so files under documents/ must be treated as read-only: edit a
+    copy and add that instead.
+
+    Where links aren't possible (FAT/exFAT, many SMB shares) no blob is kept
+    (has_blob() is False) and the named file is the only copy. find_copy(sha256, size)
+    may return the relative path of a stored file with the same content,
+    which is then shared by the new row instead of being copied again.
+    progress(done_bytes) and cancel (a threading.Event) are for background callers.
+    """
+    dest_dir = folder_for(doc_type)
+    os.makedirs(dest_dir, exist_ok=True)
+
+    if can_link(dest_dir):
+        sha256, size = ingest_blob(source_path, progress, cancel)
+
+        def place(dest_path):
+            link_or_copy(blob_path(sha256), dest_path)
+    else:
+        # Hash first (the first half of the progress), then copy only content that isn't stored yet
+        digest = hashlib.sha256()
+        with open(source_path, "rb") as s:
+            size = copy_stream(s, None, progress and (lambda done: progress(done // 2)), cancel, digest)
+        sha256 = digest.hexdigest()
+        shared = find_copy(sha256, size) if find_copy else None
+        if shared:
+            if progress:
+                progress(size)
+            return shared, sha256, size
+
+        def place(dest_path):
+            copy_reserved(source_path, dest_path, progress and (lambda done: progress((size + done) // 2)), cancel, sha256)
+
+    ext = os.path.splitext(source_path)[1]  # e.g., ".pdf"
+    stem = f"{dt.strftime('%Y_%m_%d_%H%M%S')}_{sha256[:8]}"
+    for n in range(1, 1000):
+        name = f"{stem}{ext}" if n == 1 else f"{stem}_{n}{ext}"
+        dest_path = os.path.join(dest_dir, name)
+        try:
+            place(dest_path)
+            fsync_dir(dest_dir)
+            return relative_document_path(dest_path), sha256, size
+        except FileExistsError:
+            continue
+    raise FileExistsError(f"No free filename left for {stem} in {dest_dir}")
+
+
+def find_stored_copy(repo, sha256, size):
+    """
+    Relative path of an unarchived document's file holding this content, for
+    store_file(find_copy=...) where links aren't possible; None if there is none.
+    """
+    rows = repo.query('''
+        SELECT d.file_path FROM documents d
+        WHERE d.content_hash = ? AND NOT EXISTS (SELECT 1 FROM archived_documents a WHERE a.doc_id = d.id)
+    ''', (sha256,))
+    for (file_path,) in rows:
+        try:
+            if os.path.getsize(abs_document_path(file_path)) == size:
+                return file_path
+        except OSError:
+            continue
+    return None
+
+
+def paths_in_use(repo, file_paths, more_than=0):
+    """
+    The file_paths used by more than `more_than` rows; more_than=1 gives the
+    files several rows share (which happens where links aren't possible).
+    """
+    file_paths = list(set(file_paths))
+    used = set()
+    for start in range(0, len(file_paths), 500):
+        chunk = file_paths[start:start + 500]
+        used.update(row[0] for row in repo.query(
+            f"SELECT file_path FROM documents WHERE file_path IN ({','.join('?' * len(chunk))}) "
+            f"GROUP BY file_path HAVING COUNT(*) > ?", chunk + [more_than]
+        ))
+    return used
+
+
+def release_file(repo, file_path):
+    # Removes a document's file once no row uses it any more
+    if repo.query_one("SELECT 1 FROM documents WHERE file_path = ?", (file_path,)) is not None:
+        return False
+    try:
+        os.remove(abs_document_path(file_path))
+    except FileNotFoundError:
+        pass
+    return True
+
+
+def collect_blob(repo, sha256):
+    # Drops the stored blob once no document references it (the row is removed by trigger)
+    if not sha256:
+        return False
+    if repo.query_one("SELECT 1 FROM blobs WHERE sha256 = ?", (sha256,)) is not None:
+        return False
+    try:
+        os.remove(blob_path(sha256))
+    except FileNotFoundError:
+        pass
+    return True
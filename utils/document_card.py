@@ -0,0 +1,185 @@
+# utils/document_card.py
+
+import customtkinter as ctk
+
+from diagnostics import span
+
+# 🎨 Color by type
+COLOR_MAP = {
+    "incoming": "#1f6aa5",  # Blue
+    "outgoing": "#2e8b57",  # Green
+    "others": "#d2691e"  # Orange
+}
+DEFAULT_COLOR = "#444444"
+THUMB_WIDTH, THUMB_HEIGHT = 96, 128
+
+
+def truncate(text, max_chars=65):
+    return text if len(text) <= max_chars else text[:max_chars] + "…"
+
+
+class DocumentCard(ctk.CTkFrame):
+    """A card built once and rebound to a new document row with bind_doc()."""
+
+    def __init__(self, master, fonts, on_open, on_edit, on_delete, on_select):
+        super().__init__(master, corner_radius=10, fg_color=DEFAULT_COLOR)
+        self.doc = None
+        self.visible = False
+        self._color = DEFAULT_COLOR
+        self._has_description = True
+        self.thumbnail_pending = False  # a thumbnail should be requested once the card is in view
+
+        # Configure grid
+        self.grid_columnconfigure(0, weight=0)
+        self.grid_columnconfigure(1, weight=1)
+        self.grid_columnconfigure(2, weight=0)
+
+        # 🖼️ Left Column: First-page thumbnail, filled in lazily
+        self.thumb_label = ctk.CTkLabel(self, text="📄", width=THUMB_WIDTH, height=THUMB_HEIGHT,
+                                        fg_color="transparent", text_color="white", font=fonts["thumb"])
+        self.thumb_label.grid(row=0, column=0, rowspan=4, padx=(10, 0), pady=10, sticky="n")
+
+        # 🧾 Middle Column: Metadata
+        self.title_label = ctk.CTkLabel(self, text="", font=fonts["title"], text_color="white")
+        self.title_label.grid(row=0, column=1, sticky="w", padx=10, pady=(10, 0))
+
+        self.meta_label = ctk.CTkLabel(self, text="", text_color="white")
+        self.meta_label.grid(row=1, column=1, sticky="w", padx=10)
+
+        self.desc_label = ctk.CTkLabel(self, text="", font=fonts["description"], text_color="white")
+        self.desc_label.grid(row=3, column=1, sticky="w", padx=10, pady=(0, 10))
+
+        # 🧰 Right Column: Buttons
+        btn_frame = ctk.CTkFrame(self, fg_color="transparent")
+        btn_frame.grid(row=0, column=2, rowspan=4, padx=10, pady=10, sticky="ne")
+
+        ctk.CTkButton(btn_frame, text="🗃 Open", command=lambda: on_open(self.doc), width=80, fg_color="transparent", border_color="white", border_width=2).grid(row=0, column=0, pady=2)
+        ctk.CTkButton(btn_frame, text="✍ Edit", command=lambda: on_edit(self.doc), width=80, fg_color="transparent", border_color="white", border_width=2).grid(row=1, column=0, pady=2)
+        ctk.CTkButton(btn_frame, text="♻ Delete", command=lambda: on_delete(self.doc), width=80, fg_color="transparent", border_color="white", border_width=2, hover_color="#A52A2A").grid(row=2, column=0, pady=2)
+
+        # ☑️ Selection for batch actions
+        self.select_var = ctk.BooleanVar(value=False)
+        ctk.CTkCheckBox(btn_frame, text="Select", variable=self.select_var, width=80, text_color="white",
+                        command=lambda: on_select(self.doc, self.select_var.get())).grid(row=3, column=0, pady=(6, 2))
+
+    def bind_doc(self, doc, selected=False):
+        if self.select_var.get() != selected:
+            self.select_var.set(selected)
+        if doc == self.doc:
+            return
+        self.doc = doc
+        doc_id, title, doc_type, doc_class, date, sender, recipient, description, file_path = doc
+
+        # Drop the previous document's thumbnail; the new one loads when the card is in view
+        self.thumb_label.configure(image=None, text="📄")
+        self.thumbnail_pending = True
+
+        # Only touch what actually changed; fg_color redraws the whole frame
+        card_color = COLOR_MAP.get(doc_type.lower(), DEFAULT_COLOR)
+        if card_color != self._color:
+            self.configure(fg_color=card_color)
+            self._color = card_color
+
+        self.title_label.configure(text=f"📌 {truncate(title, 50)}")
+        meta = f"📜 {doc_type.upper()}  |  {(doc_class or '').upper()}   📅 {date}   FROM: {(sender or 'N/A').upper()} TO: {(recipient or 'N/A').upper()}"
+        self.meta_label.configure(text=meta)
+
+        if description:
+            self.desc_label.configure(text=truncate(description))
+            if not self._has_description:
+                self.desc_label.grid()
+        elif self._has_description:
+            self.desc_label.grid_remove()
+        self._has_description = bool(description)
+
+    def set_thumbnail(self, doc, image):
+        # Results arrive asynchronously; ignore them if the card was rebound meanwhile
+        if doc is self.doc:
+            self.thumb_label.configure(image=image, text="")
+
+
+class CardPool:
+    """
+    Keeps the card widgets of a scroll frame alive between refreshes.
+    Cards are created on demand up to the largest page shown so far and
+    then only rebound, so paging costs configure() calls, not new widgets.
+    """
+
+    def __init__(self, master, on_open, on_edit, on_delete, on_selection_change=None):
+        self.master = master
+        self.callbacks = (on_open, on_edit, on_delete, self._on_select)
+        self.on_selection_change = on_selection_change
+        self.selected = set()  # doc ids; survives paging and refreshes
+        self.cards = []
+        self.fonts = {
+            "title": ctk.CTkFont(size=18, weight="bold"),
+            "description": ctk.CTkFont(size=16, weight="bold"),
+            "thumb": ctk.CTkFont(size=32),
+        }
+        self.empty_label = ctk.CTkLabel(master, text="No documents found.")
+        self.empty_visible = False
+
+    def _acquire(self, index):
+        if index == len(self.cards):
+            self.cards.append(DocumentCard(self.master, self.fonts, *self.callbacks))
+        return self.cards[index]
+
+    def _on_select(self, doc, selected):
+        if selected:
+            self.selected.add(doc[0])
+        else:
+            self.selected.discard(doc[0])
+        if self.on_selection_change:
+            self.on_selection_change(self.selected)
+
+    def select_all_visible(self):
+        for card in self.visible_cards():
+            card.select_var.set(True)
+            self.selected.add(card.doc[0])
+        if self.on_selection_change:
+            self.on_selection_change(self.selected)
+
+    def clear_selection(self):
+        self.selected.clear()
+        for card in self.cards:
+            card.select_var.set(False)
+        if self.on_selection_change:
+            self.on_selection_change(self.selected)
+
+    def show(self, rows):
+        with span("widgets.cards", rows=len(rows)):
+            self._show(rows)
+
+    def _show(self, rows):
+        if rows and self.empty_visible:
+            self.empty_label.pack_forget()
+            self.empty_visible = False
+
+        # Visible cards are always a prefix of the pool, so packing in order keeps them sorted
+        for index, doc in enumerate(rows):
+            card = self._acquire(index)
+            card.bind_doc(doc, doc[0] in self.selected)
+            if not card.visible:
+                card.pack(pady=10, padx=10, fill="x")
+                card.visible = True
+
+        for card in self.cards[len(rows):]:
+            if card.visible:
+                card.pack_forget()
+                card.visible = False
+
+        if not rows and not self.empty_visible:
+            self.empty_label.pack(pady=20)
+            self.empty_visible = True
+
+    def visible_cards(self):
+        return [card for card in self.cards if card.visible]
+
+    def cards_in_view(self, canvas):
+        # Shown cards that currently overlap the scrolled viewport of `canvas`
+        top = canvas.canvasy(0)
+        bottom = top + canvas.winfo_height()
+        return [
+            card for card in self.visible_cards()
+            if card.winfo_y() < bottom and card.winfo_y() + card.winfo_height() > top
+        ]
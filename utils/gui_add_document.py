@@ -1,36 +1,37 @@
-import random
+# utils/gui_add_document.py
 
 import customtkinter as ctk
 from tkinter import filedialog, messagebox
 import os
-import shutil
 import sqlite3
 import time
 
 from datetime import datetime
+from base_popup import BasePopup
 from db_init import init_db
-from tkcalendar import DateEntry
+from batch_actions import add_document
+from diagnostics import timings
+from doc_repository import get_repository
+from doc_storage import FOLDER_MAP
+from PIL import Image, ImageTk
 
 from toast_manager import ToastManager
+from transfer_task import TransferTask
 
 # 🔐 Paths
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DB_PATH = os.path.join(BASE_DIR, "db", "document_store.db")
 DOCS_DIR = os.path.join(BASE_DIR, "documents")
 
-# ✅ Initialize DB
-init_db()
 
-ctk.set_appearance_mode("System")
-ctk.set_default_color_theme("blue")
+class DocumentFormMixin:
+    """
+    The Add Document form, shared by the dashboard's popup and the standalone
+    window. Subclasses set self.repo, call build_form() and may override
+    on_document_saved().
+    """
 
-class DocumentUploader(ctk.CTk):
-    def __init__(self):
-        super().__init__()
-        self.title("Document Form")
-        self.geometry("450x600")
-        icon_path = os.path.join(BASE_DIR, "assets", "icon.ico")
-        self.iconbitmap(icon_path)
+    def build_form(self):
         self.grid_columnconfigure(1, weight=1)
 
         # Row 0: Title
@@ -87,15 +88,25 @@ class DocumentUploader(ctk.CTk):
         self.submit_button = ctk.CTkButton(self, text="➕ Save Document", command=self.add_document)
         self.submit_button.grid(row=10, column=0, columnspan=2, pady=20)
 
+        # Row 8: Copy progress, shown only while a file is being stored
+        self.progress_bar = ctk.CTkProgressBar(self)
+        self.progress_bar.set(0)
+        self.cancel_button = ctk.CTkButton(self, text="✖ Cancel", width=80, fg_color="#8B0000",
+                                           command=self.cancel_transfer)
+
         self.file_path = None
+        self.transfer = None
 
     def select_file(self):
         filetypes = [("PDF files", "*.pdf"), ("Image files", "*.jpg *.png"), ("All files", "*.*")]
-        self.file_path = filedialog.askopenfilename(title="Select Document", filetypes=filetypes)
+        self.file_path = filedialog.askopenfilename(parent=self, title="Select Document", filetypes=filetypes)
         if self.file_path:
             self.file_button.configure(text=os.path.basename(self.file_path))
 
     def add_document(self):
+        if self.transfer is not None:
+            return
+
         title = self.title_entry.get().strip()
         doc_type = self.type_option.get().strip()
         doc_class = self.class_option.get().strip()
@@ -106,57 +117,77 @@ class DocumentUploader(ctk.CTk):
         description = self.desc_entry.get("1.0", "end").strip() or None
 
         if not title or not date_str or not self.file_path:
-            messagebox.showerror("Missing Info", "Please fill in all required fields.")
+            messagebox.showerror("Missing Info", "Please fill in all required fields.", parent=self)
             return
 
         try:
-            # Parse and reformat into filename-friendly string
             dt = datetime.strptime(f"{date_str} {time_str}", "%Y-%m-%d %H:%M:%S")
-            timestamp_str = dt.strftime("%Y_%m_%d_%H%M%S")  # e.g., "2025_07_08_144530"
         except ValueError:
             ToastManager.show_error(self, "Invalid date or time format.")
             return
 
-        folder_map = {"incoming": "incoming", "outgoing": "outgoing", "others": "others"}
-        folder = folder_map.get(doc_type)
-
-        if not folder:
+        if doc_type not in FOLDER_MAP:
             ToastManager.show_warning(self, f"Unrecognized document type: {doc_type}")
             return
-        dest_dir = os.path.join(DOCS_DIR, folder)
-        os.makedirs(dest_dir, exist_ok=True)
-
-        # Generate a short random number to ensure uniqueness
-        rand_suffix = str(random.randint(100, 999))  # e.g., "742"
-
-        # Get original file extension
-        original_ext = os.path.splitext(self.file_path)[1]  # e.g., ".pdf"
-
-        # Build new filename
-        new_filename = f"{timestamp_str}_{rand_suffix}{original_ext}"
-        dest_path = os.path.join(dest_dir, new_filename)
 
         try:
-            shutil.copy2(self.file_path, dest_path)
-        except Exception as e:
-            messagebox.showerror("File Error", f"Could not move file: {e}")
+            total = os.path.getsize(self.file_path)
+        except OSError as e:
+            messagebox.showerror("File Error", f"Could not read file: {e}", parent=self)
             return
 
-        relative_path = os.path.relpath(dest_path, BASE_DIR)
-
-        try:
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO documents (title, doc_type,doc_class, date, sender, recipient, description, file_path)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (title, doc_type, doc_class, dt, sender, recipient, description, relative_path))
-            conn.commit()
-            conn.close()
-            ToastManager.show_success(self, "Document updated successfully!")
-            self.reset_form()
-        except sqlite3.Error as e:
-            ToastManager.show_error(self, f"Database error: {str(e)}")
+        source_path = self.file_path
+        repo = self.repo
+        started = time.perf_counter()
+
+        def run(progress, cancel):
+            # 📁 Stored content-addressed under documents/<type>/ (or uploaded to the document server)
+            try:
+                return add_document(repo, source_path, title, doc_type, doc_class, dt, sender, recipient, description,
+                                    progress, cancel)
+            finally:
+                repo.release_connection()
+
+        def done(doc_id):
+            self.end_transfer()
+            timings.record("ui.add_document", (time.perf_counter() - started) * 1000)
+            ToastManager.show_success(self, "Document added successfully!")
+            self.on_document_saved(doc_id)
+
+        def failed(error):
+            self.end_transfer()
+            if isinstance(error, sqlite3.Error):
+                ToastManager.show_error(self, f"Database error: {error}")
+            else:
+                messagebox.showerror("File Error", f"Could not copy file: {error}", parent=self)
+
+        def cancelled():
+            self.end_transfer()
+            ToastManager.show_warning(self, "Upload cancelled.")
+
+        self.begin_transfer()
+        self.transfer = TransferTask(
+            self, run, total=total, on_done=done, on_error=failed,
+            on_progress=self.progress_bar.set, on_cancelled=cancelled
+        )
+
+    def begin_transfer(self):
+        self.submit_button.configure(state="disabled", text="Saving...")
+        self.file_button.configure(state="disabled")
+        self.progress_bar.set(0)
+        self.progress_bar.grid(row=11, column=0, columnspan=2, padx=20, pady=(0, 5), sticky="ew")
+        self.cancel_button.grid(row=12, column=0, columnspan=2, pady=(0, 15))
+
+    def end_transfer(self):
+        self.transfer = None
+        self.progress_bar.grid_remove()
+        self.cancel_button.grid_remove()
+        self.submit_button.configure(state="normal", text="➕ Save Document")
+        self.file_button.configure(state="normal")
+
+    def cancel_transfer(self):
+        if self.transfer is not None:
+            self.transfer.cancel()
 
     def reset_form(self):
         self.title_entry.delete(0, 'end')
@@ -168,6 +199,51 @@ class DocumentUploader(ctk.CTk):
         self.file_button.configure(text="📁 Browse")
         self.file_path = None
 
+    def on_document_saved(self, doc_id):
+        self.reset_form()
+
+
+class AddDocumentPopup(DocumentFormMixin, BasePopup):
+    # Opened from the dashboard: shares its interpreter, modules and repository
+    def __init__(self, master, refresh_callback, repo=None):
+        super().__init__(master, title="Document Form", size="450x600")
+        self.repo = repo or get_repository(DB_PATH)
+        self.transient(master)
+        self.grab_set()
+        self.focus()
+        icon_path = os.path.join(BASE_DIR, "assets", "icon.png")
+        self.icon_photo = ImageTk.PhotoImage(Image.open(icon_path))
+        self.wm_iconphoto(False, self.icon_photo)
+        self.refresh_callback = refresh_callback
+        self.build_form()
+
+    def on_document_saved(self, doc_id):
+        self.submit_button.configure(state="disabled")
+        self.refresh_callback()
+        self.after(1000, self.destroy)
+
+    def destroy(self):
+        # Closing mid-upload cancels it; the partial copy is cleaned up by the worker
+        if self.transfer is not None:
+            self.transfer.stop_polling()
+        super().destroy()
+
+
+class DocumentUploader(DocumentFormMixin, ctk.CTk):
+    # Standalone window, kept for launching the form on its own
+    def __init__(self):
+        super().__init__()
+        self.title("Document Form")
+        self.geometry("450x600")
+        icon_path = os.path.join(BASE_DIR, "assets", "icon.ico")
+        self.iconbitmap(icon_path)
+        self.repo = get_repository(DB_PATH)
+        self.build_form()
+
+
 if __name__ == "__main__":
+    ctk.set_appearance_mode("System")
+    ctk.set_default_color_theme("blue")
+    init_db()
     app = DocumentUploader()
     app.mainloop()
@@ -1,35 +1,55 @@
 # utils/gui_dashboard.py
 
-from PIL import Image
+import calendar
 import json
 import os
-import sqlite3
-import webbrowser
-import subprocess
+import re
+import time
+from datetime import datetime, timedelta
 import customtkinter as ctk
 import tkinter as tk
-import time
 
 from toast_manager import ToastManager
-# 🔁 Import Edit Document Popup
-from gui_edit_document import EditDocumentPopup
+from diagnostics import timings
 
 # 🔁 Import Paginator for pagination controls
 from paginator import Paginator
+from document_card import CardPool
+from text_indexer import TextIndexer
+from doc_query import SORT_OPTIONS, DEFAULT_SORT, build_facet_query, build_filters, build_timeline_query
+from doc_client import DOWNLOAD_DIR, open_repository
+from doc_storage import abs_document_path
+from batch_actions import batch_delete, batch_reclassify, batch_retype
+from query_executor import QueryExecutor
+from result_cache import ResultCache
+from thumbnail_cache import ThumbnailCache
+from timeline_panel import TimelinePanel
 
 # from CTkMessagebox import CTkMessagebox
 from tkinter import messagebox
 
 # 🔁 Import DB initializer
-from db_init import init_db
+from db_init import init_db, normalize_date
+
+DOC_TYPES = ["incoming", "outgoing", "others"]
+DOC_CLASSES = ["advisory", "circular", "endorsement", "executive order", "memorandum", "office order", "ordinance", "policy", "resolution", "others"]
 
 # 🔐 Paths
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DB_PATH = os.path.join(BASE_DIR, "db", "document_store.db")
 DOCS_DIR = os.path.join(BASE_DIR, "documents")
-ADD_DOC_SCRIPT = os.path.join(BASE_DIR, "utils", "gui_add_document.py")
 SETTINGS_PATH = os.path.join(BASE_DIR, "settings.json")
 
+SEARCH_DEBOUNCE_MS = 300
+THUMBNAIL_DELAY_MS = 100
+CHANGE_POLL_MS = 500
+
+# "incoming (1,234)" -> "incoming": filter menus show facet counts after each option
+FACET_LABEL = re.compile(r"^(.*) \([\d,]+\)$")
+
+# Row columns a sort depends on: if they change the card may move, so the page is re-queried
+SORT_COLUMNS = {"Date": (4,), "Title": (1,), "Sender": (5,), "Relevance": (1, 5, 6, 7)}
+
 
 def load_settings():
     if os.path.exists(SETTINGS_PATH):
@@ -48,8 +68,10 @@ def save_settings(settings):
     with open(SETTINGS_PATH, "w") as f:
         json.dump(settings, f, indent=4)
 
-# ✅ Initialize DB on startup
-init_db()
+
+def facet_value(label):
+    match = FACET_LABEL.match(label)
+    return match.group(1) if match else label
 
 ctk.set_appearance_mode("Dark")  # Options: "System" (default), "Light", "Dark")
 ctk.set_default_color_theme("blue")
@@ -63,15 +85,34 @@ class DocumentDashboard(ctk.CTk):
         self.iconbitmap(icon_path)
 
 
+        # 🌐 settings.json "server_url" points the dashboard at a document server instead of DB_PATH
         self.settings = load_settings()
+        self.repo = open_repository(self.settings, DB_PATH)
+        self.executor = QueryExecutor(self, interrupt=self.repo.interrupt)
+        self.result_cache = ResultCache(max_entries=64)
+        self._change_seq = None  # last document_changes.seq applied to the cards
+        self._change_token = None
+        self._change_poll_busy = False
+        self._change_recheck = False
+        self._change_poll_id = None
+        self._facet_key = None  # (facet query, change token) the menus' counts are for
+        self._facet_counts = None
+        self._timeline_key = None
+        self.export_task = None
+        self.integrity_task = None
+        self.batch_task = None
+
         ctk.set_appearance_mode(self.settings.get("theme", "System"))
+        if self.settings.get("diagnostics_log"):
+            timings.enable_log()
 
         # Create a native menu bar
         menu_bar = tk.Menu(self)
         # File Menu
         file_menu = tk.Menu(menu_bar, tearoff=0)
         file_menu.add_command(label="New Document", command=self.open_add_document)
-        file_menu.add_command(label="Exit", command=self.quit)
+        file_menu.add_command(label="Export Results...", command=self.export_results)
+        file_menu.add_command(label="Exit", command=self.on_exit)
         menu_bar.add_cascade(label="File", menu=file_menu)
 
         # Edit Menu
@@ -86,11 +127,14 @@ class DocumentDashboard(ctk.CTk):
 
         # Help Menu
         help_menu = tk.Menu(menu_bar, tearoff=0)
+        help_menu.add_command(label="Diagnostics", command=self.open_diagnostics)
+        help_menu.add_command(label="Check Files...", command=self.check_files)
         help_menu.add_command(label="About", command=self.show_about)
         menu_bar.add_cascade(label="Help", menu=help_menu)
 
         # Attach the menu to the window
         self.configure(menu=menu_bar)
+        self.protocol("WM_DELETE_WINDOW", self.on_exit)
 
         # 🔍 Search + Filter Row
         top_frame = ctk.CTkFrame(self,fg_color="transparent")
@@ -100,29 +144,109 @@ class DocumentDashboard(ctk.CTk):
         self.current_page = 1
         self.docs_per_page = 10
 
-        self.search_entry = ctk.CTkEntry(top_frame, placeholder_text="Search by title, sender, or recipient...")
+        self.search_entry = ctk.CTkEntry(top_frame, placeholder_text="Search title, sender, recipient or description...")
         self.search_entry.pack(side="left", padx=(0, 10), fill="x", expand=True)
-
-        self.type_filter = ctk.CTkOptionMenu(top_frame, values=["All", "incoming", "outgoing", "others"])
+        # ⌨️ Search as you type, once typing pauses
+        self._search_after_id = None
+        self._last_search_term = ""
+        self.search_entry.bind("<KeyRelease>", self.on_search_key)
+        self.search_entry.bind("<Return>", lambda _: self.search())
+
+        self.type_filter = ctk.CTkOptionMenu(top_frame, values=["All"] + DOC_TYPES,
+                                             command=lambda _: self.search())
         self.type_filter.set("All")
         self.type_filter.pack(side="left", padx=(0, 10))
 
-        self.class_filter = ctk.CTkOptionMenu(top_frame, values=["All", "advisory", "circular", "endorsement", "executive order", "memorandum", "office order", "ordinance", "policy", "resolution", "others"])
+        self.class_filter = ctk.CTkOptionMenu(top_frame, values=["All"] + DOC_CLASSES,
+                                              command=lambda _: self.search())
         self.class_filter.set("All")
         self.class_filter.pack(side="left", padx=(0, 10))
 
-        search_btn = ctk.CTkButton(top_frame, text="🔍 Search", command=self.load_documents)
+        # 📅 Date range (inclusive, by day) and the year → month timeline
+        self.date_from_entry = ctk.CTkEntry(top_frame, placeholder_text="From YYYY-MM-DD", width=115)
+        self.date_from_entry.pack(side="left", padx=(0, 5))
+        self.date_to_entry = ctk.CTkEntry(top_frame, placeholder_text="To YYYY-MM-DD", width=115)
+        self.date_to_entry.pack(side="left", padx=(0, 5))
+        for entry in (self.date_from_entry, self.date_to_entry):
+            entry.bind("<Return>", lambda _: self.search())
+        ctk.CTkButton(top_frame, text="📅", width=32, command=self.toggle_timeline).pack(side="left", padx=(0, 10))
+
+        self.sort_option = ctk.CTkOptionMenu(top_frame, values=list(SORT_OPTIONS), width=90,
+                                             command=lambda _: self.search())
+        self.sort_option.set(DEFAULT_SORT)
+        self.sort_option.pack(side="left", padx=(0, 10))
+
+        search_btn = ctk.CTkButton(top_frame, text="🔍 Search", command=self.search)
         search_btn.pack(side="left")
 
+        self.timeline = TimelinePanel(self, on_select=self.select_timeline_bucket)
+        self._timeline_visible = False
+
+        # ☑️ Batch actions, shown while any card is selected
+        self.batch_frame = ctk.CTkFrame(self, fg_color="transparent")
+        self.batch_label = ctk.CTkLabel(self.batch_frame, text="")
+        self.batch_label.pack(side="left", padx=(0, 10))
+        ctk.CTkButton(self.batch_frame, text="Select page", width=90,
+                      command=lambda: self.card_pool.select_all_visible()).pack(side="left", padx=(0, 10))
+        self.batch_type = ctk.CTkOptionMenu(self.batch_frame, values=DOC_TYPES, width=120,
+                                            command=self.batch_retype_selected)
+        self.batch_type.set("Move to…")
+        self.batch_type.pack(side="left", padx=(0, 10))
+        self.batch_class = ctk.CTkOptionMenu(self.batch_frame, values=DOC_CLASSES, width=140,
+                                             command=self.batch_reclassify_selected)
+        self.batch_class.set("Set class…")
+        self.batch_class.pack(side="left", padx=(0, 10))
+        ctk.CTkButton(self.batch_frame, text="♻ Delete", width=80, fg_color="#8B0000",
+                      command=self.batch_delete_selected).pack(side="left", padx=(0, 10))
+        ctk.CTkButton(self.batch_frame, text="Clear", width=60,
+                      command=lambda: self.card_pool.clear_selection()).pack(side="left")
+        self._batch_visible = False
+
+        # ⏳ Batch progress, shown while a batch runs (its files are moved on its own thread)
+        self.batch_progress_frame = ctk.CTkFrame(self, fg_color="transparent")
+        self.batch_progress_label = ctk.CTkLabel(self.batch_progress_frame, text="")
+        self.batch_progress_label.pack(side="left", padx=(0, 10))
+        self.batch_bar = ctk.CTkProgressBar(self.batch_progress_frame)
+        self.batch_bar.pack(side="left", fill="x", expand=True, padx=(0, 10))
+        ctk.CTkButton(self.batch_progress_frame, text="Cancel", width=70,
+                      command=lambda: self.batch_task and self.batch_task.cancel()).pack(side="left")
+
+        # ⬇️ Export progress, shown while an export runs
+        self.export_frame = ctk.CTkFrame(self, fg_color="transparent")
+        self.export_label = ctk.CTkLabel(self.export_frame, text="")
+        self.export_label.pack(side="left", padx=(0, 10))
+        self.export_bar = ctk.CTkProgressBar(self.export_frame)
+        self.export_bar.pack(side="left", fill="x", expand=True, padx=(0, 10))
+        ctk.CTkButton(self.export_frame, text="Cancel", width=70,
+                      command=lambda: self.export_task and self.export_task.cancel()).pack(side="left")
+
         # 📋 Scrollable Document List
         self.scroll_frame = ctk.CTkScrollableFrame(self, width=750, height=500)
         self.scroll_frame.pack(pady=10, padx=20, fill="both", expand=True)
+        self.card_pool = CardPool(
+            self.scroll_frame,
+            on_open=self.open_file,
+            on_edit=self.edit_doc,
+            on_delete=self.delete_doc,
+            on_selection_change=self.on_selection_change
+        )
+
+        # 🖼️ Thumbnails load for the cards scrolled into view, after scrolling settles
+        self.thumbnails = ThumbnailCache(self)
+        self._thumbnail_after_id = None
+        canvas = self.scroll_frame._parent_canvas
+        scrollbar_set = self.scroll_frame._scrollbar.set
+
+        def on_view_change(*args):
+            scrollbar_set(*args)
+            self.schedule_thumbnails()
+
+        canvas.configure(yscrollcommand=on_view_change)
 
         # 🔄 Pagination Controls
         self.paginator = Paginator(
             master=self,
             on_page_change=self.load_documents,
-            total_count_fn=self.get_total_document_count
         )
 
         # 👤 Developer Signature
@@ -134,7 +258,101 @@ class DocumentDashboard(ctk.CTk):
         )
         footer.pack(side="bottom", pady=2)
 
+        # 🚀 Show the window first; the schema check and first page run in the background
+        # (a document server migrates its own database and runs its own indexer)
+        self.text_indexer = None if self.repo.remote else TextIndexer(DB_PATH)
+        self.paginator.set_loading(True)
+        self.executor.submit("init", self.repo.change_token if self.repo.remote else init_db, self.on_db_ready, self.on_query_error)
+
+    def on_db_ready(self, token=None):
+        if self.repo.remote:
+            self._change_token = token
         self.load_documents()
+        # 📄 Index file contents in the background once the window is up
+        if self.text_indexer is not None:
+            self.after(2000, self.text_indexer.start)
+
+        # 📰 Follow the change feed from here on; old entries are pruned once per start
+        self.executor.submit("prune-changes", self.repo.prune_changes)
+        self.poll_changes()
+
+    # 📰 Incremental updates
+
+    def poll_changes(self):
+        self.check_changes()
+        self._change_poll_id = self.after(CHANGE_POLL_MS, self.poll_changes)
+
+    def change_token(self):
+        # Remote: the token the change poll last fetched; asking the server here would block Tk on the network
+        return self._change_token if self.repo.remote else self.repo.change_token()
+
+    def check_changes(self):
+        """
+        Cheap when nothing happened: one PRAGMA data_version on the worker.
+        Otherwise reads which ids changed since the last check (from any process)
+        and patches those cards in place.
+        """
+        if self._change_poll_busy:
+            self._change_recheck = True  # e.g. our own save landed while a poll was running
+            return
+        self._change_poll_busy = True
+        filters = self.get_filters()
+        sort = self.sort_option.get()
+        seq, last_token = self._change_seq, self._change_token
+
+        def run():
+            token = self.repo.change_token()
+            if seq is None:
+                return token, self.repo.latest_change(), None
+            if token == last_token:
+                return token, seq, None
+            doc_ids, latest, complete = self.repo.changes_since(seq)
+            if not doc_ids:
+                return token, latest, None
+            if not complete:
+                return token, latest, "reload"
+            rows = self.repo.fetch_matching(filters, doc_ids)
+            total = self.repo.cached_count(filters)
+            if total is None:
+                total = self.repo.count(filters)
+            return token, latest, (doc_ids, rows, total)
+
+        def done(result):
+            self._change_poll_busy = False
+            token, self._change_seq, changes = result
+            self._change_token = token
+            if changes == "reload":
+                self.load_documents(keep_scroll=True)
+            elif changes and filters == self.get_filters() and sort == self.sort_option.get():
+                self.apply_changes(sort, *changes)
+            if self._change_recheck:
+                self._change_recheck = False
+                self.check_changes()
+
+        def failed(error):
+            self._change_poll_busy = False
+
+        self.executor.submit("changes", run, done, failed)
+
+    def apply_changes(self, sort, doc_ids, rows, total):
+        visible = {card.doc[0]: card for card in self.card_pool.visible_cards()}
+        rows_by_id = {row[0]: row for row in rows}
+        columns = SORT_COLUMNS.get(sort, ())
+        requery = False
+
+        for doc_id in doc_ids:
+            card, row = visible.get(doc_id), rows_by_id.get(doc_id)
+            if card is not None and row is not None and all(card.doc[i] == row[i] for i in columns):
+                card.bind_doc(row, doc_id in self.card_pool.selected)  # edited in place
+            elif card is not None or row is not None:
+                requery = True  # left, joined or moved within the list
+
+        if requery:
+            self.load_documents(keep_scroll=True)
+        else:
+            self.paginator.update(total)
+            self.refresh_facets()
+            self.refresh_timeline()
 
     def open_settings(self):
         settings_win = ctk.CTkToplevel(self)
@@ -173,6 +391,8 @@ class DocumentDashboard(ctk.CTk):
         about.grab_set()
         about.focus()
 
+        from PIL import Image
+
         # 📷 Load and show logo
         logo_path = os.path.join(BASE_DIR, "assets", "icon.png")
         if os.path.exists(logo_path):
@@ -185,181 +405,513 @@ class DocumentDashboard(ctk.CTk):
         ctk.CTkLabel(about, text="Code & Developed by Rosel Francisco", text_color="#2e8b57").pack(pady=(10, 5))
         ctk.CTkLabel(about, text="© 2025").pack()
 
+    def open_diagnostics(self):
+        from gui_diagnostics import DiagnosticsWindow
+
+        def extra_stats():
+            total = self.result_cache.hits + self.result_cache.misses
+            stats = {
+                "page cache hits": f"{self.result_cache.hits}/{total}",
+                "cards pooled": len(self.card_pool.cards),
+            }
+            if self.repo.remote:
+                remote = self.repo.stats()
+                stats["server"] = self.repo.url
+                stats["server requests"] = remote["requests"]
+                stats["served from cache / 304"] = f"{remote['cache_hits']} / {remote['not_modified']}"
+            return stats
+
+        def on_log_toggle(enabled):
+            self.settings["diagnostics_log"] = enabled
+            save_settings(self.settings)
+
+        DiagnosticsWindow(self, extra_stats=extra_stats, on_log_toggle=on_log_toggle)
+
+    def check_files(self):
+        # 🩺 Integrity check in the background, then offer the repairs it found
+        if self.repo.remote:
+            ToastManager.show_warning(self, "Run utils/integrity_check.py on the document server.")
+            return
+        if self.integrity_task is not None:
+            ToastManager.show_warning(self, "A file check is already running.")
+            return
+        from integrity_check import check, repair
+        from transfer_task import TransferTask
+
+        def failed(error):
+            self.integrity_task = None
+            ToastManager.show_error(self, f"File check failed: {error}")
+
+        def repaired(done):
+            self.integrity_task = None
+            ToastManager.show_success(
+                self, f"Relinked {done['relinked']}, quarantined {done['quarantined']}, flagged {done['flagged']}.", duration=5000
+            )
+            self.check_changes()
+
+        def checked(report):
+            self.integrity_task = None
+            if report.clean:
+                ToastManager.show_success(self, f"All {report.files:,} files match the database.")
+                return
+            found = report.summary()
+            question = (
+                f"Missing files: {found['missing']}\nMoved files: {found['moved']}\n"
+                f"Changed content: {found['corrupt'] + found['bad_blobs']}\nOrphaned files: {found['orphans']}\n"
+                f"Missing blobs: {found['missing_blobs']}\nMissing archive packs: {found['missing_packs']}\n\n"
+                "Relink moved files, restore blobs, move orphans to documents/.quarantine and flag missing or changed documents?"
+            )
+            if messagebox.askyesno("Check Files", question):
+                self.integrity_task = TransferTask(self, self.releasing(lambda progress, cancel: repair(self.repo, report)),
+                                                   on_done=repaired, on_error=failed)
+
+        ToastManager.show_info(self, "Checking files...")
+        self.integrity_task = TransferTask(
+            self, self.releasing(lambda progress, cancel: check(self.repo, progress=progress, cancel=cancel)),
+            on_done=checked, on_error=failed
+        )
+
+    def releasing(self, fn):
+        # For TransferTask threads: closes the database (or HTTP) connection the thread opened once fn returns
+        def run(progress, cancel):
+            try:
+                return fn(progress, cancel)
+            finally:
+                self.repo.release_connection()
+        return run
+
+    def on_exit(self):
+        if self._change_poll_id:
+            self.after_cancel(self._change_poll_id)
+        for task in (self.export_task, self.integrity_task, self.batch_task):
+            if task is not None:
+                task.stop_polling()
+        if self.text_indexer is not None:
+            self.text_indexer.stop()
+        self.thumbnails.shutdown()
+        self.executor.shutdown()
+        self.quit()
+        self.repo.close()
+
     def reset_filters(self):
+        self.result_cache.clear()
         self.search_entry.delete(0, 'end')
         self.type_filter.set("All")
+        self.set_date_range("", "")
+        self.search()
+
+    def on_search_key(self, event=None):
+        if self._search_after_id:
+            self.after_cancel(self._search_after_id)
+        self._search_after_id = self.after(SEARCH_DEBOUNCE_MS, self._search_if_changed)
+
+    def _search_if_changed(self):
+        self._search_after_id = None
+        # Arrow keys, Shift etc. also fire KeyRelease without changing the term
+        if self.search_entry.get().strip() != self._last_search_term:
+            self.search()
+
+    def search(self):
+        if self.date_range() is None:
+            ToastManager.show_warning(self, "Invalid date. Use YYYY-MM-DD.")
+            return
+        if self._search_after_id:
+            self.after_cancel(self._search_after_id)
+            self._search_after_id = None
+        self._last_search_term = self.search_entry.get().strip()
+
+        # Filters or sort changed: start again from the first page
+        self.paginator.reset()
         self.load_documents()
 
     def open_add_document(self):
-        subprocess.Popen(["python", ADD_DOC_SCRIPT], shell=True)
-
-    def get_total_document_count(self):
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-
-        query = "SELECT COUNT(*) FROM documents"
-        params = []
-
-        filters = []
-        doc_type = self.type_filter.get()
-        doc_class = self.class_filter.get()
-        search_term = self.search_entry.get().strip().lower()
-
-        if doc_type != "All":
-            filters.append("doc_type = ?")
-            params.append(doc_type)
-        if doc_class != "All":
-            filters.append("doc_class = ?")
-            params.append(doc_class)
-        if search_term:
-            filters.append("(LOWER(title) LIKE ? OR LOWER(sender) LIKE ? OR LOWER(recipient) LIKE ?)")
-            params.extend([f"%{search_term}%"] * 3)
-
-        if filters:
-            query += " WHERE " + " AND ".join(filters)
-
-        cursor.execute(query, params)
-        count = cursor.fetchone()[0]
-        conn.close()
-        return count
-
-    def load_documents(self):
-        search_term = self.search_entry.get().strip().lower()
-        selected_type = self.type_filter.get().lower()
-        selected_class = self.class_filter.get().lower()
-
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-
-        query = "SELECT id, title, doc_type, doc_class, date, sender, recipient, description, file_path FROM documents WHERE 1=1"
-        params = []
-
-        # Filter by doc_type
-        if selected_type != "all":
-            query += " AND doc_type = ?"
-            params.append(selected_type)
-
-        # Filter by doc_class
-        if selected_class != "all":
-            query += " AND doc_class = ?"
-            params.append(selected_class)
-
-        # Filter by search keyword
-        if search_term:
-            query += " AND (title LIKE ? OR sender LIKE ? OR recipient LIKE ?)"
-            params.extend([f"%{search_term}%"] * 3)
-
-        query += " ORDER BY date DESC"
-        cursor.execute(query, params)
-
-        rows = cursor.fetchall()
-        conn.close()
-
-        # Clear previous cards
-        for widget in self.scroll_frame.winfo_children():
-            widget.destroy()
-
-        # Render cards
-        if not rows:
-            ctk.CTkLabel(self.scroll_frame, text="No documents found.").pack(pady=20)
-        else:
-            for doc in rows:
-                self.create_card(doc)
-
-        # ✅ Update paginator display
-        self.paginator.update()
-
-    def create_card(self, doc):
-        doc_id, title, doc_type,doc_class, date, sender, recipient, description, file_path = doc
-
-        # 🎨 Color by type
-        color_map = {
-            "incoming": "#1f6aa5",  # Blue
-            "outgoing": "#2e8b57",  # Green
-            "others": "#d2691e"  # Orange
-        }
-        card_color = color_map.get(doc_type.lower(), "#444444")
-
-        def truncate_title(text, max_chars=50):
-            return text if len(text) <= max_chars else text[:max_chars] + "…"
-
-        def truncate(text, max_chars=65):
-            return text if len(text) <= max_chars else text[:max_chars] + "…"
-
-
-        card = ctk.CTkFrame(self.scroll_frame, corner_radius=10, fg_color=card_color)
-        card.pack(pady=10, padx=10, fill="x")
-
-        # Configure grid
-        card.grid_columnconfigure(0, weight=1)
-        card.grid_columnconfigure(1, weight=0)
-
-        # 🧾 Left Column: Metadata
-        title_label = ctk.CTkLabel(card, text=f"📌 {truncate_title(title)}", font=ctk.CTkFont(size=18, weight="bold"),
-                                   text_color="white")
-        title_label.grid(row=0, column=0, sticky="w", padx=10, pady=(10, 0))
-
-        meta = f"📜 {doc_type.upper()}  |  {doc_class.upper()}   📅 {date}   FROM: {sender.upper() or 'N/A'} TO: {recipient.upper() or 'N/A'}"
-        meta_label = ctk.CTkLabel(card, text=meta, text_color="white")
-        meta_label.grid(row=1, column=0, sticky="w", padx=10)
-
-        # sender_info = f"🪪 {sender or 'N/A'} → {recipient or 'N/A'}"
-        # sender_label = ctk.CTkLabel(card, text=sender_info, text_color="white")
-        # sender_label.grid(row=2, column=0, sticky="w", padx=10)
+        # In-process popup; saving reloads only the page being shown
+        from gui_add_document import AddDocumentPopup
+        AddDocumentPopup(self, self.check_changes, repo=self.repo)
+
+    def selected_type(self):
+        return facet_value(self.type_filter.get())
+
+    def selected_class(self):
+        return facet_value(self.class_filter.get())
+
+    def date_range(self):
+        """
+        (date_from, date_to) as date_ts bounds, from inclusive and to exclusive,
+        so "To 2023-03-31" includes the whole day. None if either date is invalid.
+        """
+        bounds = []
+        for entry, days in ((self.date_from_entry, 0), (self.date_to_entry, 1)):
+            text = entry.get().strip()
+            if not text:
+                bounds.append(None)
+                continue
+            date_ts = normalize_date(text)
+            if date_ts is None:
+                return None
+            day = datetime.strptime(date_ts[:10], "%Y-%m-%d") + timedelta(days=days)
+            bounds.append(day.strftime("%Y-%m-%d %H:%M:%S"))
+        return tuple(bounds)
+
+    def set_date_range(self, date_from, date_to):
+        for entry, text in ((self.date_from_entry, date_from), (self.date_to_entry, date_to)):
+            entry.delete(0, "end")
+            if text:
+                entry.insert(0, text)
+
+    def get_filters(self):
+        date_from, date_to = self.date_range() or (None, None)
+        return build_filters(
+            self.selected_type(),
+            self.selected_class(),
+            self.search_entry.get().strip(),
+            date_from,
+            date_to
+        )
 
-        if description:
-            desc_label = ctk.CTkLabel(card, text=truncate(description),font=ctk.CTkFont(size=16, weight="bold"), text_color="white")
-            desc_label.grid(row=3, column=0, sticky="w", padx=10, pady=(0, 10))
+    def load_documents(self, keep_scroll=False):
+        # Read every widget value here; the worker thread must not touch Tk
+        filters = self.get_filters()
+        sort = self.sort_option.get()
+        cursor = self.paginator.get_cursor()
+        offset, limit = self.paginator.get_offset_limit()
+
+        # ⚡ Serve revisited filters and pages from the cache while the DB is unchanged
+        key = (
+            self.search_entry.get().strip(), self.selected_type(), self.selected_class(), self.date_range(),
+            sort, limit, self.paginator.current_page, cursor
+        )
+        requested = time.perf_counter()
+        token = self.change_token()
+        self.result_cache.validate(token)
+        cached = self.result_cache.get(key)
+        if cached is not None:
+            self.executor.cancel("page")
+            self.on_documents_loaded(cached, keep_scroll)
+            timings.record("ui.page_cached", (time.perf_counter() - requested) * 1000, len(cached[0]))
+            return
+
+        def run():
+            # One pass for the page and its count; cached counts skip counting altogether
+            return self.repo.fetch_page_and_count(filters, sort=sort, cursor=cursor, limit=limit, offset=offset)
+
+        # ⏳ A newer submit on the "page" channel drops this one
+        self.paginator.set_loading(True)
+        def done(result):
+            self.result_cache.put(key, result, token)
+            self.on_documents_loaded(result, keep_scroll)
+            # Click to cards on screen, including time queued behind other jobs
+            timings.record("ui.page_loaded", (time.perf_counter() - requested) * 1000, len(result[0]))
+
+        self.executor.submit("page", run, done, self.on_query_error)
+
+    def on_documents_loaded(self, result, keep_scroll=False):
+        rows, next_cursor, total = result
+        self.paginator.set_next_cursor(next_cursor)
+
+        # ♻ Rebind pooled cards instead of rebuilding them; unchanged cards are left alone
+        self.card_pool.show(rows)
+        if not keep_scroll:
+            self.scroll_frame._parent_canvas.yview_moveto(0)
+        self.schedule_thumbnails()
 
-        # 🧰 Right Column: Buttons
-        def open_file():
-            abs_path = os.path.join(BASE_DIR, file_path)
-            if os.path.exists(abs_path):
-                webbrowser.open(abs_path)
-            else:
+        # ✅ Update paginator display
+        self.paginator.update(total)
+        self.refresh_facets()
+        self.refresh_timeline()
+
+    # 📊 Facet counts in the type and class menus
+
+    def refresh_facets(self):
+        # Counts depend only on the search and the data, not on the selected type/class
+        filters = self.get_filters()
+        sql, params = build_facet_query(filters)
+        key = (sql, tuple(params), self.change_token())
+        if key == self._facet_key:
+            if self._facet_counts is not None:
+                self.show_facets(self._facet_counts)  # the selection may have changed
+            return
+        self._facet_key = key
+
+        def done(counts):
+            self._facet_counts = counts
+            self.show_facets(counts)
+
+        def failed(error):
+            self._facet_key = None
+
+        self.executor.submit("facets", lambda: self.repo.facet_counts(filters), done, failed)
+
+    def show_facets(self, counts):
+        # Each menu counts within the other menu's selection
+        selected_type, selected_class = self.selected_type(), self.selected_class()
+        by_type, by_class = {}, {}
+        for (doc_type, doc_class), n in counts.items():
+            if selected_class == "All" or doc_class == selected_class:
+                by_type[doc_type] = by_type.get(doc_type, 0) + n
+            if selected_type == "All" or doc_type == selected_type:
+                by_class[doc_class] = by_class.get(doc_class, 0) + n
+        self.set_facet_labels(self.type_filter, DOC_TYPES, by_type)
+        self.set_facet_labels(self.class_filter, DOC_CLASSES, by_class)
+
+    def set_facet_labels(self, menu, values, counts):
+        labels = [f"All ({sum(counts.values()):,})"] + [f"{value} ({counts.get(value, 0):,})" for value in values]
+        current = facet_value(menu.get())
+        menu.configure(values=labels)
+        menu.set(next((label for label in labels if facet_value(label) == current), labels[0]))
+
+    def schedule_thumbnails(self):
+        if self._thumbnail_after_id:
+            self.after_cancel(self._thumbnail_after_id)
+        self._thumbnail_after_id = self.after(THUMBNAIL_DELAY_MS, self.load_visible_thumbnails)
+
+    def load_visible_thumbnails(self):
+        self._thumbnail_after_id = None
+        for card in self.card_pool.cards_in_view(self.scroll_frame._parent_canvas):
+            if not card.thumbnail_pending:
+                continue
+            card.thumbnail_pending = False
+            doc = card.doc
+            self.thumbnails.request(
+                abs_document_path(doc[8]),
+                lambda image, card=card, doc=doc: card.set_thumbnail(doc, image)
+            )
+
+    def on_query_error(self, error):
+        self.paginator.update(self.paginator.total_items)
+        ToastManager.show_error(self, f"Database error: {error}")
+
+    def open_file(self, doc):
+        import webbrowser
+
+        abs_path = abs_document_path(doc[8])
+        if self.repo.remote:
+            self.download_file(doc, webbrowser.open)
+            return
+        if os.path.exists(abs_path):
+            webbrowser.open(abs_path)
+            return
+
+        # 🗄️ Archived documents are unpacked into the extraction cache first; lookup and extraction both off the Tk thread
+        from archive_store import extract_archived
+        from transfer_task import TransferTask
+
+        def failed(error):
+            ToastManager.show_error(self, f"Could not extract the archived file: {error}")
+
+        def extract(entry):
+            if entry is None:
                 ToastManager.show_warning(self, "The file could not be found.")
-
-        def delete_doc():
-            confirm = messagebox.askyesno("Confirm Delete", "Are you sure you want to delete this document?")
-            if not confirm:
                 return
+            ToastManager.show_info(self, "Extracting from archive...")
+            TransferTask(
+                self, lambda progress, cancel: extract_archived(entry, progress, cancel), total=entry[2],
+                on_done=webbrowser.open, on_error=failed
+            )
 
-            try:
-                with sqlite3.connect(DB_PATH) as conn:
-                    cursor = conn.cursor()
-
-                    # ✅ Step 1: Get the file path before deleting
-                    cursor.execute("SELECT file_path FROM documents WHERE id = ?", (doc_id,))
-                    result = cursor.fetchone()
-                    if result:
-                        file_path = os.path.join(BASE_DIR, result[0])
-                        if os.path.exists(file_path):
-                            try:
-                                os.remove(file_path)  # ✅ Step 2: Delete the file
-                            except Exception as file_err:
-                                ToastManager.show_warning(self, f"⚠️ File not deleted: {file_err}")
+        self.executor.submit("open-file", lambda: self.repo.get_archive_entry(doc[0]), extract, self.on_query_error)
 
-                    # ✅ Step 3: Delete the record from the database
-                    cursor.execute("DELETE FROM documents WHERE id = ?", (doc_id,))
-                    conn.commit()
+    def download_file(self, doc, on_done):
+        # 🌐 Fetched from the document server into cache/remote (reused on later opens), off the Tk thread
+        from transfer_task import TransferTask
 
-                self.load_documents()
-                ToastManager.show_success(self, "🗑️ Document deleted successfully!")
+        file_name = os.path.basename(abs_document_path(doc[8]))
+        if not os.path.exists(os.path.join(DOWNLOAD_DIR, str(doc[0]), file_name)):
+            ToastManager.show_info(self, "Downloading...")
 
-            except sqlite3.OperationalError as db_err:
-                ToastManager.show_error(self, f"Database error: {db_err}")
+        def failed(error):
+            ToastManager.show_error(self, f"Could not download the file: {error}")
 
-        def edit_doc():
-            EditDocumentPopup(self, doc, self.load_documents)
-
-        btn_frame = ctk.CTkFrame(card, fg_color="transparent")
-        btn_frame.grid(row=0, column=1, rowspan=4, padx=10, pady=10, sticky="ne")
-
-        ctk.CTkButton(btn_frame, text="🗃 Open", command=open_file, width=80, fg_color="transparent", border_color="white", border_width=2).grid(row=0, column=0, pady=2)
-        ctk.CTkButton(btn_frame, text="✍ Edit", command=edit_doc, width=80, fg_color="transparent", border_color="white", border_width=2).grid(row=1, column=0, pady=2)
-        ctk.CTkButton(btn_frame, text="♻ Delete", command=delete_doc, width=80, fg_color="transparent", border_color="white", border_width=2, hover_color="#A52A2A").grid(row=2, column=0, pady=2)
+        TransferTask(
+            self, self.releasing(lambda progress, cancel: self.repo.download(doc[0], file_name, progress, cancel)),
+            on_done=on_done, on_error=failed
+        )
 
+    def edit_doc(self, doc):
+        # Imported on first use: tkcalendar and PIL.ImageTk aren't needed to show the dashboard
+        from gui_edit_document import EditDocumentPopup
+        EditDocumentPopup(self, doc, self.check_changes, repo=self.repo)
+
+    def delete_doc(self, doc):
+        confirm = messagebox.askyesno("Confirm Delete", "Are you sure you want to delete this document?")
+        if not confirm:
+            return
+        self.run_batch("Deleting 1 document", 1,
+                       lambda progress, cancel: batch_delete(self.repo, [doc[0]], progress, cancel))
+
+    # 📅 Timeline
+
+    def toggle_timeline(self):
+        self._timeline_visible = not self._timeline_visible
+        if self._timeline_visible:
+            self.timeline.frame.pack(padx=20, fill="x", before=self.batch_frame if self._batch_visible else self.scroll_frame)
+            self.refresh_timeline()
+        else:
+            self.timeline.frame.pack_forget()
+
+    def refresh_timeline(self):
+        # Same pattern as the facets: re-query only when the search or the data changed
+        if not self._timeline_visible:
+            return
+        filters = self.get_filters()
+        sql, params = build_timeline_query(filters)
+        key = (sql, tuple(params), self.change_token())
+        if key == self._timeline_key:
+            return
+        self._timeline_key = key
+
+        def failed(error):
+            self._timeline_key = None
+
+        self.executor.submit("timeline", lambda: self.repo.timeline_counts(filters), self.timeline.show_counts, failed)
+
+    def select_timeline_bucket(self, year, month):
+        year = int(year)
+        if month is None:
+            self.set_date_range(f"{year}-01-01", f"{year}-12-31")
+        else:
+            last_day = calendar.monthrange(year, month)[1]
+            self.set_date_range(f"{year}-{month:02d}-01", f"{year}-{month:02d}-{last_day:02d}")
+        self.search()
+
+    # ⬇️ Export
+
+    def export_results(self):
+        """
+        Exports everything matching the current filters (not just this page),
+        in the current sort order, on a background thread.
+        """
+        if self.repo.remote:
+            ToastManager.show_warning(self, "Export isn't available while connected to a document server.")
+            return
+        if self.export_task is not None:
+            ToastManager.show_warning(self, "An export is already running.")
+            return
+        if self.date_range() is None:
+            ToastManager.show_warning(self, "Invalid date. Use YYYY-MM-DD.")
+            return
+        from tkinter import filedialog
+        from doc_export import export_documents
+        from transfer_task import TransferTask
+
+        path = filedialog.asksaveasfilename(
+            parent=self, title="Export Results", defaultextension=".csv",
+            filetypes=[("CSV", "*.csv"), ("JSON", "*.json"), ("ZIP with files", "*.zip")]
+        )
+        if not path:
+            return
+
+        filters, sort = self.get_filters(), self.sort_option.get()
+        total = self.paginator.total_items
+        started = time.perf_counter()
+
+        def finish():
+            self.export_task = None
+            self.export_frame.pack_forget()
+
+        def done(result):
+            finish()
+            rows, missing = result
+            timings.record("ui.export", (time.perf_counter() - started) * 1000, rows)
+            if missing:
+                ToastManager.show_warning(self, f"Exported {rows} document(s); {missing} file(s) were missing.", duration=5000)
+            else:
+                ToastManager.show_success(self, f"Exported {rows} document(s).")
+
+        def failed(error):
+            finish()
+            ToastManager.show_error(self, f"Export failed: {error}")
+
+        def cancelled():
+            finish()
+            ToastManager.show_info(self, "Export cancelled.")
+
+        self.export_label.configure(text=f"Exporting {total:,} document(s) to {os.path.basename(path)}")
+        self.export_bar.set(0)
+        self.export_frame.pack(padx=20, fill="x", before=self.scroll_frame)
+        self.export_task = TransferTask(
+            self, lambda progress, cancel: export_documents(self.repo, filters, sort, path, progress, cancel),
+            total=total, on_done=done, on_error=failed, on_progress=self.export_bar.set, on_cancelled=cancelled
+        )
 
+    # ☑️ Batch actions
+
+    def on_selection_change(self, selected):
+        if selected:
+            self.batch_label.configure(text=f"{len(selected)} selected")
+            if not self._batch_visible:
+                self.batch_frame.pack(padx=20, fill="x", before=self.scroll_frame)
+                self._batch_visible = True
+        elif self._batch_visible:
+            self.batch_frame.pack_forget()
+            self._batch_visible = False
+
+    def batch_delete_selected(self):
+        doc_ids = list(self.card_pool.selected)
+        if not messagebox.askyesno("Confirm Delete", f"Delete {len(doc_ids)} selected document(s)?"):
+            return
+        self.run_batch(f"Deleting {len(doc_ids)} document(s)", len(doc_ids),
+                       lambda progress, cancel: batch_delete(self.repo, doc_ids, progress, cancel))
+
+    def batch_retype_selected(self, doc_type):
+        self.batch_type.set("Move to…")
+        doc_ids = list(self.card_pool.selected)
+        if not messagebox.askyesno("Confirm Move", f"Move {len(doc_ids)} selected document(s) to {doc_type}?"):
+            return
+        self.run_batch(f"Moving {len(doc_ids)} document(s) to {doc_type}", len(doc_ids),
+                       lambda progress, cancel: batch_retype(self.repo, doc_ids, doc_type, progress, cancel))
+
+    def batch_reclassify_selected(self, doc_class):
+        self.batch_class.set("Set class…")
+        doc_ids = list(self.card_pool.selected)
+        # A single UPDATE with nothing to count or cancel, so it runs on the executor without the progress bar
+        self.executor.submit("batch-reclassify", lambda: batch_reclassify(self.repo, doc_ids, doc_class),
+                             self.on_batch_done, self.on_batch_failed)
+
+    def on_batch_done(self, result):
+        self.card_pool.clear_selection()
+        self.check_changes()
+        if result.errors:
+            ToastManager.show_warning(self, f"{result.summary()}. First: {result.errors[0][1]}", duration=6000)
+        else:
+            ToastManager.show_success(self, result.summary())
+
+    def on_batch_failed(self, error):
+        self.check_changes()
+        self.on_query_error(error)
+
+    def run_batch(self, label, total, fn):
+        """
+        One transaction per batch, file work in parallel, then a single refresh.
+        fn(progress, cancel) runs on its own thread, so moving or deleting
+        files never holds up the query executor; progress counts files.
+        """
+        if self.batch_task is not None:
+            ToastManager.show_warning(self, "A batch action is already running.")
+            return
+        from transfer_task import TransferTask
+
+        def finish():
+            self.batch_task = None
+            self.batch_progress_frame.pack_forget()
+
+        def done(result):
+            finish()
+            self.on_batch_done(result)
+
+        def failed(error):
+            finish()
+            self.on_batch_failed(error)
+
+        def cancelled():
+            finish()
+            ToastManager.show_warning(self, "Batch cancelled; nothing was changed.")
+
+        self.batch_progress_label.configure(text=label)
+        self.batch_bar.set(0)
+        self.batch_progress_frame.pack(padx=20, fill="x", before=self.scroll_frame)
+        self.batch_task = TransferTask(self, self.releasing(fn), total=total, on_done=done, on_error=failed,
+                                       on_progress=self.batch_bar.set, on_cancelled=cancelled)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,92 @@
+# utils/gui_diagnostics.py
+
+import json
+import customtkinter as ctk
+
+from diagnostics import LOG_PATH, timings
+
+REFRESH_MS = 1000
+
+
+class DiagnosticsWindow(ctk.CTkToplevel):
+    """
+    Help → Diagnostics: live p50/p95/max per timing span, grouped so it's clear
+    whether time goes to SQL, widget construction or file I/O.
+    Not modal, so it can stay open while reproducing a slow screen.
+    """
+
+    def __init__(self, master, extra_stats=None, on_log_toggle=None):
+        super().__init__(master)
+        self.title("Diagnostics")
+        self.geometry("720x480")
+        self.transient(master)
+        self.extra_stats = extra_stats
+        self.on_log_toggle = on_log_toggle
+
+        self.summary_label = ctk.CTkLabel(self, text="", anchor="w", justify="left")
+        self.summary_label.pack(fill="x", padx=15, pady=(15, 5))
+
+        self.table = ctk.CTkTextbox(self, font=ctk.CTkFont(family="Courier New", size=13), wrap="none")
+        self.table.pack(fill="both", expand=True, padx=15, pady=5)
+
+        bottom = ctk.CTkFrame(self, fg_color="transparent")
+        bottom.pack(fill="x", padx=15, pady=(5, 15))
+
+        self.log_var = ctk.BooleanVar(value=timings.logging_enabled)
+        ctk.CTkCheckBox(bottom, text=f"Write JSON log ({LOG_PATH})", variable=self.log_var,
+                        command=self.toggle_log).pack(side="left")
+        ctk.CTkButton(bottom, text="Copy JSON", width=90, command=self.copy_json).pack(side="right")
+        ctk.CTkButton(bottom, text="Reset", width=70, command=self.reset).pack(side="right", padx=(0, 10))
+
+        self._refresh_id = None
+        self.refresh()
+
+    def snapshot(self):
+        data = timings.snapshot()
+        if self.extra_stats:
+            data["stats"] = self.extra_stats()
+        return data
+
+    def refresh(self):
+        data = self.snapshot()
+
+        totals = "   ".join(f"{category}: {ms:.0f} ms" for category, ms in sorted(data["categories"].items()))
+        stats = "   ".join(f"{name}: {value}" for name, value in data.get("stats", {}).items())
+        self.summary_label.configure(text="\n".join(filter(None, [f"⏱️ Total  {totals or 'no spans yet'}", stats])))
+
+        lines = [f"{'span':<26}{'calls':>7}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}{'avg rows':>10}"]
+        for name, s in data["spans"].items():
+            rows = "" if s["avg_rows"] is None else f"{s['avg_rows']:.0f}"
+            lines.append(f"{name:<26}{s['calls']:>7}{s['p50_ms']:>10.2f}{s['p95_ms']:>10.2f}{s['max_ms']:>10.2f}{rows:>10}")
+
+        # Keep the scroll position while the numbers update
+        position = self.table.yview()[0]
+        self.table.configure(state="normal")
+        self.table.delete("1.0", "end")
+        self.table.insert("1.0", "\n".join(lines))
+        self.table.configure(state="disabled")
+        self.table.yview_moveto(position)
+
+        self._refresh_id = self.after(REFRESH_MS, self.refresh)
+
+    def toggle_log(self):
+        enabled = self.log_var.get()
+        if enabled:
+            timings.enable_log()
+        else:
+            timings.disable_log()
+        if self.on_log_toggle:
+            self.on_log_toggle(enabled)
+
+    def reset(self):
+        timings.reset()
+
+    def copy_json(self):
+        self.clipboard_clear()
+        self.clipboard_append(json.dumps(self.snapshot(), indent=2))
+
+    def destroy(self):
+        if self._refresh_id is not None:
+            self.after_cancel(self._refresh_id)
+            self._refresh_id = None
+        super().destroy()
@@ -3,23 +3,27 @@
 import customtkinter as ctk
 import os
 import sqlite3
-from tkcalendar import DateEntry
+import time
 from base_popup import BasePopup
 from toast_manager import ToastManager
+from db_init import normalize_date
+from batch_actions import edit_document
+from diagnostics import timings
+from doc_repository import get_repository
+from doc_storage import abs_document_path
+from transfer_task import TransferTask
 from PIL import Image, ImageTk
 import tkinter as tk
 
-ctk.set_appearance_mode("System")
-ctk.set_default_color_theme("blue")
-
 # Adjust path if needed
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DB_PATH = os.path.join(BASE_DIR, "db", "document_store.db")
 DOCS_DIR = os.path.join(BASE_DIR, "documents")
 
 class EditDocumentPopup(BasePopup):
-    def __init__(self, master, doc_data, refresh_callback):
+    def __init__(self, master, doc_data, refresh_callback, repo=None):
         super().__init__(master)
+        self.repo = repo or get_repository(DB_PATH)
         self.transient(master)
         self.grab_set()
         self.focus()
@@ -76,7 +80,30 @@ class EditDocumentPopup(BasePopup):
         self.save_btn = ctk.CTkButton(self, text="💾 Save Changes", command=self.save_changes)
         self.save_btn.grid(row=7, column=0, columnspan=2, pady=20)
 
+        # Shown only while a retyped file is being moved to another drive
+        self.progress_bar = ctk.CTkProgressBar(self)
+        self.progress_bar.set(0)
+        self.cancel_button = ctk.CTkButton(self, text="✖ Cancel", width=80, fg_color="#8B0000",
+                                           command=self.cancel_transfer)
+
         self.saving = False
+        self.transfer = None
+
+    def form_widgets(self):
+        return [
+            self.title_entry, self.type_option, self.class_option, self.date_entry,
+            self.sender_entry, self.recipient_entry, self.desc_entry, self.save_btn
+        ]
+
+    def end_transfer(self):
+        self.transfer = None
+        self.progress_bar.grid_remove()
+        self.cancel_button.grid_remove()
+
+    def cancel_transfer(self):
+        if self.transfer is not None:
+            self.transfer.cancel()
+
     def save_changes(self):
         updated_data = {
             "title": self.title_entry.get().strip(),
@@ -87,70 +114,69 @@ class EditDocumentPopup(BasePopup):
             "recipient": self.recipient_entry.get().strip() or None,
             "description": self.desc_entry.get("1.0", "end").strip() or None
         }
-        old_type = self.type_option.get()
-        new_type = updated_data["doc_type"]
         type_changed = self.original_type != updated_data["doc_type"]
 
         if self.saving:
             return
+
+        # 📅 date_ts drives sorting, so reject dates we can't normalize
+        date_ts = normalize_date(updated_data["date"])
+        if date_ts is None:
+            ToastManager.show_error(self, "Invalid date. Use YYYY-MM-DD or YYYY-MM-DD HH:MM:SS.")
+            return
         self.saving = True
-        self.disable_widgets([
-            self.title_entry, self.type_option, self.date_entry,
-            self.sender_entry, self.recipient_entry, self.desc_entry, self.save_btn
-        ])
+        self.disable_widgets(self.form_widgets())
         self.save_btn.configure(text="Saving...")
 
-        # Validate inputs
-        if type_changed:
-            old_abs_path = os.path.join(BASE_DIR, self.original_path)
-            filename = os.path.basename(old_abs_path)
-            new_folder = os.path.join(DOCS_DIR, updated_data["doc_type"])
-            os.makedirs(new_folder, exist_ok=True)
-            new_abs_path = os.path.join(new_folder, filename)
-
-            try:
-                os.rename(old_abs_path, new_abs_path)
-                # Update the relative path for DB
-                updated_data["file_path"] = os.path.relpath(new_abs_path, BASE_DIR)
-            except Exception as move_err:
-                ToastManager.show_error(self, f"Failed to move file: {move_err}")
-                self.saving = False
-                self.enable_widgets([...])
-                self.save_btn.configure(state="normal", text="💾 Save Changes")
-                return
-        else:
-            updated_data["file_path"] = self.original_path
-
-        # Collect data and update DB
+        # Archived documents (and documents on a document server) have no loose file here: no progress to show
         try:
-            conn = sqlite3.connect(DB_PATH)
-            cursor = conn.cursor()
-            cursor.execute('''
-                UPDATE documents
-                SET title = ?, doc_type = ?, doc_class = ?, date = ?, sender = ?, recipient = ?, description = ?, file_path = ?
-                WHERE id = ?
-            ''', (
-                updated_data["title"],
-                updated_data["doc_type"],
-                updated_data["doc_class"],
-                updated_data["date"],
-                updated_data["sender"],
-                updated_data["recipient"],
-                updated_data["description"],
-                updated_data["file_path"],
-                self.doc_id
-            ))
-            conn.commit()
-            conn.close()
+            total = os.path.getsize(abs_document_path(self.original_path)) if type_changed else 0
+        except OSError:
+            total = 0
+        repo = self.repo
+        started = time.perf_counter()
+
+        def run(progress, cancel):
+            # 📁 A type change moves the file; across drives that's a durable copy, off the Tk thread
+            try:
+                return edit_document(repo, self.doc_id, dict(updated_data, date_ts=date_ts), progress, cancel)
+            finally:
+                repo.release_connection()
+
+        def done(_):
+            self.end_transfer()
+            timings.record("ui.save_changes", (time.perf_counter() - started) * 1000)
             ToastManager.show_success(self, "Document updated successfully!")
             self.refresh_callback()
             self.after(1000, self.destroy)
-        except sqlite3.Error as e:
+
+        def reopen_form():
+            self.end_transfer()
             self.saving = False
-            self.enable_widgets([
-                self.title_entry, self.type_option, self.date_picker,
-                self.sender_entry, self.recipient_entry, self.desc_entry, self.save_btn
-            ])
+            self.enable_widgets(self.form_widgets())
             self.save_btn.configure(state="normal", text="💾 Save Changes")
-            ToastManager.show_error(self, f"Database error: {str(e)}")
 
+        def failed(error):
+            reopen_form()
+            if isinstance(error, sqlite3.Error):
+                ToastManager.show_error(self, f"Database error: {error}")
+            else:
+                ToastManager.show_error(self, f"Failed to move file: {error}")
+
+        def cancelled():
+            # The partial copy is discarded before the original is touched, and the row is left as it was
+            reopen_form()
+            ToastManager.show_warning(self, "Move cancelled; the document was not changed.")
+
+        if total:
+            self.progress_bar.grid(row=8, column=0, columnspan=2, padx=20, pady=(0, 5), sticky="ew")
+            self.cancel_button.grid(row=9, column=0, columnspan=2, pady=(0, 15))
+        self.transfer = TransferTask(
+            self, run, total=total, on_done=done, on_error=failed,
+            on_progress=self.progress_bar.set, on_cancelled=cancelled
+        )
+
+    def destroy(self):
+        if self.transfer is not None:
+            self.transfer.stop_polling()
+        super().destroy()
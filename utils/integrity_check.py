@@ -0,0 +1,349 @@
+# utils/integrity_check.py
+
+import json
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from diagnostics import span
+from doc_repository import get_repository
+from doc_storage import (
+    TransferCancelled, abs_document_path, blob_path, fsync_dir, hash_file, link_or_copy, relative_document_path,
+)
+
+# 🔐 Paths
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DB_PATH = os.path.join(BASE_DIR, "db", "document_store.db")
+DOCS_DIR = os.path.join(BASE_DIR, "documents")
+ARCHIVE_DIR = os.path.join(DOCS_DIR, ".archive")
+QUARANTINE_DIR = os.path.join(DOCS_DIR, ".quarantine")
+
+SKIP_DIRS = {".archive", ".quarantine"}  # packs are checked against archive_packs instead
+SCAN_WORKERS = 8
+HASH_WORKERS = min(32, (os.cpu_count() or 4) * 2)  # hashing is mostly waiting on the disk
+GRACE_SECONDS = 3600  # files this new may belong to a save that hasn't committed its row yet
+STORE_PREFIX = "documents/.store/"
+
+
+def norm(path):
+    # Rows written on Windows use backslashes; compare paths with forward slashes
+    return path.replace("\\", "/")
+
+
+def list_dir(path):
+    # ({relative path: (size, mtime, ctime)}, [subdirectories]) for one directory
+    files, subdirs = {}, []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.name.startswith("."):
+                # Hidden files are in-flight copies (.<uuid>.tmp); hidden dirs are the store's own
+                if entry.is_dir(follow_symlinks=False) and entry.name not in SKIP_DIRS:
+                    subdirs.append(entry.path)
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.path)
+            elif entry.is_file(follow_symlinks=False):
+                st = entry.stat(follow_symlinks=False)
+                files[norm(relative_document_path(entry.path))] = (st.st_size, st.st_mtime, st.st_ctime)
+    return files, subdirs
+
+
+def scan_tree(root, pool):
+    """Every file under root, listing directories in parallel (the blob store alone has 256)."""
+    files = {}
+    pending = [pool.submit(list_dir, root)]
+    while pending:
+        found, subdirs = pending.pop().result()
+        files.update(found)
+        pending += [pool.submit(list_dir, subdir) for subdir in subdirs]
+    return files
+
+
+class IntegrityReport:
+    def __init__(self):
+        self.files = 0
+        self.rows = 0
+        self.hashed = 0
+        self.hashed_bytes = 0
+        self.missing = []      # (doc_id, file_path): no file, not archived
+        self.moved = []        # (doc_id, file_path, found_path): the file turned up elsewhere
+        self.corrupt = []      # (doc_id, file_path): content no longer matches content_hash
+        self.orphans = []      # paths no row or blob references
+        self.bad_blobs = []    # blob files whose content doesn't match their name
+        self.missing_blobs = []  # sha256 of referenced blobs with no file in the store
+        self.missing_packs = []  # archive pack files that are gone
+        self.orphan_times = {}  # orphan path -> (mtime, ctime), for repair()'s grace period
+        self.elapsed_s = 0.0
+
+    def summary(self):
+        return {
+            "files": self.files,
+            "rows": self.rows,
+            "hashed": self.hashed,
+            "hashed_mb": round(self.hashed_bytes / 1_000_000, 1),
+            "missing": len(self.missing),
+            "moved": len(self.moved),
+            "corrupt": len(self.corrupt),
+            "orphans": len(self.orphans),
+            "bad_blobs": len(self.bad_blobs),
+            "missing_blobs": len(self.missing_blobs),
+            "missing_packs": len(self.missing_packs),
+            "elapsed_s": round(self.elapsed_s, 2),
+        }
+
+    @property
+    def clean(self):
+        return not any((self.missing, self.moved, self.corrupt, self.orphans,
+                        self.bad_blobs, self.missing_blobs, self.missing_packs))
+
+    def as_dict(self):
+        data = {name: value for name, value in vars(self).items() if isinstance(value, list)}
+        data["summary"] = self.summary()
+        return data
+
+
+def check(repo, verify_hashes=True, progress=None, cancel=None):
+    """
+    Reconciles the documents table (and blobs, archive packs) with the files
+    under documents/ in one pass. With verify_hashes, files whose size or
+    mtime changed since the manifest was written are re-hashed in parallel and
+    compared with their rows; unchanged files reuse the cached hash. Without,
+    a file's size is compared with the size recorded for its content instead.
+    progress(files_hashed) and cancel (a threading.Event) are for background callers.
+    """
+    report = IntegrityReport()
+    started = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=SCAN_WORKERS) as pool, span("file_io.integrity_scan") as s:
+        files = scan_tree(DOCS_DIR, pool) if os.path.isdir(DOCS_DIR) else {}
+        s.rows = len(files)
+    report.files = len(files)
+
+    with repo.reader() as conn, span("sql.integrity_rows"):
+        rows = conn.execute("SELECT id, file_path, content_hash FROM documents").fetchall()
+        archived = {row[0] for row in conn.execute("SELECT doc_id FROM archived_documents")}
+        packs = conn.execute("SELECT id, file_name FROM archive_packs").fetchall()
+        blobs = dict(conn.execute("SELECT sha256, size FROM blobs").fetchall())
+        manifest = {row[0]: row[1:] for row in conn.execute("SELECT path, size, mtime, sha256 FROM file_manifest")}
+    report.rows = len(rows)
+
+    # 🔐 Hashes: cached when (size, mtime) is unchanged, re-computed otherwise
+    hashes = {}
+    stale = []
+    for path, (size, mtime, _) in files.items():
+        cached = manifest.get(path)
+        if cached is not None and cached[0] == size and cached[1] == mtime:
+            hashes[path] = cached[2]
+        else:
+            stale.append(path)
+
+    fresh = []
+
+    def save_manifest(gone=()):
+        # Remembers what was hashed (even by a cancelled run) and forgets files that are gone
+        if not fresh and not gone:
+            return
+        now = datetime.now().isoformat(timespec="seconds")
+
+        def update_manifest(conn):
+            conn.executemany(
+                "INSERT OR REPLACE INTO file_manifest (path, size, mtime, sha256, checked_at) VALUES (?, ?, ?, ?, ?)",
+                [(path, size, mtime, sha256, now) for path, size, mtime, sha256 in fresh]
+            )
+            conn.executemany("DELETE FROM file_manifest WHERE path = ?", [(path,) for path in gone])
+        repo.write(update_manifest)
+
+    if verify_hashes and stale:
+        def hash_one(path):
+            if cancel is not None and cancel.is_set():
+                return path, None
+            try:
+                return path, hash_file(abs_document_path(path))[0]
+            except OSError:
+                return path, None  # removed or locked since the scan
+
+        with ThreadPoolExecutor(max_workers=HASH_WORKERS) as pool, span("file_io.integrity_hash") as s:
+            for path, sha256 in pool.map(hash_one, stale):
+                if sha256 is None:
+                    continue
+                hashes[path] = sha256
+                size, mtime, _ = files[path]
+                fresh.append((path, size, mtime, sha256))
+                report.hashed += 1
+                report.hashed_bytes += size
+                if progress:
+                    progress(report.hashed)
+            s.rows = report.hashed
+        if cancel is not None and cancel.is_set():
+            save_manifest()
+            raise TransferCancelled()
+
+    # 📏 Quick check: no hashing, but a file whose size isn't its content's size has surely changed
+    known_sizes = dict(blobs)
+    known_sizes.update({sha256: size for size, _, sha256 in manifest.values() if sha256 not in known_sizes})
+
+    def wrong_size(path, sha256):
+        expected = known_sizes.get(sha256)
+        return not verify_hashes and expected is not None and files[path][0] != expected
+
+    # 🧮 Reconcile
+    referenced = set()
+    live_hashes = set()  # blobs some unarchived row still needs; archiving removes the others' files
+    for doc_id, file_path, content_hash in rows:
+        path = norm(file_path)
+        referenced.add(path)
+        if content_hash and doc_id not in archived:
+            live_hashes.add(content_hash)
+        if path not in files:
+            if doc_id not in archived:
+                report.missing.append((doc_id, file_path))
+        elif content_hash and ((path in hashes and hashes[path] != content_hash) or wrong_size(path, content_hash)):
+            report.corrupt.append((doc_id, file_path))
+
+    for sha256 in blobs:
+        path = norm(relative_document_path(blob_path(sha256)))
+        referenced.add(path)
+        if path not in files:
+            if sha256 in live_hashes:
+                report.missing_blobs.append(sha256)
+        elif (path in hashes and hashes[path] != sha256) or wrong_size(path, sha256):
+            report.bad_blobs.append(path)
+
+    for pack_id, file_name in packs:
+        if not os.path.exists(os.path.join(ARCHIVE_DIR, file_name)):
+            report.missing_packs.append(file_name)
+    if report.missing_packs:
+        lost = {row[0] for row in repo.query(
+            f"SELECT doc_id FROM archived_documents a JOIN archive_packs p ON p.id = a.pack_id "
+            f"WHERE p.file_name IN ({','.join('?' * len(report.missing_packs))})", report.missing_packs
+        )}
+        report.missing += [(doc_id, file_path) for doc_id, file_path, _ in rows if doc_id in lost]
+
+    orphans = [path for path in files if path not in referenced]
+
+    # 🔁 A missing row whose content (or else its unique file name) shows up as an orphan was moved
+    by_hash, by_name = defaultdict(list), defaultdict(list)
+    for path in orphans:
+        if path.startswith(STORE_PREFIX):
+            continue  # a blob is never a document's own file
+        if path in hashes:
+            by_hash[hashes[path]].append(path)
+        by_name[os.path.basename(path)].append(path)
+    hash_of = {doc_id: content_hash for doc_id, _, content_hash in rows}
+    claimed = set()
+    still_missing = []
+    for doc_id, file_path in report.missing:
+        content_hash = hash_of.get(doc_id)
+        candidates = [path for path in by_hash.get(content_hash, []) if path not in claimed] if content_hash else []
+        if not candidates:
+            candidates = [path for path in by_name.get(os.path.basename(norm(file_path)), []) if path not in claimed]
+            candidates = candidates if len(candidates) == 1 else []
+        if candidates and doc_id not in archived:
+            claimed.add(candidates[0])
+            report.moved.append((doc_id, file_path, candidates[0]))
+        else:
+            still_missing.append((doc_id, file_path))
+    report.missing = still_missing
+    report.orphans = [path for path in orphans if path not in claimed]
+    report.orphan_times = {path: files[path][1:] for path in report.orphans}
+
+    save_manifest([path for path in manifest if path not in files])
+
+    report.elapsed_s = time.perf_counter() - started
+    return report
+
+
+def repair(repo, report, relink=True, quarantine=True, flag=True):
+    """
+    Applies the fixes a check() found:
+    - relink: rows whose file turned up elsewhere point at it again (one transaction)
+    - quarantine: orphans move to documents/.quarantine/<run>/ (never deleted); files
+      newer than GRACE_SECONDS are skipped, as they may belong to a save in progress
+    - flag: missing and corrupt rows are recorded in flagged_documents
+    Missing blob files are re-linked from a loose copy with the same content.
+    Returns {action: count}.
+    """
+    done = {"relinked": 0, "quarantined": 0, "flagged": 0, "blobs_restored": 0}
+
+    if relink and report.moved:
+        changes = {doc_id: {"file_path": found.replace("/", os.sep)} for doc_id, _, found in report.moved}
+        done["relinked"] = repo.update_documents(changes)
+
+    if quarantine and report.orphans:
+        run_dir = os.path.join(QUARANTINE_DIR, datetime.now().strftime("%Y%m%d-%H%M%S"))
+        now = time.time()
+        for path in report.orphans:
+            mtime, ctime = report.orphan_times.get(path, (now, now))
+            if now - max(mtime, ctime) < GRACE_SECONDS:
+                continue
+            # Re-check right before moving: the file may have gained a row since the scan
+            in_use = repo.query_one(
+                "SELECT 1 FROM documents WHERE file_path IN (?, ?)", (path, path.replace("/", "\\"))
+            ) or (path.startswith(STORE_PREFIX) and repo.query_one(
+                "SELECT 1 FROM blobs WHERE sha256 = ?", (os.path.basename(path),)
+            ))
+            if in_use:
+                continue
+            target = os.path.join(run_dir, *path.split("/")[1:])
+            try:
+                os.renames(abs_document_path(path), target)
+            except OSError:
+                continue
+            done["quarantined"] += 1
+        if done["quarantined"]:
+            fsync_dir(run_dir)
+
+    if report.missing_blobs:
+        missing_blobs = set(report.missing_blobs)
+        for sha256, file_path in repo.query("SELECT content_hash, file_path FROM documents WHERE content_hash IS NOT NULL"):
+            source = abs_document_path(file_path)
+            if sha256 not in missing_blobs or not os.path.exists(source):
+                continue
+            # Only an intact copy may become the blob
+            if hash_file(source)[0] != sha256:
+                continue
+            os.makedirs(os.path.dirname(blob_path(sha256)), exist_ok=True)
+            try:
+                link_or_copy(source, blob_path(sha256))
+            except FileExistsError:
+                pass
+            missing_blobs.discard(sha256)
+            done["blobs_restored"] += 1
+
+    if flag:
+        flagged = [(doc_id, "missing") for doc_id, _ in report.missing]
+        flagged += [(doc_id, "corrupt") for doc_id, _ in report.corrupt]
+
+        def write_flags(conn):
+            conn.execute("DELETE FROM flagged_documents")
+            conn.executemany(
+                "INSERT OR REPLACE INTO flagged_documents (doc_id, issue) SELECT ?, ? WHERE EXISTS (SELECT 1 FROM documents WHERE id = ?)",
+                [(doc_id, issue, doc_id) for doc_id, issue in flagged]
+            )
+        repo.write(write_flags)
+        done["flagged"] = len(flagged)
+    return done
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from db_init import init_db
+
+    parser = argparse.ArgumentParser(description="Check documents/ against the database and optionally repair it.")
+    parser.add_argument("--quick", action="store_true", help="Compare paths, and sizes with the recorded sizes; don't hash changed files")
+    parser.add_argument("--repair", action="store_true", help="Relink moved files, quarantine orphans, flag missing rows")
+    parser.add_argument("--report", default=None, help="Write the full report as JSON to this file")
+    args = parser.parse_args()
+
+    init_db()
+    repo = get_repository(DB_PATH)
+    report = check(repo, verify_hashes=not args.quick)
+    print(("✅ " if report.clean else "⚠️ ") + json.dumps(report.summary()))
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(report.as_dict(), f, indent=2)
+    if args.repair and not report.clean:
+        print("🛠️ Repaired: " + json.dumps(repair(repo, report)))
@@ -3,7 +3,7 @@
 import customtkinter as ctk
 
 class Paginator:
-    def __init__(self, master, on_page_change, total_count_fn, page_sizes=[10, 25, 50]):
+    def __init__(self, master, on_page_change, total_count_fn=None, page_sizes=[10, 25, 50]):
         self.master = master
         self.on_page_change = on_page_change
         self.total_count_fn = total_count_fn
@@ -15,6 +15,9 @@ class Paginator:
         self.total_items = 0
         self.total_pages = 1
 
+        # 🔑 Keyset cursors: page_cursors[n] is where page n + 1 starts
+        self.page_cursors = [None]
+
         self._build_ui()
 
     def _build_ui(self):
@@ -41,8 +44,12 @@ class Paginator:
         self.count_label = ctk.CTkLabel(self.frame, text="")
         self.count_label.grid(row=0, column=4, padx=5)
 
-    def update(self):
-        self.total_items = self.total_count_fn()
+    def update(self, total_items=None):
+        # Callers that fetched the count together with the page pass it in;
+        # total_count_fn is only a fallback for callers that don't
+        if total_items is None and self.total_count_fn:
+            total_items = self.total_count_fn()
+        self.total_items = total_items or 0
         self.total_pages = max(1, (self.total_items + self.page_size - 1) // self.page_size)
 
         self.page_label.configure(text=f"Page {self.current_page} of {self.total_pages}")
@@ -51,8 +58,26 @@ class Paginator:
         self.prev_btn.configure(state="normal" if self.current_page > 1 else "disabled")
         self.next_btn.configure(state="normal" if self.current_page < self.total_pages else "disabled")
 
+    def set_loading(self, loading):
+        if loading:
+            self.prev_btn.configure(state="disabled")
+            self.next_btn.configure(state="disabled")
+            self.count_label.configure(text="⏳ Loading…")
+
+    def get_cursor(self):
+        return self.page_cursors[self.current_page - 1]
+
+    def set_next_cursor(self, cursor):
+        del self.page_cursors[self.current_page:]
+        if cursor is not None:
+            self.page_cursors.append(cursor)
+
+    def reset(self):
+        self.current_page = 1
+        self.page_cursors = [None]
+
     def next_page(self):
-        if self.current_page < self.total_pages:
+        if self.current_page < self.total_pages and len(self.page_cursors) > self.current_page:
             self.current_page += 1
             self.on_page_change()
 
@@ -63,7 +88,7 @@ class Paginator:
 
     def change_page_size(self, value):
         self.page_size = int(value)
-        self.current_page = 1
+        self.reset()
         self.on_page_change()
 
     def get_offset_limit(self):
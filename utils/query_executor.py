@@ -0,0 +1,98 @@
+# utils/query_executor.py
+
+import queue
+import threading
+
+
+class QueryExecutor:
+    """
+    Runs DB work on one background thread and hands results back to Tk.
+
+    Jobs are submitted on a named channel. Submitting again on the same channel
+    supersedes the previous job: if it hasn't started it's skipped, if it's
+    running `interrupt` is called, and either way its result is dropped.
+    Results are delivered on the Tk thread by polling with after(), since
+    Tk calls must not be made from the worker.
+    """
+
+    def __init__(self, widget, interrupt=None, poll_ms=15):
+        self.widget = widget
+        self.interrupt = interrupt
+        self.poll_ms = poll_ms
+        self._jobs = queue.Queue()
+        self._results = queue.Queue()
+        self._generations = {}
+        self._running = None  # (channel, generation); set and cleared under _lock
+        self._lock = threading.Lock()
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._run, name="query-executor", daemon=True)
+        self._thread.start()
+        self._poll_id = self.widget.after(self.poll_ms, self._poll)
+
+    def submit(self, channel, fn, on_done=None, on_error=None):
+        generation = self._supersede(channel)
+        self._jobs.put((channel, generation, fn, on_done, on_error))
+        return generation
+
+    def cancel(self, channel):
+        # Drop whatever is queued or running on this channel
+        self._supersede(channel)
+
+    def _supersede(self, channel):
+        # Interrupts only the job being replaced: the lock keeps the worker from moving on to another one meanwhile
+        replaced = self._generations.get(channel, 0)
+        self._generations[channel] = replaced + 1
+        if self.interrupt:
+            with self._lock:
+                if self._running == (channel, replaced):
+                    self.interrupt(self._thread)
+        return replaced + 1
+
+    def is_current(self, channel, generation):
+        return self._generations.get(channel) == generation
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            channel, generation, fn, on_done, on_error = job
+            if not self.is_current(channel, generation):
+                continue  # superseded before it started
+
+            with self._lock:
+                self._running = (channel, generation)
+            try:
+                result, error = fn(), None
+            except Exception as e:
+                result, error = None, e
+            finally:
+                with self._lock:
+                    self._running = None
+            self._results.put((channel, generation, on_done, on_error, result, error))
+
+    def _poll(self):
+        while True:
+            try:
+                channel, generation, on_done, on_error, result, error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if not self.is_current(channel, generation):
+                continue  # stale: a newer query on this channel is on its way
+            if error is not None:
+                if on_error:
+                    on_error(error)
+            elif on_done:
+                on_done(result)
+
+        if not self._closed:
+            self._poll_id = self.widget.after(self.poll_ms, self._poll)
+
+    def shutdown(self):
+        self._closed = True
+        self._jobs.put(None)
+        try:
+            self.widget.after_cancel(self._poll_id)
+        except Exception:
+            pass
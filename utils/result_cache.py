@@ -0,0 +1,44 @@
+# utils/result_cache.py
+
+from collections import OrderedDict
+
+
+class ResultCache:
+    """
+    LRU cache of query results tied to a database change token.
+    validate() empties it as soon as the token moves, so an add, edit or
+    delete from any connection or process invalidates every cached page.
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._token = None
+        self.hits = 0
+        self.misses = 0
+
+    def validate(self, token):
+        if token != self._token:
+            self._entries.clear()
+            self._token = token
+
+    def get(self, key):
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value, token):
+        # A result fetched under an older token may already be stale
+        if token != self._token:
+            return
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
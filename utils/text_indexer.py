@@ -0,0 +1,257 @@
+# utils/text_indexer.py
+
+import importlib.util
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from doc_repository import get_repository
+from doc_storage import abs_document_path
+
+# 🔐 Paths
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DB_PATH = os.path.join(BASE_DIR, "db", "document_store.db")
+
+PDF_EXTENSIONS = {".pdf"}
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".tif", ".tiff", ".bmp"}
+MAX_BODY_CHARS = 500_000  # keep the index bounded for very long scans
+WRITE_BATCH = 50
+RETRY_FAILED_AFTER = timedelta(hours=1)  # a file that failed to extract is tried again after this
+DONE_STATUSES = ("ok", "unsupported")
+ID_CHUNK = 500
+
+
+def supported_extensions():
+    # Files whose extractor isn't installed are left unindexed, so they're picked up once it is
+    extensions = set()
+    if importlib.util.find_spec("pypdf"):
+        extensions |= PDF_EXTENSIONS
+    if importlib.util.find_spec("pytesseract") and importlib.util.find_spec("PIL"):
+        extensions |= IMAGE_EXTENSIONS
+    return extensions
+
+
+def extract_text(job):
+    """
+    Runs in a worker process. Returns (doc_id, mtime, size, text, status).
+    Optional dependencies are imported here so the dashboard never pays for them.
+    """
+    doc_id, abs_path, mtime, size = job
+    ext = os.path.splitext(abs_path)[1].lower()
+    try:
+        if ext in PDF_EXTENSIONS:
+            from pypdf import PdfReader
+
+            reader = PdfReader(abs_path)
+            parts = []
+            total = 0
+            for page in reader.pages:
+                page_text = page.extract_text() or ""
+                parts.append(page_text)
+                total += len(page_text)
+                if total >= MAX_BODY_CHARS:
+                    break
+            text = "\n".join(parts)
+        elif ext in IMAGE_EXTENSIONS:
+            import pytesseract
+            from PIL import Image
+
+            with Image.open(abs_path) as image:
+                text = pytesseract.image_to_string(image)
+        else:
+            return doc_id, mtime, size, "", "unsupported"
+    except ImportError as e:
+        return doc_id, mtime, size, "", f"missing dependency: {e.name}"
+    except Exception as e:
+        return doc_id, mtime, size, "", f"error: {e}"
+
+    return doc_id, mtime, size, text[:MAX_BODY_CHARS], "ok"
+
+
+class IndexerStats:
+    def __init__(self):
+        self.files = 0
+        self.bytes = 0
+        self.skipped = 0
+        self.failed = 0
+        self.started = None
+        self.finished = None
+
+    @property
+    def elapsed(self):
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def files_per_sec(self):
+        return self.files / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def bytes_per_sec(self):
+        return self.bytes / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self):
+        return {
+            "files": self.files,
+            "bytes": self.bytes,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "elapsed_s": round(self.elapsed, 3),
+            "files_per_s": round(self.files_per_sec, 2),
+            "bytes_per_s": round(self.bytes_per_sec, 1),
+        }
+
+
+class TextIndexer:
+    """
+    Extracts text from stored files into document_body_fts.
+    After the first run only documents in the change feed are looked at;
+    of those, files whose (mtime, size) match the last extraction are skipped.
+    """
+
+    def __init__(self, db_path=DB_PATH, workers=None):
+        self.db_path = db_path
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.stats = IndexerStats()
+        self._stop = threading.Event()
+        self._thread = None
+        self._change_seq = None  # change feed position covered by the last completed run
+        self._pending_seq = None
+
+    def _candidates(self, repo):
+        """
+        Rows worth a stat(): every document on the first run (or when the
+        change feed was pruned past our position, so changes were missed),
+        afterwards the ones in the change feed plus failures due for a retry.
+        """
+        query = '''
+            SELECT d.id, d.file_path, s.mtime, s.size, s.status, s.indexed_at
+            FROM documents d LEFT JOIN document_text_state s ON s.doc_id = d.id
+        '''
+        if self._change_seq is None:
+            self._pending_seq = repo.latest_change()
+            return repo.query(query)
+        doc_ids, self._pending_seq, complete = repo.changes_since(self._change_seq)
+        if not complete:
+            return repo.query(query)
+
+        retry_before = (datetime.now() - RETRY_FAILED_AFTER).isoformat(timespec="seconds")
+        rows = repo.query(query + " WHERE s.status NOT IN (?, ?) AND s.indexed_at < ?", (*DONE_STATUSES, retry_before))
+        doc_ids = sorted(doc_ids - {row[0] for row in rows})
+        for start in range(0, len(doc_ids), ID_CHUNK):
+            chunk = doc_ids[start:start + ID_CHUNK]
+            rows += repo.query(query + f" WHERE d.id IN ({','.join('?' * len(chunk))})", chunk)
+        return rows
+
+    def find_stale(self, repo):
+        extensions = supported_extensions()
+        retry_before = (datetime.now() - RETRY_FAILED_AFTER).isoformat(timespec="seconds")
+        jobs = []
+        for doc_id, file_path, old_mtime, old_size, status, indexed_at in self._candidates(repo):
+            abs_path = abs_document_path(file_path)
+            if os.path.splitext(abs_path)[1].lower() not in extensions:
+                continue
+            try:
+                st = os.stat(abs_path)
+            except OSError:
+                continue
+            # A failed extraction only counts as current until its retry is due
+            current = status is not None and (status in DONE_STATUSES or indexed_at >= retry_before)
+            if current and old_mtime == st.st_mtime and old_size == st.st_size:
+                self.stats.skipped += 1
+                continue
+            jobs.append((doc_id, abs_path, st.st_mtime, st.st_size))
+        return jobs
+
+    def _write(self, repo, results):
+        now = datetime.now().isoformat(timespec="seconds")
+
+        # Rows deleted while their file was being extracted are skipped by the EXISTS guards
+        def write(conn):
+            conn.executemany("DELETE FROM document_body_fts WHERE rowid = ?", [(r[0],) for r in results])
+            conn.executemany(
+                "INSERT INTO document_body_fts(rowid, body) SELECT ?, ? WHERE EXISTS (SELECT 1 FROM documents WHERE id = ?)",
+                [(doc_id, text, doc_id) for doc_id, _, _, text, status in results if text]
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO document_text_state(doc_id, mtime, size, status, indexed_at) "
+                "SELECT ?, ?, ?, ?, ? WHERE EXISTS (SELECT 1 FROM documents WHERE id = ?)",
+                [(doc_id, mtime, size, status, now, doc_id) for doc_id, mtime, size, _, status in results]
+            )
+
+        # touched_ids keeps the repository's cached search counts exact
+        repo.write(write, touched_ids=[r[0] for r in results])
+
+    def run_once(self):
+        self.stats = IndexerStats()
+        self.stats.started = time.perf_counter()
+
+        repo = get_repository(self.db_path)
+        try:
+            jobs = self.find_stale(repo)
+            if jobs:
+                batch = []
+                with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                    for result in pool.map(extract_text, jobs, chunksize=4):
+                        if self._stop.is_set():
+                            break
+                        batch.append(result)
+                        self.stats.files += 1
+                        self.stats.bytes += result[2]
+                        if result[4] != "ok":
+                            self.stats.failed += 1
+                        if len(batch) >= WRITE_BATCH:
+                            self._write(repo, batch)
+                            batch = []
+                    if self._stop.is_set():
+                        pool.shutdown(cancel_futures=True)
+                if batch:
+                    self._write(repo, batch)
+            if not self._stop.is_set():
+                self._change_seq = self._pending_seq  # a run cut short looks at the same changes again
+        finally:
+            self.stats.finished = time.perf_counter()
+        return self.stats
+
+    def start(self, interval=60):
+        # Re-check periodically so new and changed files get picked up
+        if self._thread and self._thread.is_alive():
+            return
+
+        def loop():
+            while not self._stop.is_set():
+                try:
+                    self.run_once()
+                except sqlite3.Error as e:
+                    print(f"⚠️ Text indexer: {e}")
+                self._stop.wait(interval)
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=loop, name="text-indexer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    from db_init import init_db
+
+    parser = argparse.ArgumentParser(description="Extract text from stored documents into the search index.")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPUs - 1)")
+    parser.add_argument("--full", action="store_true", help="Re-extract every file, ignoring mtime/size")
+    args = parser.parse_args()
+
+    init_db()
+    if args.full:
+        get_repository(DB_PATH).write(lambda conn: conn.execute("DELETE FROM document_text_state"))
+
+    stats = TextIndexer(workers=args.workers).run_once()
+    print("📄 Text indexing finished:", json.dumps(stats.as_dict()))
@@ -0,0 +1,229 @@
+# utils/thumbnail_cache.py
+
+import importlib.util
+import os
+import queue
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from doc_storage import hash_file
+
+# 🔐 Paths
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.path.join(BASE_DIR, "cache", "thumbnails")
+
+PDF_EXTENSIONS = {".pdf"}
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".tif", ".tiff", ".bmp", ".gif"}
+THUMB_SIZE = (96, 128)
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+MAX_IMAGES_IN_MEMORY = 128
+
+
+def supported_extensions():
+    # Pillow draws every thumbnail; PDFs additionally need PyMuPDF to render a page
+    extensions = set()
+    if importlib.util.find_spec("PIL"):
+        extensions |= IMAGE_EXTENSIONS
+        if importlib.util.find_spec("fitz"):
+            extensions |= PDF_EXTENSIONS
+    return extensions
+
+
+def thumbnail_path(sha256, size, cache_dir=CACHE_DIR):
+    return os.path.join(cache_dir, sha256[:2], f"{sha256}_{size}.png")
+
+
+def render_thumbnail(job):
+    """
+    Runs in a worker process. Returns (abs_path, thumb_path, status).
+    An existing thumbnail for the same content is reused, so identical files
+    (and renamed or retyped ones) are only ever rendered once.
+    """
+    abs_path, content_hash, cache_dir = job
+    try:
+        size = os.path.getsize(abs_path)
+        if not content_hash:
+            content_hash, size = hash_file(abs_path)
+        target = thumbnail_path(content_hash, size, cache_dir)
+        if os.path.exists(target):
+            os.utime(target)  # LRU: mark as recently used
+            return abs_path, target, "hit"
+
+        from PIL import Image
+
+        ext = os.path.splitext(abs_path)[1].lower()
+        if ext in PDF_EXTENSIONS:
+            import fitz
+
+            with fitz.open(abs_path) as pdf:
+                page = pdf.load_page(0)
+                zoom = min(THUMB_SIZE[0] / page.rect.width, THUMB_SIZE[1] / page.rect.height) * 2
+                pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+                image = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+        else:
+            image = Image.open(abs_path)
+            image.draft("RGB", (THUMB_SIZE[0] * 2, THUMB_SIZE[1] * 2))  # JPEG: decode at reduced size
+            image = image.convert("RGB")
+
+        image.thumbnail(THUMB_SIZE)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        temp_path = f"{target}.{uuid.uuid4().hex}.tmp"
+        image.save(temp_path, "PNG", optimize=True)
+        os.replace(temp_path, target)
+        return abs_path, target, "rendered"
+    except ImportError as e:
+        return abs_path, None, f"missing dependency: {e.name}"
+    except Exception as e:
+        return abs_path, None, f"error: {e}"
+
+
+class ThumbnailCache:
+    """
+    First-page thumbnails for stored documents, rendered in a process pool and
+    kept on disk under cache/thumbnails, keyed by content hash and size.
+    The disk cache is capped at max_bytes and evicted least-recently-used first
+    (by mtime, which hits refresh). Results are handed back on the Tk thread
+    by polling, like QueryExecutor.
+    """
+
+    def __init__(self, widget, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES, workers=2, poll_ms=50):
+        self.widget = widget
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.workers = workers
+        self.poll_ms = poll_ms
+        self.extensions = supported_extensions()
+
+        self._pool = None
+        self._results = queue.Queue()
+        self._waiting = {}  # abs_path -> callbacks waiting for it
+        self._paths = {}  # (abs_path, mtime, size) -> thumbnail path, for this session
+        self._images = OrderedDict()  # thumbnail path -> CTkImage
+        self._failed = set()
+        self._cache_bytes = None
+        self._poll_id = None
+        self._closed = False
+
+    def request(self, abs_path, callback, content_hash=None):
+        # callback(image) is called on the Tk thread, only if a thumbnail could be made
+        if self._closed or os.path.splitext(abs_path)[1].lower() not in self.extensions:
+            return
+        try:
+            st = os.stat(abs_path)
+        except OSError:
+            return
+        key = (abs_path, st.st_mtime, st.st_size)
+        if key in self._failed:
+            return
+
+        thumb = self._paths.get(key)
+        if thumb and os.path.exists(thumb):
+            callback(self._load(thumb))
+            return
+
+        if abs_path in self._waiting:
+            self._waiting[abs_path].append((key, callback))
+            return
+        self._waiting[abs_path] = [(key, callback)]
+
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        future = self._pool.submit(render_thumbnail, (abs_path, content_hash, self.cache_dir))
+        # Runs on a pool thread: only hand the result over, never touch Tk here
+        future.add_done_callback(self._results.put)
+        if self._poll_id is None:
+            self._poll_id = self.widget.after(self.poll_ms, self._poll)
+
+    def _poll(self):
+        self._poll_id = None
+        while True:
+            try:
+                future = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if future.cancelled():
+                continue
+            try:
+                abs_path, thumb, status = future.result()
+            except Exception as e:  # e.g. a worker process died
+                print(f"⚠️ Thumbnail worker failed: {e}")
+                continue
+
+            waiting = self._waiting.pop(abs_path, [])
+            for key, callback in waiting:
+                if thumb is None:
+                    self._failed.add(key)
+                    continue
+                self._paths[key] = thumb
+                callback(self._load(thumb))
+            if status == "rendered":
+                self._account(thumb)
+
+        if self._waiting and not self._closed:
+            self._poll_id = self.widget.after(self.poll_ms, self._poll)
+
+    def _load(self, thumb):
+        image = self._images.get(thumb)
+        if image is None:
+            import customtkinter as ctk
+            from PIL import Image
+
+            with Image.open(thumb) as pil_image:
+                pil_image.load()
+                image = ctk.CTkImage(light_image=pil_image, dark_image=pil_image, size=pil_image.size)
+            self._images[thumb] = image
+            while len(self._images) > MAX_IMAGES_IN_MEMORY:
+                self._images.popitem(last=False)
+        self._images.move_to_end(thumb)
+        return image
+
+    def _scan(self):
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+        return entries
+
+    def _account(self, thumb):
+        if self._cache_bytes is None:
+            self._cache_bytes = sum(size for _, size, _ in self._scan())
+        else:
+            try:
+                self._cache_bytes += os.path.getsize(thumb)
+            except OSError:
+                pass
+        if self._cache_bytes > self.max_bytes:
+            self.evict()
+
+    def evict(self, target_ratio=0.9):
+        # Oldest first, down to 90% of the cap so we don't evict on every render
+        entries = sorted(self._scan())
+        total = sum(size for _, size, _ in entries)
+        limit = self.max_bytes * target_ratio
+        for _, size, path in entries:
+            if total <= limit:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+            self._images.pop(path, None)
+        self._cache_bytes = total
+        return total
+
+    def shutdown(self):
+        self._closed = True
+        if self._poll_id is not None:
+            try:
+                self.widget.after_cancel(self._poll_id)
+            except Exception:
+                pass
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,77 @@
+# utils/timeline_panel.py
+
+import customtkinter as ctk
+
+MONTH_NAMES = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+
+class TimelinePanel:
+    """
+    Year → month navigator with a document count per bucket.
+    Clicking a year expands its months and calls on_select(year, None);
+    clicking a month calls on_select(year, month). Buttons are created once
+    and relabelled when the counts change.
+    """
+
+    def __init__(self, master, on_select):
+        self.on_select = on_select
+        self.counts = {}  # 'YYYY-MM' -> count
+        self.expanded_year = None
+
+        self.frame = ctk.CTkFrame(master, fg_color="transparent")
+        self.year_row = ctk.CTkScrollableFrame(self.frame, orientation="horizontal", height=32)
+        self.year_row.pack(fill="x")
+        self.month_row = ctk.CTkFrame(self.frame, fg_color="transparent")
+        self.month_row.pack(fill="x", pady=(5, 0))
+
+        self.year_buttons = {}
+        self.month_buttons = []
+        for month in range(1, 13):
+            button = ctk.CTkButton(self.month_row, text=MONTH_NAMES[month - 1], width=58,
+                                   command=lambda month=month: self.on_select(self.expanded_year, month))
+            button.pack(side="left", padx=(0, 4))
+            self.month_buttons.append(button)
+        self.month_row.pack_forget()
+
+    def show_counts(self, counts):
+        self.counts = counts
+        years = {}
+        for month, n in counts.items():
+            if month:  # '' holds documents whose date couldn't be parsed
+                years[month[:4]] = years.get(month[:4], 0) + n
+
+        for year in list(self.year_buttons):
+            if year not in years:
+                self.year_buttons.pop(year).destroy()
+        for year in sorted(years, reverse=True):
+            button = self.year_buttons.get(year)
+            if button is None:
+                button = self.year_buttons[year] = ctk.CTkButton(
+                    self.year_row, width=90, command=lambda year=year: self.toggle_year(year)
+                )
+            button.configure(text=f"{year} ({years[year]:,})")
+        # Newest first, whatever order the years appeared in
+        for year in sorted(self.year_buttons, reverse=True):
+            self.year_buttons[year].pack_forget()
+            self.year_buttons[year].pack(side="left", padx=(0, 4))
+
+        if self.expanded_year not in years:
+            self.expanded_year = None
+        self.show_months()
+
+    def toggle_year(self, year):
+        self.expanded_year = None if year == self.expanded_year else year
+        self.show_months()
+        if self.expanded_year:
+            self.on_select(year, None)
+
+    def show_months(self):
+        for year, button in self.year_buttons.items():
+            button.configure(fg_color=("gray40", "gray30") if year == self.expanded_year else ctk.ThemeManager.theme["CTkButton"]["fg_color"])
+        if self.expanded_year is None:
+            self.month_row.pack_forget()
+            return
+        for month, button in enumerate(self.month_buttons, start=1):
+            n = self.counts.get(f"{self.expanded_year}-{month:02d}", 0)
+            button.configure(text=f"{MONTH_NAMES[month - 1]} ({n:,})", state="normal" if n else "disabled")
+        self.month_row.pack(fill="x", pady=(5, 0))
@@ -0,0 +1,74 @@
+# utils/transfer_task.py
+
+import threading
+
+from doc_storage import TransferCancelled
+
+
+class TransferTask:
+    """
+    Runs fn(progress, cancel) on its own thread, for file copies too slow for
+    the Tk thread (or for the query executor's single worker).
+    fn reports with progress(done_bytes) and should stop when cancel is set;
+    doc_storage's copy helpers do both. Progress and the result are delivered
+    on the Tk thread by polling with after().
+    """
+
+    def __init__(self, widget, fn, total=0, on_done=None, on_error=None, on_progress=None,
+                 on_cancelled=None, poll_ms=100):
+        self.widget = widget
+        self.total = total
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self.on_cancelled = on_cancelled
+        self.poll_ms = poll_ms
+
+        self.cancel_event = threading.Event()
+        self.done_bytes = 0
+        self._outcome = None  # (result, error) once fn has returned
+
+        def run():
+            try:
+                self._outcome = (fn(self._report, self.cancel_event), None)
+            except BaseException as e:
+                self._outcome = (None, e)
+
+        self._thread = threading.Thread(target=run, name="file-transfer", daemon=True)
+        self._thread.start()
+        self._poll_id = self.widget.after(self.poll_ms, self._poll)
+
+    def _report(self, done_bytes):
+        self.done_bytes = done_bytes  # a single int assignment; read by _poll
+
+    @property
+    def fraction(self):
+        return min(1.0, self.done_bytes / self.total) if self.total else 0.0
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def _poll(self):
+        if self.on_progress:
+            self.on_progress(self.fraction)
+        if self._outcome is None:
+            self._poll_id = self.widget.after(self.poll_ms, self._poll)
+            return
+
+        result, error = self._outcome
+        if isinstance(error, TransferCancelled):
+            if self.on_cancelled:
+                self.on_cancelled()
+        elif error is not None:
+            if self.on_error:
+                self.on_error(error)
+        elif self.on_done:
+            self.on_done(result)
+
+    def stop_polling(self):
+        # For windows closed mid-transfer: cancel and drop the callbacks
+        self.cancel()
+        try:
+            self.widget.after_cancel(self._poll_id)
+        except Exception:
+            pass